@@ -10,155 +10,225 @@ import glm
 from gl import Renderer
 from buffer import Buffer
 from model import Model
+from assetloader import AssetLoader
+from shaderprogram import shaderCache
+from profiler import Profiler, ProfilerOverlay
+from camerapath import CameraPath
 from vertexShaders import *
 from fragmentShaders import *
 
 width = 960
 height = 540
 
-deltaTime = 0.0
 
-# --- Init pygame / ventana ---
+def main():
+    deltaTime = 0.0
 
-pygame.display.set_caption("Shaders Lab - CC2018 OpenGL")
-screen = pygame.display.set_mode((width, height), pygame.DOUBLEBUF | pygame.OPENGL)
-clock = pygame.time.Clock()
+    # --- Init pygame / ventana ---
 
-# --- Renderer y setup básico ---
-rend = Renderer(screen)
-rend.pointLight = glm.vec3(1, 1, 1)
+    pygame.display.set_caption("Shaders Lab - CC2018 OpenGL")
+    screen = pygame.display.set_mode((width, height), pygame.DOUBLEBUF | pygame.OPENGL)
+    clock = pygame.time.Clock()
 
-# Shaders por defecto
-currVertexShader = vertex_shader
-currFragmentShader = fragment_shader
-rend.SetShaders(currVertexShader, currFragmentShader)
+    # --- Renderer y setup básico ---
+    rend = Renderer(screen)
+    rend.pointLight = glm.vec3(1, 1, 1)
 
-# Skybox (asegúrate de que existan estos archivos)
-skyboxTextures = [
-    "skybox/right.jpg",
-    "skybox/left.jpg",
-    "skybox/top.jpg",
-    "skybox/bottom.jpg",
-    "skybox/front.jpg",
-    "skybox/back.jpg",
-]
-rend.CreateSkybox(skyboxTextures)
+    # Los programas enlazados se guardan en disco: el próximo arranque no compila
+    shaderCache.binaryDir = ".assetcache/shaders"
 
-# --- Modelo principal centrado y al frente de la cámara ---
-faceModel = Model("models/Count Batula.obj")
+    # Tiempos por pase (CPU y GPU) y overlay con fps / draw calls / triángulos.
+    # Apagado hasta que se pide ([P] o [T]): cada frame medido agrega queries a la GPU
+    profiler = Profiler()
+    profiler.enabled = False
+    rend.profiler = profiler
+    overlay = ProfilerOverlay(profiler)
+    overlay.visible = False
 
-# Carga la(s) textura(s) del MTL automáticamente:
-faceModel.AddDiffuseFromMTL(load_all=False)  # o True si quieres todas
+    # Shaders por defecto
+    currVertexShader = vertex_shader
+    currFragmentShader = fragment_shader
+    rend.SetShaders(currVertexShader, currFragmentShader)
 
-# Texturas extra manuales (si las usas en otros shaders):
-# faceModel.AddTexture("textures/Robe2.png")
-# faceModel.AddTexture("textures/Face.png")
+    # Los assets se cargan en segundo plano; el primer frame no los espera
+    rend.assetLoader = AssetLoader()
 
-faceModel.position = glm.vec3(0, 0, -5)
-faceModel.rotation = glm.vec3(0, 0, 0)
-faceModel.scale    = glm.vec3(1, 1, 1)
+    # Skybox (asegúrate de que existan estos archivos)
+    skyboxTextures = [
+        "skybox/right.jpg",
+        "skybox/left.jpg",
+        "skybox/top.jpg",
+        "skybox/bottom.jpg",
+        "skybox/front.jpg",
+        "skybox/back.jpg",
+    ]
+    rend.assetLoader.LoadSkybox(rend, skyboxTextures)
 
-rend.scene.append(faceModel)
+    # --- Modelo principal centrado y al frente de la cámara ---
+    # (se dibuja como una caja hasta que termina de cargar, con las texturas de cada material)
+    faceModel = rend.assetLoader.LoadModel("models/Count Batula.obj")
 
+    # Texturas extra manuales (si las usas en otros shaders):
+    # faceModel.AddTexture("textures/Robe2.png")
+    # faceModel.AddTexture("textures/Face.png")
 
-# Ayuda rápida en consola
-print("""
+    faceModel.position = glm.vec3(0, 0, -5)
+    faceModel.rotation = glm.vec3(0, 0, 0)
+    faceModel.scale    = glm.vec3(1, 1, 1)
+
+    rend.scene.append(faceModel)
+
+    # Multitud: N copias del mismo modelo en un draw instanciado por material
+    # from instancedmodel import InstancedModel
+    # crowd = InstancedModel(faceModel)
+    # crowd.SetTransforms(positions)      # arrays (N, 3); rotations/scales opcionales
+    # rend.scene.append(crowd)
+
+
+    # Ayuda rápida en consola
+    print("""
 === Shader Switch ===
 Fragment   : [1] Base  [2] Toon  [3] Negative  [4] Magma
 Vertex     : [7] Base  [8] Fat   [9] Water     [0] Twist
-Otros      : [F] Wire/Fill  |  Luz: WASD + Q/E  |  Cam: Flechas
+Otros      : [F] Wire/Fill  |  [O] Pre-pass de profundidad  |  Luz: WASD + Q/E  |  Cam: Flechas
+Profiler   : [P] Profiler + overlay  |  [T] Grabar / guardar trace.json (chrome://tracing)
+Benchmark  : [R] Grabar / guardar camera_path.json (python benchmark.py --path camera_path.json)
 Params     : Z/X = value (0..1)  |  time avanza automáticamente
 """)
 
-isRunning = True
-
-while isRunning:
-
-    deltaTime = clock.tick(60) / 1000.0
-    rend.elapsedTime += deltaTime
-
-    keys = pygame.key.get_pressed()
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            isRunning = False
-
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_f:
-                rend.ToggleFilledMode()
-
-            # -------- FRAGMENT SHADERS (1..4) --------
-            if event.key == pygame.K_1:
-                currFragmentShader = fragment_shader
-                rend.SetShaders(currVertexShader, currFragmentShader)
-
-            if event.key == pygame.K_2:
-                currFragmentShader = toon_shader
-                rend.SetShaders(currVertexShader, currFragmentShader)
-
-            if event.key == pygame.K_3:
-                currFragmentShader = negative_shader
-                rend.SetShaders(currVertexShader, currFragmentShader)
-
-            if event.key == pygame.K_4:
-                currFragmentShader = magma_shader
-                rend.SetShaders(currVertexShader, currFragmentShader)
-
-            # -------- VERTEX SHADERS (7..0) ----------
-            if event.key == pygame.K_7:
-                currVertexShader = vertex_shader
-                rend.SetShaders(currVertexShader, currFragmentShader)
-
-            if event.key == pygame.K_8:
-                currVertexShader = fat_shader
-                rend.SetShaders(currVertexShader, currFragmentShader)
-
-            if event.key == pygame.K_9:
-                currVertexShader = water_shader
-                rend.SetShaders(currVertexShader, currFragmentShader)
-
-            if event.key == pygame.K_0:
-                currVertexShader = twist_shader
-                rend.SetShaders(currVertexShader, currFragmentShader)
-
-    # --- Movimiento de cámara con flechas ---
-    cam_speed = 3.0
-    if keys[K_UP]:
-        rend.camera.position.z += cam_speed * deltaTime
-    if keys[K_DOWN]:
-        rend.camera.position.z -= cam_speed * deltaTime
-    if keys[K_RIGHT]:
-        rend.camera.position.x += cam_speed * deltaTime
-    if keys[K_LEFT]:
-        rend.camera.position.x -= cam_speed * deltaTime
-
-    # --- Mover luz con WASD+Q/E ---
-    light_speed = 10.0
-    if keys[K_w]:
-        rend.pointLight.z -= light_speed * deltaTime
-    if keys[K_s]:
-        rend.pointLight.z += light_speed * deltaTime
-    if keys[K_a]:
-        rend.pointLight.x -= light_speed * deltaTime
-    if keys[K_d]:
-        rend.pointLight.x += light_speed * deltaTime
-    if keys[K_q]:
-        rend.pointLight.y -= light_speed * deltaTime
-    if keys[K_e]:
-        rend.pointLight.y += light_speed * deltaTime
-
-    # --- Parámetro 'value' para vertex shaders (0..1) ---
-    if keys[K_z]:
-        if rend.value > 0.0:
-            rend.value = max(0.0, rend.value - 1.0 * deltaTime)
-    if keys[K_x]:
-        if rend.value < 1.0:
-            rend.value = min(1.0, rend.value + 1.0 * deltaTime)
-
-    # Rotación suave del modelo para apreciar los efectos
-    faceModel.rotation.y += 45.0 * deltaTime
-
-    rend.Render()
-    pygame.display.flip()
-
-pygame.quit()
+    isRunning = True
+
+    # Recorrido de cámara/luz que se está grabando (None = no se graba)
+    cameraPath = None
+    recordStart = 0.0
+
+    while isRunning:
+
+        deltaTime = clock.tick(60) / 1000.0
+        profiler.BeginFrame()
+        rend.elapsedTime += deltaTime
+
+        keys = pygame.key.get_pressed()
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                isRunning = False
+
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_f:
+                    rend.ToggleFilledMode()
+
+                if event.key == pygame.K_o:
+                    rend.depthPrepass = not rend.depthPrepass
+                    print(f"[Render] Pre-pass de profundidad: {'sí' if rend.depthPrepass else 'no'}")
+
+                if event.key == pygame.K_p:
+                    overlay.visible = not overlay.visible
+                    profiler.enabled = overlay.visible or profiler.trace is not None
+
+                if event.key == pygame.K_t:
+                    if profiler.trace is None:
+                        profiler.enabled = True
+                        profiler.StartTrace()
+                        print("[Profiler] Grabando trace...")
+                    else:
+                        print(f"[Profiler] Trace guardado en {profiler.DumpTrace('trace.json')}")
+                        profiler.enabled = overlay.visible
+
+                if event.key == pygame.K_r:
+                    if cameraPath is None:
+                        cameraPath = CameraPath()
+                        recordStart = rend.elapsedTime
+                        print("[Benchmark] Grabando recorrido de cámara...")
+                    else:
+                        cameraPath.Save("camera_path.json")
+                        print(f"[Benchmark] {len(cameraPath.keys)} keyframes en camera_path.json")
+                        cameraPath = None
+
+                # -------- FRAGMENT SHADERS (1..4) --------
+                if event.key == pygame.K_1:
+                    currFragmentShader = fragment_shader
+                    rend.SetShaders(currVertexShader, currFragmentShader)
+
+                if event.key == pygame.K_2:
+                    currFragmentShader = toon_shader
+                    rend.SetShaders(currVertexShader, currFragmentShader)
+
+                if event.key == pygame.K_3:
+                    currFragmentShader = negative_shader
+                    rend.SetShaders(currVertexShader, currFragmentShader)
+
+                if event.key == pygame.K_4:
+                    currFragmentShader = magma_shader
+                    rend.SetShaders(currVertexShader, currFragmentShader)
+
+                # -------- VERTEX SHADERS (7..0) ----------
+                if event.key == pygame.K_7:
+                    currVertexShader = vertex_shader
+                    rend.SetShaders(currVertexShader, currFragmentShader)
+
+                if event.key == pygame.K_8:
+                    currVertexShader = fat_shader
+                    rend.SetShaders(currVertexShader, currFragmentShader)
+
+                if event.key == pygame.K_9:
+                    currVertexShader = water_shader
+                    rend.SetShaders(currVertexShader, currFragmentShader)
+
+                if event.key == pygame.K_0:
+                    currVertexShader = twist_shader
+                    rend.SetShaders(currVertexShader, currFragmentShader)
+
+        # --- Movimiento de cámara con flechas ---
+        cam_speed = 3.0
+        if keys[K_UP]:
+            rend.camera.position.z += cam_speed * deltaTime
+        if keys[K_DOWN]:
+            rend.camera.position.z -= cam_speed * deltaTime
+        if keys[K_RIGHT]:
+            rend.camera.position.x += cam_speed * deltaTime
+        if keys[K_LEFT]:
+            rend.camera.position.x -= cam_speed * deltaTime
+
+        # --- Mover luz con WASD+Q/E ---
+        light_speed = 10.0
+        if keys[K_w]:
+            rend.pointLight.z -= light_speed * deltaTime
+        if keys[K_s]:
+            rend.pointLight.z += light_speed * deltaTime
+        if keys[K_a]:
+            rend.pointLight.x -= light_speed * deltaTime
+        if keys[K_d]:
+            rend.pointLight.x += light_speed * deltaTime
+        if keys[K_q]:
+            rend.pointLight.y -= light_speed * deltaTime
+        if keys[K_e]:
+            rend.pointLight.y += light_speed * deltaTime
+
+        # --- Parámetro 'value' para vertex shaders (0..1) ---
+        if keys[K_z]:
+            if rend.value > 0.0:
+                rend.value = max(0.0, rend.value - 1.0 * deltaTime)
+        if keys[K_x]:
+            if rend.value < 1.0:
+                rend.value = min(1.0, rend.value + 1.0 * deltaTime)
+
+        if cameraPath is not None:
+            cameraPath.Record(rend, rend.elapsedTime - recordStart)
+
+        # Rotación suave del modelo para apreciar los efectos
+        faceModel.rotation.y += 45.0 * deltaTime
+
+        rend.Render()
+        with profiler.Section("overlay"):
+            overlay.Render(width, height)
+        pygame.display.flip()
+        profiler.EndFrame()
+
+    rend.assetLoader.Shutdown()
+    pygame.quit()
+
+
+# Guardia necesaria: AssetLoader usa procesos con spawn, que vuelven a importar este módulo
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# assetcache.py
+# (mantén este comentario con el nombre del archivo)
+
+import hashlib
+import json
+import os
+import struct
+
+import numpy as np
+
+
+# Formato:  MAGIC | version u32 | reservado u32 | largo del header u64 | header JSON | arrays
+# Cada array empieza alineado a ALIGN bytes para poder mapearlo con numpy.memmap.
+MAGIC = b"OGLCACHE"
+ALIGN = 64
+
+_PREFIX = struct.Struct("<8sIIQ")
+
+
+def default_cache_dir(source):
+    """Carpeta .assetcache junto al archivo fuente."""
+    return os.path.join(os.path.dirname(os.path.abspath(source)), ".assetcache")
+
+
+def cache_path(source, kind, cacheDir=None):
+    """Ruta del blob para 'source', distinta por ruta absoluta y tipo de asset."""
+    src = os.path.abspath(source)
+    digest = hashlib.sha1(src.encode("utf-8")).hexdigest()[:16]
+    folder = cacheDir or default_cache_dir(src)
+    return os.path.join(folder, f"{os.path.basename(src)}.{digest}.{kind}")
+
+
+def source_signature(paths):
+    """[ [ruta absoluta, mtime_ns, tamaño], ... ]; None en mtime/tamaño si no existe."""
+    sig = []
+    for p in paths:
+        if not p:
+            continue
+        p = os.path.abspath(p)
+        try:
+            st = os.stat(p)
+            sig.append([p, st.st_mtime_ns, st.st_size])
+        except OSError:
+            sig.append([p, None, None])
+    return sig
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_blob(path, version, sources, arrays, meta=None):
+    """
+    Escribe 'arrays' (dict nombre -> ndarray) y 'meta' (dict JSON) en 'path'.
+    'sources' es la lista de archivos de los que depende; si alguno cambia
+    (mtime o tamaño) el blob deja de ser válido. Devuelve False si no se pudo.
+    """
+    header = {"sources": source_signature(sources), "meta": meta or {}, "arrays": {}}
+
+    arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+
+    # Los offsets dependen del largo del header, que depende de los offsets:
+    # se reserva espacio de sobra y se rellena con espacios.
+    layout = {name: {"dtype": a.dtype.str, "shape": list(a.shape), "offset": 0}
+              for name, a in arrays.items()}
+    header["arrays"] = layout
+    reserve = _align(_PREFIX.size + len(json.dumps(header).encode("utf-8")) + 32 * len(arrays) + ALIGN)
+
+    offset = reserve
+    for name, a in arrays.items():
+        layout[name]["offset"] = offset
+        offset = _align(offset + a.nbytes)
+
+    text = json.dumps(header).encode("utf-8")
+    text = text + b" " * (reserve - _PREFIX.size - len(text))
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, version, 0, len(text)))
+            f.write(text)
+            for name, a in arrays.items():
+                f.seek(layout[name]["offset"])
+                f.write(a.tobytes())
+            f.truncate(offset)
+        os.replace(tmp, path)
+        return True
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return False
+
+
+def read_blob(path, version):
+    """
+    Abre un blob válido y devuelve (meta, arrays) con los arrays como
+    numpy.memmap de solo lectura; None si no existe, es de otra versión o
+    alguna de sus fuentes cambió.
+    """
+    try:
+        with open(path, "rb") as f:
+            magic, ver, _, size = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC or ver != version:
+                return None
+            header = json.loads(f.read(size).decode("utf-8"))
+    except (OSError, ValueError, struct.error):
+        return None
+
+    sources = header.get("sources", [])
+    if source_signature([s[0] for s in sources]) != sources:
+        return None
+
+    arrays = {}
+    for name, info in header["arrays"].items():
+        shape = tuple(info["shape"])
+        if 0 in shape:
+            arrays[name] = np.zeros(shape, dtype=info["dtype"])
+        else:
+            arrays[name] = np.memmap(path, dtype=info["dtype"], mode="r",
+                                     offset=info["offset"], shape=shape)
+    return header["meta"], arrays
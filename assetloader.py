@@ -0,0 +1,191 @@
+# assetloader.py
+# (mantén este comentario con el nombre del archivo)
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import multiprocessing
+import os
+import queue
+
+from model import Model, load_mesh_data
+from skybox import Skybox, load_cubemap
+from texturecache import (DEFAULT_SAMPLER, compression_supported, levels_bytes, read_texture,
+                          texture_bytes, textureCache, upload_levels_steps, upload_texture_steps)
+
+
+class AssetLoader(object):
+    """
+    Carga de assets en segundo plano:
+      - OBJ -> arrays finales en un pool de procesos (parseo y triangulación son CPU puro)
+      - PNG/JPG -> bytes en un pool de hilos (la decodificación de pygame suelta el GIL);
+        si la textura tiene contenedor de texturebuild.py se mapea y no se decodifica nada
+      - Update(), llamado una vez por frame desde el hilo de render, hace todo lo
+        que toca GL y sube como máximo ~uploadBudget bytes por frame
+    LoadModel() devuelve el Model al instante; se dibuja como una caja hasta que
+    sus buffers terminan de subir.
+    """
+    def __init__(self, workers=None, uploadBudget=8 << 20, useProcesses=True):
+        self.uploadBudget = uploadBudget
+        self.chunkBytes = max(64 << 10, uploadBudget // 4)
+
+        workers = workers or max(1, min(4, (os.cpu_count() or 1)))
+        self.threadPool = ThreadPoolExecutor(workers, thread_name_prefix="assets")
+
+        # Con spawn, como batchrender.py y benchmark.py: un fork copiaría el
+        # contexto GL y podría heredar un lock tomado por otro hilo (malloc,
+        # import, decodificador de pygame). El script que lo use necesita la
+        # guardia __main__; si no la tiene, useProcesses=False (todo en hilos)
+        self.processPool = None
+        if useProcesses:
+            self.processPool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+
+        self.finished = queue.Queue()  # (callback, future) terminados, para el hilo de render
+        self.uploads = deque()         # generadores de subida a GL (entregan bytes)
+        self.pendingTextures = {}      # key de textureCache -> [callbacks] mientras se decodifica
+
+        self.pending = 0               # trabajos en los pools
+        self.bytesUploaded = 0
+
+    # -------------- Pedidos ----------------
+
+    def LoadModel(self, filename, materials=True, **options):
+        """
+        Model vacío al instante; el OBJ se procesa en el pool y los buffers se
+        suben desde Update(). Con materials=True también carga sus map_Kd.
+        'options' son los de Model (useCache, cacheDir, indexed, optimizeCache,
+        lodLevels, lodRatio, vertexFormat).
+        """
+        model = Model(filename, load=False, **options)
+
+        def ready(future):
+            arrays = model.ApplyMeshData(future.result())
+            self.uploads.append(model.UploadSteps(arrays, self.chunkBytes))
+            if materials:
+                self.LoadMaterialTextures(model)
+
+        self._Submit(self.processPool or self.threadPool, ready, load_mesh_data, filename, **options)
+        return model
+
+    def LoadMaterialTextures(self, model):
+        """Equivalente asíncrono de Model.LoadMaterialTextures()."""
+        paths = {sub["texture"] for sub in model.submeshes if sub["texture"]}
+        for path in sorted(paths - set(model.materialTextures)):
+            def ready(tex_id, path=path):
+                model.materialTextures[path] = tex_id
+                model.textureRefs.append(tex_id)
+            self.LoadTexture(path, ready)
+
+    def LoadTexture(self, filename, onReady, sampler=DEFAULT_SAMPLER):
+        """
+        Llama onReady(tex_id) desde Update() con una textura de textureCache
+        (con una referencia a nombre de quien la pidió). Pedidos repetidos de
+        una textura que se está decodificando esperan a la misma decodificación.
+        """
+        key = textureCache.Key(filename, sampler)
+        tex_id = textureCache.Lookup(key)
+        if tex_id is not None:
+            onReady(tex_id)
+            return
+        if key in self.pendingTextures:
+            self.pendingTextures[key].append(onReady)
+            return
+        if not os.path.isfile(filename):
+            print(f"[Assets] ⚠ No existe la textura: {filename}")
+            return
+
+        self.pendingTextures[key] = [onReady]
+
+        def ready(future):
+            try:
+                texture = future.result()
+            except Exception:
+                del self.pendingTextures[key]
+                raise
+            if isinstance(texture, dict):
+                steps = upload_levels_steps(texture, sampler)
+                nbytes = levels_bytes(texture, sampler)
+            else:
+                w, h, pixels = texture
+                steps = upload_texture_steps(w, h, pixels, sampler, self.chunkBytes)
+                nbytes = texture_bytes(w, h, sampler)
+            self.uploads.append(self._TextureSteps(key, steps, nbytes))
+
+        # El soporte de S3TC se consulta acá: en el hilo del pool no hay contexto GL
+        self._Submit(self.threadPool, ready, read_texture, filename, compression_supported())
+
+    def LoadSkybox(self, renderer, textureList):
+        """
+        Pone un Skybox en 'renderer' que empieza a dibujarse cuando llegan sus 6
+        caras (desde la caché .cubemap o decodificadas en paralelo, con mipmaps).
+        """
+        skybox = Skybox(textureList, load=False)
+        renderer.skybox = skybox
+
+        def ready(future):
+            self.uploads.append(skybox.UploadLevelsSteps(future.result(), self.chunkBytes))
+        self._Submit(self.threadPool, ready, load_cubemap, textureList)
+        return skybox
+
+    # -------------- Hilo de render ----------------
+
+    def Update(self):
+        """
+        Procesa lo que terminaron los pools y sube hasta ~uploadBudget bytes.
+        Llamar una vez por frame con el contexto GL activo. Devuelve los bytes subidos.
+        """
+        while True:
+            try:
+                callback, future = self.finished.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            try:
+                callback(future)
+            except Exception as e:
+                print(f"[Assets] ✖ Error cargando asset: {e}")
+
+        spent = 0
+        while self.uploads and spent < self.uploadBudget:
+            try:
+                spent += next(self.uploads[0])
+            except StopIteration:
+                self.uploads.popleft()
+            except Exception as e:
+                # Una subida que falla se descarta: si quedara primera fallaría en cada frame
+                self.uploads.popleft()
+                print(f"[Assets] ✖ Error subiendo asset: {e}")
+
+        self.bytesUploaded += spent
+        return spent
+
+    def Busy(self):
+        return self.pending > 0 or bool(self.uploads) or not self.finished.empty()
+
+    def Shutdown(self):
+        """Cancela lo que no empezó y espera a los trabajos en curso."""
+        self.threadPool.shutdown(wait=True, cancel_futures=True)
+        if self.processPool is not None:
+            self.processPool.shutdown(wait=True, cancel_futures=True)
+
+    # -------------- Internos ----------------
+
+    def _Submit(self, pool, callback, fn, *args, **kwargs):
+        self.pending += 1
+        future = pool.submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda f: self.finished.put((callback, f)))
+
+    def _TextureSteps(self, key, steps, nbytes):
+        try:
+            tex_id = yield from steps
+        except Exception:
+            # Un pedido nuevo de la misma textura vuelve a intentarlo desde cero
+            self.pendingTextures.pop(key, None)
+            raise
+
+        callbacks = self.pendingTextures.pop(key)
+        textureCache.misses += 1
+        textureCache.Insert(key, tex_id, nbytes, refs=len(callbacks))
+        for onReady in callbacks:
+            onReady(tex_id)
+
@@ -0,0 +1,174 @@
+# batchrender.py
+# (mantén este comentario con el nombre del archivo)
+#
+# Render por lotes en varios procesos, cada uno con su contexto offscreen
+# (headless.py). Para hojas de revisión: cada combinación de vertex shader x
+# fragment shader x ángulo de cámara (x value / time) de uno o más modelos.
+#
+#   python batchrender.py "models/Count Batula.obj" --angles 8 --workers 4
+#   python batchrender.py "models/Count Batula.obj" --angles 4 --benchmark 1,2,4
+
+import headless   # primero: elige EGL antes de que se importe OpenGL
+
+import argparse
+import itertools
+import math
+import multiprocessing
+import os
+import re
+import time
+
+import fragmentShaders
+import vertexShaders
+
+
+def shader_names(module):
+    """Nombres de los shaders de un módulo (variables '*_shader' de texto, sin las *_instanced)."""
+    return [name for name, value in vars(module).items()
+            if isinstance(value, str) and name.endswith("_shader") and not name.startswith("_")]
+
+
+def _slug(path):
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", os.path.splitext(os.path.basename(path))[0])
+
+
+def sweep_jobs(models, vertexNames=None, fragmentNames=None, angles=8, values=(0.0,), times=(0.0,),
+               outputDir="frames"):
+    """
+    Lista de trabajos (dicts) con todas las combinaciones. 'angles' es una
+    cantidad (vuelta completa repartida) o una lista de ángulos en grados.
+    Los trabajos quedan agrupados por modelo y par de shaders, que es el
+    orden en que conviene dibujarlos (menos cambios de estado por proceso).
+    """
+    vertexNames = vertexNames or shader_names(vertexShaders)
+    fragmentNames = fragmentNames or shader_names(fragmentShaders)
+    if isinstance(angles, int):
+        angles = [360.0 * i / angles for i in range(angles)]
+
+    jobs = []
+    for model, vs, fs, value, t, angle in itertools.product(models, vertexNames, fragmentNames,
+                                                           values, times, angles):
+        name = f"{_slug(model)}_{vs}_{fs}_v{value:g}_t{t:g}_a{angle:05.1f}.png"
+        jobs.append({"model": model, "vertex": vs, "fragment": fs, "angle": angle,
+                     "value": value, "time": t, "output": os.path.join(outputDir, name)})
+    return jobs
+
+
+def warm_caches(models):
+    """
+    Deja escrita la caché de malla (memmap) de cada modelo antes de lanzar los
+    procesos: así ninguno vuelve a leer el OBJ y todos comparten las mismas
+    páginas del archivo.
+    """
+    from model import load_mesh_data
+    for path in models:
+        load_mesh_data(path)
+
+
+# -------------- Proceso de trabajo ----------------
+
+_worker = None
+
+
+class _Worker(object):
+    """Estado de cada proceso: contexto, Renderer y modelos ya cargados."""
+    def __init__(self, width, height, elevation, shaderDir):
+        self.context = headless.HeadlessContext(width, height)
+
+        # Después del contexto: estos módulos usan GL
+        from gl import Renderer
+        from shaderprogram import shaderCache
+        shaderCache.binaryDir = shaderDir   # el primer proceso compila, los demás cargan el binario
+
+        self.renderer = Renderer(width=width, height=height)
+        self.elevation = elevation
+        self.models = {}
+
+    def Model(self, path):
+        if path not in self.models:
+            from model import Model
+            model = Model(path)
+            model.LoadMaterialTextures()
+            self.models[path] = model
+        return self.models[path]
+
+    def Run(self, jobs):
+        reader = headless.PixelReader(self.renderer.width, self.renderer.height)
+        written = []
+        for job in jobs:
+            model = self.Model(job["model"])
+            self.renderer.scene = [model]
+            self.renderer.SetShaders(getattr(vertexShaders, job["vertex"]), getattr(fragmentShaders, job["fragment"]))
+            self.renderer.value = job["value"]
+            self.renderer.elapsedTime = job["time"]
+            headless.turntable(self.renderer, model, self.elevation)(job["angle"])
+
+            self.renderer.Render()
+            done = reader.Read(job["output"])
+            if done is not None:
+                written.append(headless.save_image(done[1], done[0]))
+        for path, pixels in reader.Flush():
+            written.append(headless.save_image(pixels, path))
+        reader.Delete()
+        return written
+
+
+def _init_worker(width, height, elevation, shaderDir):
+    global _worker
+    _worker = _Worker(width, height, elevation, shaderDir)
+
+
+def _run_chunk(jobs):
+    return _worker.Run(jobs)
+
+
+def render_jobs(jobs, workers=None, width=640, height=360, elevation=15.0,
+                shaderDir=".assetcache/shaders", chunkSize=None):
+    """
+    Reparte 'jobs' en 'workers' procesos (por defecto uno por CPU) en bloques
+    consecutivos y devuelve (rutas escritas, segundos). Los procesos se
+    crean con 'spawn': cada uno arma su propio contexto GL desde cero.
+    """
+    workers = workers or os.cpu_count() or 1
+    warm_caches(sorted({job["model"] for job in jobs}))
+    if chunkSize is None:
+        chunkSize = max(1, math.ceil(len(jobs) / (workers * 4)))
+    chunks = [jobs[i:i + chunkSize] for i in range(0, len(jobs), chunkSize)]
+
+    start = time.perf_counter()
+    spawn = multiprocessing.get_context("spawn")
+    with spawn.Pool(workers, _init_worker, (width, height, elevation, shaderDir)) as pool:
+        written = [path for paths in pool.imap_unordered(_run_chunk, chunks) for path in paths]
+    return written, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render por lotes: modelos x shaders x ángulos, en varios procesos.")
+    parser.add_argument("models", nargs="+")
+    parser.add_argument("--vertex", help="shaders de vertexShaders.py separados por coma (default: todos)")
+    parser.add_argument("--fragment", help="shaders de fragmentShaders.py separados por coma (default: todos)")
+    parser.add_argument("--angles", type=int, default=8, help="ángulos por vuelta")
+    parser.add_argument("--values", default="0", help="valores de 'value' separados por coma")
+    parser.add_argument("--times", default="0", help="valores de 'time' separados por coma")
+    parser.add_argument("--size", default="640x360", help="ANCHOxALTO")
+    parser.add_argument("--elevation", type=float, default=15.0)
+    parser.add_argument("--out", default="frames")
+    parser.add_argument("--workers", type=int, default=None, help="procesos (default: uno por CPU)")
+    parser.add_argument("--benchmark", help="lista de cantidades de procesos a comparar, p.ej. 1,2,4")
+    args = parser.parse_args(argv)
+
+    def split(text, kind=str):
+        return [kind(v) for v in text.split(",")] if text else None
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    jobs = sweep_jobs(args.models, split(args.vertex), split(args.fragment), args.angles,
+                      split(args.values, float), split(args.times, float), args.out)
+
+    for workers in split(args.benchmark, int) or [args.workers]:
+        written, seconds = render_jobs(jobs, workers, width, height, args.elevation)
+        print(f"[Batch] {len(written)} frames, {workers or os.cpu_count()} procesos: "
+              f"{seconds:.2f} s ({len(written) / seconds:.1f} frames/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+# benchmark.py
+# (mantén este comentario con el nombre del archivo)
+#
+# Benchmark reproducible sin ventana (headless.py: EGL, sirve con llvmpipe en
+# cualquier Linux). Cada escena corre en su propio proceso (RSS pico aislado)
+# con cada combinación de shaders, siguiendo el mismo recorrido de cámara.
+#
+#   python benchmark.py --scenes batula:1,batula:64,sphere:200000 --out bench.json
+#   python benchmark.py --path camera_path.json --shaders vertex_shader/toon_shader
+#   python benchmark.py --baseline bench_anterior.json
+
+import headless   # primero: elige EGL antes de que se importe OpenGL
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import time
+
+import numpy as np
+
+import fragmentShaders
+import vertexShaders
+from batchrender import shader_names, warm_caches
+from camerapath import CameraPath
+
+
+BATULA = "models/Count Batula.obj"
+BENCHMARK_DIR = ".assetcache/benchmark"
+
+
+def sphere_obj(triangles, folder=BENCHMARK_DIR):
+    """
+    Escribe (una vez) una esfera UV de ~'triangles' triángulos con UVs y
+    normales como OBJ y devuelve la ruta. Sirve de malla sintética de tamaño fijo.
+    """
+    stacks = max(2, int(round(math.sqrt(triangles / 4.0))))
+    slices = max(3, int(round(triangles / (2.0 * stacks))))
+    path = os.path.join(folder, f"sphere_{stacks}x{slices}.obj")
+    if os.path.exists(path):
+        return path
+
+    theta = np.linspace(0.0, math.pi, stacks + 1)
+    phi = np.linspace(0.0, 2.0 * math.pi, slices + 1)
+    T, P = np.meshgrid(theta, phi, indexing="ij")
+    normals = np.stack([np.sin(T) * np.cos(P), np.cos(T), np.sin(T) * np.sin(P)], axis=-1).reshape(-1, 3)
+    uvs = np.stack([P / (2.0 * math.pi), 1.0 - T / math.pi], axis=-1).reshape(-1, 2)
+
+    grid = np.arange((stacks + 1) * (slices + 1)).reshape(stacks + 1, slices + 1) + 1   # OBJ empieza en 1
+    a, b = grid[:-1, :-1].ravel(), grid[:-1, 1:].ravel()
+    c, d = grid[1:, :-1].ravel(), grid[1:, 1:].ravel()
+    faces = np.concatenate([np.stack([a, c, d], axis=1), np.stack([a, d, b], axis=1)])
+
+    os.makedirs(folder, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write("".join("v %.6f %.6f %.6f\n" % tuple(v) for v in normals))
+        f.write("".join("vt %.6f %.6f\n" % tuple(t) for t in uvs))
+        f.write("".join("vn %.6f %.6f %.6f\n" % tuple(n) for n in normals))
+        f.write("".join("f {0}/{0}/{0} {1}/{1}/{1} {2}/{2}/{2}\n".format(*face) for face in faces.tolist()))
+    os.replace(tmp, path)
+    return path
+
+
+def parse_scene(text):
+    """'batula:N' (N copias del modelo incluido) o 'sphere:TRIS' (esfera sintética) -> (tipo, número)."""
+    kind, _, count = text.partition(":")
+    if kind not in ("batula", "sphere"):
+        raise ValueError(f"Escena desconocida '{text}' (batula:N o sphere:TRIANGULOS)")
+    return kind, int(count or 1)
+
+
+def build_scene(renderer, kind, count):
+    """Carga la escena en renderer.scene (en grilla, centrada en el origen). Devuelve el radio."""
+    from model import Model
+
+    if kind == "sphere":
+        paths = [sphere_obj(count)]
+    else:
+        paths = [BATULA] * count
+
+    models = []
+    for path in paths:
+        model = Model(path)
+        model.LoadMaterialTextures()
+        models.append(model)
+
+    radius = float(models[0].boundsRadius)
+    side = int(math.ceil(math.sqrt(len(models))))
+    spacing = radius * 2.5
+    for i, model in enumerate(models):
+        row, column = divmod(i, side)
+        offset = np.array([column - (side - 1) / 2.0, 0.0, row - (side - 1) / 2.0]) * spacing
+        model.position.x, model.position.y, model.position.z = offset - np.asarray(model.boundsCenter)
+    renderer.scene = models
+    return spacing * side / 2.0 + radius
+
+
+def frame_stats(times):
+    times = np.asarray(times)
+    return {"mean": float(times.mean()), "p50": float(np.percentile(times, 50)),
+            "p95": float(np.percentile(times, 95)), "p99": float(np.percentile(times, 99)),
+            "max": float(times.max())}
+
+
+def run_scene(config):
+    """
+    Corre una escena (en su proceso) con todas las combinaciones de shaders de
+    'config'. El tiempo de frame incluye glFinish: es lo que tarda la GPU (o
+    llvmpipe) en terminar, no solo lo que tarda Python en mandar los comandos.
+    """
+    width, height = config["width"], config["height"]
+    context = headless.HeadlessContext(width, height)
+
+    from OpenGL.GL import glFinish, glGetString, GL_RENDERER, GL_VERSION
+    from gl import Renderer
+    from shaderprogram import shaderCache
+    shaderCache.binaryDir = None   # que todas las corridas compilen igual
+
+    renderer = Renderer(width=width, height=height)
+    renderer.depthPrepass = config["prepass"]
+
+    start = time.perf_counter()
+    radius = build_scene(renderer, *parse_scene(config["scene"]))
+    loadSeconds = time.perf_counter() - start
+
+    path = CameraPath.Load(config["path"]) if config["path"] else CameraPath.Orbit((0, 0, 0), radius * 1.5)
+
+    results = []
+    for vertexName, fragmentName in config["shaders"]:
+        renderer.SetShaders(getattr(vertexShaders, vertexName), getattr(fragmentShaders, fragmentName))
+
+        times = []
+        for i in range(config["warmup"] + config["frames"]):
+            # El calentamiento repite el primer frame; después se recorre el camino completo
+            t = path.duration * max(0, i - config["warmup"]) / max(1, config["frames"] - 1)
+            path.Apply(renderer, t)
+            renderer.elapsedTime = t
+
+            frameStart = time.perf_counter()
+            renderer.Render()
+            glFinish()
+            if i >= config["warmup"]:
+                times.append((time.perf_counter() - frameStart) * 1000.0)
+
+        results.append({"scene": config["scene"], "vertex": vertexName, "fragment": fragmentName,
+                        "frames": config["frames"], "loadSeconds": loadSeconds,
+                        "frameMs": frame_stats(times), "triangles": renderer.triangleCount,
+                        "drawCalls": renderer.drawCalls})
+
+    peakRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0   # KB en Linux
+    gl = {"renderer": glGetString(GL_RENDERER).decode(), "version": glGetString(GL_VERSION).decode()}
+    for result in results:
+        result["peakRssMB"] = peakRss
+    context.Release()
+    return gl, results
+
+
+def compare(results, baseline):
+    """Líneas con el cambio de p50 / p95 respecto a otro JSON del benchmark."""
+    old = {(r["scene"], r["vertex"], r["fragment"]): r for r in baseline["results"]}
+    lines = []
+    for r in results:
+        before = old.get((r["scene"], r["vertex"], r["fragment"]))
+        if before is None:
+            continue
+        deltas = [100.0 * (r["frameMs"][k] / before["frameMs"][k] - 1.0) for k in ("p50", "p95")]
+        lines.append(f"  {r['scene']:<16} {r['vertex']}/{r['fragment']:<16}"
+                     f" p50 {deltas[0]:+6.1f}%  p95 {deltas[1]:+6.1f}%")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de render sin ventana, con salida JSON.")
+    parser.add_argument("--scenes", default="batula:1,batula:64,sphere:200000",
+                        help="batula:N / sphere:TRIANGULOS separados por coma")
+    parser.add_argument("--shaders", default="all",
+                        help="pares vertex/fragment separados por coma, o 'all' (todas las combinaciones)")
+    parser.add_argument("--path", help="CameraPath grabado (JSON); default: una vuelta alrededor de la escena")
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--size", default="640x360", help="ANCHOxALTO")
+    parser.add_argument("--out", default="bench.json")
+    parser.add_argument("--baseline", help="JSON anterior para comparar")
+    parser.add_argument("--prepass", action="store_true", help="con pre-pass de profundidad (Renderer.depthPrepass)")
+    args = parser.parse_args(argv)
+
+    if args.shaders == "all":
+        shaders = [(vs, fs) for vs in shader_names(vertexShaders) for fs in shader_names(fragmentShaders)]
+    else:
+        shaders = [tuple(pair.split("/")) for pair in args.shaders.split(",")]
+    width, height = (int(v) for v in args.size.lower().split("x"))
+
+    configs = [{"scene": scene, "shaders": shaders, "path": args.path, "frames": args.frames,
+                "warmup": args.warmup, "width": width, "height": height, "prepass": args.prepass}
+               for scene in args.scenes.split(",")]
+    # Mallas sintéticas y cachés listas antes de medir: la carga medida es siempre "en caliente"
+    models = set()
+    for config in configs:
+        kind, count = parse_scene(config["scene"])
+        models.add(sphere_obj(count) if kind == "sphere" else BATULA)
+    warm_caches(sorted(models))
+
+    # Un proceso por escena (uno a la vez): RSS pico y estado de GL no se mezclan
+    results, gl = [], None
+    spawn = multiprocessing.get_context("spawn")
+    with spawn.Pool(1, maxtasksperchild=1) as pool:
+        for gl, sceneResults in pool.imap(run_scene, configs):
+            results += sceneResults
+            for r in sceneResults:
+                ms = r["frameMs"]
+                print(f"[Bench] {r['scene']:<16} {r['vertex']}/{r['fragment']:<16} "
+                      f"mean {ms['mean']:7.2f}  p95 {ms['p95']:7.2f}  p99 {ms['p99']:7.2f} ms  "
+                      f"carga {r['loadSeconds']:.2f} s  RSS {r['peakRssMB']:.0f} MB")
+
+    report = {"machine": {"platform": platform.platform(), "python": platform.python_version(),
+                          "cpus": os.cpu_count(), "gl": gl},
+              "config": {"size": [width, height], "frames": args.frames, "warmup": args.warmup,
+                         "path": args.path, "prepass": args.prepass},
+              "results": results}
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"[Bench] Resultados en {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            print("\n".join(["[Bench] Cambio respecto a " + args.baseline] + compare(results, json.load(f))))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,39 @@
 
 import glm # pip install PyGLM
 from OpenGL.GL import *
-from numpy import array, float32
+from numpy import asarray, float32, uint8, uint16, uint32
 
 
 class Buffer(object):
-	def __init__(self, data):
+	def __init__(self, data, upload = True, usage = GL_STATIC_DRAW):
 		self.data = data
+		self.usage = usage  # GL_DYNAMIC_DRAW para datos que cambian seguido
 
-		# Vertex Buffer 
-		self.vertexBuffer = array(self.data, dtype = float32)
+		# Vertex Buffer
+		self.vertexBuffer = asarray(self.data, dtype = float32).reshape(-1)
 
 		# Vertex Buffer Object
 		self.VBO = glGenBuffers(1)
 
+		# Se sube una sola vez; MarkDirty() fuerza otra subida
+		# (con upload=False queda pendiente, p. ej. para UploadSteps)
+		self.dirty = True
+		if upload:
+			self.Upload()
 
-	def Use(self, attribNumber, size):
+
+	def MarkDirty(self):
+		self.dirty = True
+
+
+	def SetData(self, data):
+		# Reemplaza el contenido (puede cambiar de tamaño); se sube en el próximo Use/Upload
+		self.data = data
+		self.vertexBuffer = asarray(self.data, dtype = float32).reshape(-1)
+		self.dirty = True
+
+
+	def Upload(self):
 
 		glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
 
@@ -24,7 +42,23 @@ class Buffer(object):
 		glBufferData(GL_ARRAY_BUFFER,               # Buffer ID
 					 self.vertexBuffer.nbytes,      # Buffer size in bytes
 					 self.vertexBuffer,             # Buffer data
-					 GL_STATIC_DRAW)                # Usage
+					 self.usage)                    # Usage
+
+		self.dirty = False
+
+
+	def UploadSteps(self, chunkBytes = None):
+		# Generador: sube el buffer por partes y entrega los bytes de cada parte
+		yield from upload_steps(GL_ARRAY_BUFFER, self.VBO, self.vertexBuffer, chunkBytes)
+		self.dirty = False
+
+
+	def Use(self, attribNumber, size):
+
+		glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+
+		if self.dirty:
+			self.Upload()
 
 		# Atributo
 		glVertexAttribPointer(attribNumber,			# Attribute Number
@@ -35,4 +69,158 @@ class Buffer(object):
 							  ctypes.c_void_p(0))	# Offset
 
 		glEnableVertexAttribArray(attribNumber)
-		
\ No newline at end of file
+
+
+	def UseMatrix(self, attribNumber, divisor = 1):
+
+		glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+
+		if self.dirty:
+			self.Upload()
+
+		# Un mat4 ocupa 4 atributos vec4 seguidos (una columna cada uno);
+		# con divisor 1 avanza una vez por instancia en vez de por vértice
+		for column in range(4):
+			glVertexAttribPointer(attribNumber + column, 4, GL_FLOAT, GL_FALSE,
+								  64, ctypes.c_void_p(16 * column))
+			glEnableVertexAttribArray(attribNumber + column)
+			glVertexAttribDivisor(attribNumber + column, divisor)
+
+
+	def Delete(self):
+		if self.VBO is not None:
+			glDeleteBuffers(1, [self.VBO])
+			self.VBO = None
+
+
+class InterleavedBuffer(object):
+	def __init__(self, data, attributes, upload = True, usage = GL_STATIC_DRAW):
+		# 'data': array estructurado (un registro por vértice, p. ej. mesh.PACKED_VERTEX)
+		# 'attributes': [(location, componentes, tipo GL, normalizado, offset), ...]
+		self.data = asarray(data)
+		self.attributes = attributes
+		self.stride = self.data.dtype.itemsize
+		self.usage = usage
+
+		self.VBO = glGenBuffers(1)
+
+		self.dirty = True
+		if upload:
+			self.Upload()
+
+
+	def MarkDirty(self):
+		self.dirty = True
+
+
+	def Upload(self):
+
+		glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+		glBufferData(GL_ARRAY_BUFFER, self.data.nbytes, self.data, self.usage)
+
+		self.dirty = False
+
+
+	def UploadSteps(self, chunkBytes = None):
+		yield from upload_steps(GL_ARRAY_BUFFER, self.VBO, self.data, chunkBytes)
+		self.dirty = False
+
+
+	def Use(self):
+
+		glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+
+		if self.dirty:
+			self.Upload()
+
+		# Todos los atributos salen del mismo VBO, separados por 'stride'
+		for attribNumber, size, glType, normalized, offset in self.attributes:
+			glVertexAttribPointer(attribNumber, size, glType, normalized,
+								  self.stride, ctypes.c_void_p(offset))
+			glEnableVertexAttribArray(attribNumber)
+
+
+	def Delete(self):
+		if self.VBO is not None:
+			glDeleteBuffers(1, [self.VBO])
+			self.VBO = None
+
+
+class IndexBuffer(object):
+	def __init__(self, data, upload = True):
+		self.data = data
+
+		# Index Buffer (uint16 o uint32 segun el dtype recibido)
+		self.indexBuffer = asarray(self.data).reshape(-1)
+		if self.indexBuffer.dtype not in (uint16, uint32):
+			self.indexBuffer = self.indexBuffer.astype(uint32)
+
+		self.count = len(self.indexBuffer)
+		self.type = GL_UNSIGNED_SHORT if self.indexBuffer.dtype == uint16 else GL_UNSIGNED_INT
+
+		# Element Buffer Object
+		self.EBO = glGenBuffers(1)
+
+		self.dirty = True
+		if upload:
+			self.Upload()
+
+
+	def MarkDirty(self):
+		self.dirty = True
+
+
+	def Upload(self):
+
+		glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.EBO)
+
+		glBufferData(GL_ELEMENT_ARRAY_BUFFER,
+					 self.indexBuffer.nbytes,
+					 self.indexBuffer,
+					 GL_STATIC_DRAW)
+
+		self.dirty = False
+
+
+	def UploadSteps(self, chunkBytes = None):
+		# El EBO se liga fuera de cualquier VAO para no pisar el del VAO activo
+		glBindVertexArray(0)
+		yield from upload_steps(GL_ELEMENT_ARRAY_BUFFER, self.EBO, self.indexBuffer, chunkBytes)
+		self.dirty = False
+
+
+	def Use(self):
+
+		# Con un VAO ligado, el EBO queda guardado en el VAO
+		glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.EBO)
+
+		if self.dirty:
+			self.Upload()
+
+
+	def Delete(self):
+		if self.EBO is not None:
+			glDeleteBuffers(1, [self.EBO])
+			self.EBO = None
+
+
+def upload_steps(target, bufferId, data, chunkBytes = None):
+	"""
+	Reserva el buffer y lo llena con glBufferSubData en partes de 'chunkBytes'
+	(todo de una vez si es None), entregando los bytes subidos en cada parte.
+	Entre partes se puede usar el contexto para otras cosas: se vuelve a ligar.
+	"""
+	raw = data.reshape(-1).view(uint8)
+	if chunkBytes is None or raw.nbytes <= chunkBytes:
+		glBindBuffer(target, bufferId)
+		glBufferData(target, raw.nbytes, raw, GL_STATIC_DRAW)
+		yield raw.nbytes
+		return
+
+	glBindBuffer(target, bufferId)
+	glBufferData(target, raw.nbytes, None, GL_STATIC_DRAW)
+	for start in range(0, raw.nbytes, chunkBytes):
+		part = raw[start:start + chunkBytes]
+		glBindBuffer(target, bufferId)
+		glBufferSubData(target, start, part.nbytes, part)
+		yield part.nbytes
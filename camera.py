@@ -15,10 +15,18 @@ class Camera(object):
 
 		self.viewMatrix = None
 
+		# Estado con el que se calculó viewMatrix (Update no recalcula si no cambió)
+		self.viewState = None
+
 		self.CreateProjectionMatrix(60, 0.1, 1000)
 
 
 	def Update(self):
+		if self.viewState is not None and self.viewState[0] == self.position and self.viewState[1] == self.rotation:
+			return
+
+		self.viewState = (glm.vec3(self.position), glm.vec3(self.rotation))
+
 		# M = T * R
 		# R = pitchMat * yawMat * rollMat
 
@@ -0,0 +1,76 @@
+# camerapath.py
+# (mantén este comentario con el nombre del archivo)
+
+import json
+import math
+
+import glm
+import numpy as np
+
+
+class CameraPath(object):
+    """
+    Recorrido de cámara y luz grabado como keyframes (tiempo, posición,
+    rotación de la cámara y Renderer.pointLight), para repetir exactamente
+    el mismo movimiento (benchmark.py) o grabarlo desde la app.
+      - Record(renderer, t) agrega el estado actual
+      - Apply(renderer, t) lo reproduce interpolando linealmente
+      - Save() / Load() en JSON
+    """
+    def __init__(self, keys=None):
+        self.keys = keys or []   # [{"t", "position", "rotation", "light"}, ...] ordenados por t
+
+    @property
+    def duration(self):
+        return self.keys[-1]["t"] if self.keys else 0.0
+
+    def Record(self, renderer, t):
+        self.keys.append({"t": float(t),
+                          "position": list(renderer.camera.position),
+                          "rotation": list(renderer.camera.rotation),
+                          "light": list(renderer.pointLight)})
+
+    def Sample(self, t):
+        """(posición, rotación, luz) en el tiempo t (se queda en los extremos fuera del rango)."""
+        if not self.keys:
+            raise ValueError("CameraPath vacío")
+        times = [key["t"] for key in self.keys]
+        i = int(np.searchsorted(times, t, side="right"))
+        if i == 0:
+            a = b = self.keys[0]
+        elif i == len(self.keys):
+            a = b = self.keys[-1]
+        else:
+            a, b = self.keys[i - 1], self.keys[i]
+
+        span = b["t"] - a["t"]
+        f = (t - a["t"]) / span if span > 0 else 0.0
+        return tuple(glm.mix(glm.vec3(a[name]), glm.vec3(b[name]), f)
+                     for name in ("position", "rotation", "light"))
+
+    def Apply(self, renderer, t):
+        position, rotation, light = self.Sample(t)
+        renderer.camera.position = position
+        renderer.camera.rotation = rotation
+        renderer.pointLight = light
+
+    def Save(self, filename):
+        with open(filename, "w") as f:
+            json.dump({"keys": self.keys}, f, indent=1)
+
+    @staticmethod
+    def Load(filename):
+        with open(filename) as f:
+            return CameraPath(json.load(f)["keys"])
+
+    @staticmethod
+    def Orbit(center, radius, height=0.0, duration=8.0, keys=32):
+        """Una vuelta alrededor de 'center' mirando siempre al centro, con la luz en la cámara."""
+        cx, cy, cz = center
+        path = CameraPath()
+        for k in range(keys + 1):
+            angle = 2.0 * math.pi * k / keys
+            position = [cx + radius * math.sin(angle), cy + height, cz + radius * math.cos(angle)]
+            path.keys.append({"t": duration * k / keys, "position": position,
+                              "rotation": [0.0, math.degrees(angle), 0.0], "light": position})
+        return path
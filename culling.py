@@ -0,0 +1,94 @@
+# culling.py
+# (mantén este comentario con el nombre del archivo)
+#
+# Frustum culling en CPU (solo numpy, no necesita contexto GL). Las matrices
+# por objeto van por columnas como glm / transforms.model_matrices: (N, 4, 4).
+
+import numpy as np
+
+
+def frustum_planes(viewProjection):
+    """
+    Los 6 planos (izq, der, abajo, arriba, cerca, lejos) de projection * view
+    como array (6, 4) [nx, ny, nz, d] normalizados y apuntando hacia adentro:
+    un punto p está del lado visible si n·p + d >= 0 (Gribb / Hartmann).
+    """
+    m = np.array(viewProjection, dtype=np.float64)   # glm -> filas de la matriz
+    if m.shape != (4, 4):
+        raise ValueError("Se esperaba una matriz 4x4")
+
+    planes = np.array([m[3] + m[0], m[3] - m[0],
+                       m[3] + m[1], m[3] - m[1],
+                       m[3] + m[2], m[3] - m[2]])
+    planes /= np.linalg.norm(planes[:, :3], axis=1)[:, None]
+    return planes
+
+
+def transform_bounds(matrices, boundsMin, boundsMax):
+    """
+    AABB en mundo de cajas locales transformadas por 'matrices' (N, 4, 4).
+    boundsMin/Max pueden ser (3,) (la misma caja para todos) o (N, 3).
+    Devuelve (mins, maxs) (N, 3); la caja resultante contiene a la caja rotada.
+    """
+    matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 4)
+    boundsMin = np.asarray(boundsMin, dtype=np.float64)
+    boundsMax = np.asarray(boundsMax, dtype=np.float64)
+
+    center = (boundsMin + boundsMax) * 0.5
+    extent = (boundsMax - boundsMin) * 0.5
+
+    # matrices[i][c] es la columna c: world = sum_c columna_c * local_c
+    linear = matrices[:, :3, :3]
+    worldCenter = np.einsum("...c,...cr->...r", center, linear) + matrices[:, 3, :3]
+    worldExtent = np.einsum("...c,...cr->...r", extent, np.abs(linear))
+    return worldCenter - worldExtent, worldCenter + worldExtent
+
+
+def transform_spheres(matrices, center, radius):
+    """Esferas en mundo (centros (N, 3), radios (N,)); el radio se escala por el mayor eje."""
+    matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 4)
+    linear = matrices[:, :3, :3]
+    worldCenter = np.einsum("...c,...cr->...r", np.asarray(center, dtype=np.float64), linear) \
+        + matrices[:, 3, :3]
+    scale = np.linalg.norm(linear, axis=2).max(axis=1)
+    return worldCenter, np.asarray(radius, dtype=np.float64) * scale
+
+
+def screen_sizes(centers, radii, viewMatrix, projectionMatrix, screenHeight):
+    """
+    Diámetro aproximado en pixeles de esferas en mundo vistas con la cámara
+    (perspectiva). Si la cámara está dentro o muy cerca, da al menos la pantalla.
+    """
+    view = np.array(viewMatrix, dtype=np.float64)          # glm -> filas
+    focal = float(np.array(projectionMatrix, dtype=np.float64)[1, 1])
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+    radii = np.asarray(radii, dtype=np.float64).reshape(-1)
+
+    depth = -(centers @ view[2, :3] + view[2, 3])
+    return radii * focal * screenHeight / np.maximum(depth, np.maximum(radii, 1e-6))
+
+
+def view_depths(centers, viewMatrix):
+    """Distancia (N,) a la cámara a lo largo de la vista (-Z en espacio de cámara) de cada centro."""
+    view = np.array(viewMatrix, dtype=np.float64)          # glm -> filas
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+    return -(centers @ view[2, :3] + view[2, 3])
+
+
+def spheres_visible(planes, centers, radii):
+    """Máscara (N,) de esferas que tocan el frustum (conservador: puede dejar pasar alguna)."""
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+    distances = centers @ planes[:, :3].T + planes[:, 3]
+    return (distances >= -np.asarray(radii, dtype=np.float64).reshape(-1, 1)).all(axis=1)
+
+
+def aabbs_visible(planes, mins, maxs):
+    """Máscara (N,) de AABBs que tocan el frustum (prueba del vértice más adentro de cada plano)."""
+    mins = np.asarray(mins, dtype=np.float64).reshape(-1, 3)
+    maxs = np.asarray(maxs, dtype=np.float64).reshape(-1, 3)
+
+    normals = planes[:, :3]
+    # Para cada plano, la esquina de la caja más "adentro": max donde n >= 0, min si no
+    inside = np.where(normals[None, :, :] >= 0, maxs[:, None, :], mins[:, None, :])
+    distances = np.einsum("npk,pk->np", inside, normals) + planes[:, 3]
+    return (distances >= 0).all(axis=1)
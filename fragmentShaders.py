@@ -2,6 +2,10 @@
 # --------------------------------------------
 # (mantén este comentario con el nombre del archivo)
 
+from framedata import frame_uniforms
+
+# Cámara, luz, value y time vienen del bloque FrameData (UBO por frame, ver framedata.py)
+
 fragment_shader = '''
 #version 330 core
 
@@ -12,8 +16,7 @@ in vec4 fragPosition;
 out vec4 fragColor;
 
 uniform sampler2D tex0;
-uniform vec3 pointLight;
-uniform float ambientLight;
+''' + frame_uniforms + '''
 
 void main()
 {
@@ -34,8 +37,7 @@ in vec4 fragPosition;
 out vec4 fragColor;
 
 uniform sampler2D tex0;
-uniform vec3 pointLight;
-uniform float ambientLight;
+''' + frame_uniforms + '''
 
 void main()
 {
@@ -80,9 +82,7 @@ out vec4 fragColor;
 
 uniform sampler2D tex0; // base
 uniform sampler2D tex1; // lava overlay
-uniform vec3 pointLight;
-uniform float ambientLight;
-uniform float time;
+''' + frame_uniforms + '''
 
 void main()
 {
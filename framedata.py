@@ -0,0 +1,78 @@
+# framedata.py
+# (mantén este comentario con el nombre del archivo)
+
+from OpenGL.GL import *
+
+import numpy as np
+
+
+# Binding fijo del UBO; ShaderProgram conecta ahí el bloque FrameData de cada programa
+FRAME_DATA_BINDING = 0
+
+# Bloque que declaran todos los shaders (vertexShaders, fragmentShaders, skybox).
+# Sin nombre de instancia: los miembros se usan igual que los uniforms sueltos.
+frame_uniforms = '''
+layout (std140) uniform FrameData
+{
+    mat4 viewMatrix;
+    mat4 projectionMatrix;
+    vec3 pointLight;
+    float ambientLight;
+    float value;
+    float time;
+};
+'''
+
+# El mismo bloque con el layout std140: matrices por columnas, vec3 alineado a
+# 16 bytes (el float siguiente ocupa su cuarto componente), tamaño múltiplo de 16
+FRAME_DATA_DTYPE = np.dtype({
+    "names": ["viewMatrix", "projectionMatrix", "pointLight", "ambientLight", "value", "time"],
+    "formats": [("<f4", (4, 4)), ("<f4", (4, 4)), ("<f4", 3), "<f4", "<f4", "<f4"],
+    "offsets": [0, 64, 128, 140, 144, 148],
+    "itemsize": 160})
+
+
+class FrameData(object):
+    """
+    UBO std140 con los datos por frame (cámara, luz, value, time) que leen
+    todos los programas. Update() llena el struct de numpy y lo sube con un
+    solo glBufferSubData (nada si no cambió); cambiar de programa ya no
+    vuelve a subir ningún uniform.
+    """
+    def __init__(self, binding=FRAME_DATA_BINDING):
+        self.binding = binding
+        self.data = np.zeros((), FRAME_DATA_DTYPE)
+        self.uploaded = None   # bytes de la última subida
+        self.uploads = 0
+
+        self.ubo = glGenBuffers(1)
+        glBindBuffer(GL_UNIFORM_BUFFER, self.ubo)
+        glBufferData(GL_UNIFORM_BUFFER, self.data.nbytes, None, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+
+    def Update(self, viewMatrix, projectionMatrix, pointLight, ambientLight, value, time):
+        data = self.data
+        # glm -> filas de la matriz; std140 las guarda por columnas
+        data["viewMatrix"] = np.array(viewMatrix, dtype=np.float32).T
+        data["projectionMatrix"] = np.array(projectionMatrix, dtype=np.float32).T
+        data["pointLight"] = tuple(pointLight)
+        data["ambientLight"] = ambientLight
+        data["value"] = value
+        data["time"] = time
+
+        raw = data.tobytes()
+        if raw != self.uploaded:
+            glBindBuffer(GL_UNIFORM_BUFFER, self.ubo)
+            glBufferSubData(GL_UNIFORM_BUFFER, 0, len(raw), raw)
+            glBindBuffer(GL_UNIFORM_BUFFER, 0)
+            self.uploaded = raw
+            self.uploads += 1
+        self.Bind()
+
+    def Bind(self):
+        glBindBufferBase(GL_UNIFORM_BUFFER, self.binding, self.ubo)
+
+    def Delete(self):
+        if self.ubo is not None:
+            glDeleteBuffers(1, [self.ubo])
+            self.ubo = None
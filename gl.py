@@ -1,16 +1,39 @@
 # gl.py
 
 import glm # pip install PyGLM
+import numpy as np
 from OpenGL.GL import *
-from OpenGL.GL.shaders import compileProgram, compileShader
 
 from camera import Camera
+from culling import aabbs_visible, frustum_planes, screen_sizes, spheres_visible, view_depths
+from framedata import FrameData
+from profiler import no_section
+from renderqueue import RenderQueue
+from shaderprogram import shaderCache
 from skybox import Skybox
+from transforms import sceneTransforms
+from vertexShaders import instanced_variant
+
+
+# Pre-pass de profundidad: el vertex shader activo con un fragment shader vacío
+depth_only_fragment_shader = '''
+#version 330 core
+
+void main()
+{
+}
+'''
 
 class Renderer(object):
-    def __init__(self, screen):
+    def __init__(self, screen=None, width=None, height=None):
+        # Sin ventana (headless.py) se pasa solo el tamaño del framebuffer
         self.screen = screen
-        _,_, self.width, self.height = screen.get_rect()
+        if screen is not None:
+            _,_, self.width, self.height = screen.get_rect()
+        elif width is None or height is None:
+            raise ValueError("Renderer necesita 'screen' o 'width' y 'height'")
+        else:
+            self.width, self.height = width, height
         
         glClearColor(0.2, 0.2, 0.2, 1.0)
 
@@ -20,15 +43,47 @@ class Renderer(object):
         self.camera = Camera(self.width, self.height)
 
         self.scene = []
+
+        # Posición / rotación / escala de todos los Model, con sus matrices y
+        # volúmenes en mundo: Render() los recalcula juntos antes del culling
+        self.transforms = sceneTransforms
+
+        # Frustum culling: objetos con volumen envolvente fuera de cámara no se dibujan
+        self.frustumCulling = True
+        self.drawnCount = 0    # del último frame
+        self.culledCount = 0
+
+        # Nivel de detalle por tamaño en pantalla (modelos con LODs, ver Model.BuildLods)
+        self.levelOfDetail = True
+        self.triangleCount = 0  # triángulos dibujados en el último frame
+        self.drawCalls = 0
+
+        # Profiler opcional (profiler.py): tiempos de CPU/GPU por pase y contadores
+        self.profiler = None
+
+        # Draws del frame ordenados por estado (programa, texturas, VAO) y profundidad
+        self.renderQueue = RenderQueue()
+
+        # Pre-pass: primero solo la profundidad de los opacos, después se sombrea
+        # con GL_EQUAL (un fragmento por pixel). Conviene con fragment shaders
+        # caros y mucha superposición; con escenas livianas cuesta más de lo que ahorra.
+        self.depthPrepass = False
         
 
         self.filledMode = False
         self.ToggleFilledMode()
 
-        self.activeShader = None
+        self.activeShader = None   # ShaderProgram (locations de uniforms ya resueltas)
+        self.instancedShader = None  # variante instanciada, se compila al primer uso
+        self.depthShaders = {}     # programa -> su variante solo profundidad (pre-pass)
+        self.vertexShader = None
+        self.fragmentShader = None
 
         self.skybox = None
 
+        # AssetLoader opcional: sus subidas a GL se hacen al inicio de cada frame
+        self.assetLoader = None
+
         self.pointLight = glm.vec3(0,0,0)
         self.ambientLight = 0.1
 
@@ -36,11 +91,13 @@ class Renderer(object):
         self.value = 0.0;
         self.elapsedTime = 0.0;
 
+        # Cámara, luz, value y time: un UBO que leen todos los programas (framedata.py)
+        self.frameData = FrameData()
+
 
 
     def CreateSkybox(self, textureList):
         self.skybox = Skybox(textureList)
-        self.skybox.cameraRef = self.camera
 
 
     def ToggleFilledMode(self):
@@ -55,48 +112,203 @@ class Renderer(object):
 
 
     def SetShaders(self, vertexShader, fragmentShader):
+        # Cada combinación se compila una sola vez (shaderCache); cambiar es casi gratis
+        previous = (self.activeShader, self.instancedShader) + tuple(self.depthShaders.values())
+
+        self.vertexShader = vertexShader
+        self.fragmentShader = fragmentShader
+        self.instancedShader = None
+        self.depthShaders = {}
+
         if vertexShader is not None and fragmentShader is not None:
-            self.activeShader = compileProgram( compileShader(vertexShader, GL_VERTEX_SHADER),
-                                                compileShader(fragmentShader, GL_FRAGMENT_SHADER) )
+            self.activeShader = shaderCache.Acquire(vertexShader, fragmentShader)
         else:
             self.activeShader = None
 
+        for shader in previous:
+            if shader is not None:
+                shaderCache.Release(shader)
+
+
+    def GetInstancedShader(self):
+        """Programa para los objetos instanced: el vertex shader activo con modelMatrix por instancia."""
+        if self.instancedShader is None and self.activeShader is not None:
+            self.instancedShader = shaderCache.Acquire(instanced_variant(self.vertexShader),
+                                                       self.fragmentShader)
+        return self.instancedShader
+
+
+    def GetDepthShaders(self):
+        """{programa de sombreado: variante solo profundidad} para los programas en uso."""
+        if self.activeShader is not None and self.activeShader not in self.depthShaders:
+            self.depthShaders[self.activeShader] = shaderCache.Acquire(self.vertexShader,
+                                                                       depth_only_fragment_shader)
+        if self.instancedShader is not None and self.instancedShader not in self.depthShaders:
+            self.depthShaders[self.instancedShader] = shaderCache.Acquire(instanced_variant(self.vertexShader),
+                                                                          depth_only_fragment_shader)
+        return self.depthShaders
+
+
+    def UpdateFrameData(self):
+        """Escribe el UBO por frame (una subida, o ninguna si nada cambió) y lo deja bindeado."""
+        self.frameData.Update(self.camera.viewMatrix, self.camera.projectionMatrix, self.pointLight,
+                              self.ambientLight, self.value, self.elapsedTime)
+
+
+    def SetProgramUniforms(self, shader):
+        # Lo que cambia por frame va en frameData; acá quedan las unidades de
+        # los samplers, que Set() sube solo la primera vez para cada programa
+        shader.Set("tex0", 0)
+        shader.Set("tex1", 1)
+
+
+    def BoundedSlots(self, objects):
+        """
+        (posiciones en 'objects', índices en self.transforms) de los objetos con
+        volumen envolvente; sus cajas y esferas en mundo se leen de los arrays
+        de self.transforms (al día después de su Update()). Los de otro
+        TransformSystem se tratan como sin volumen (no se descartan).
+        """
+        positions, slots = [], []
+        transforms = self.transforms
+        for i, obj in enumerate(objects):
+            slot = getattr(obj, "transformIndex", None)
+            if slot is not None and obj.transforms is transforms:
+                positions.append(i)
+                slots.append(slot)
+        positions = np.array(positions, dtype=np.int64)
+        slots = np.array(slots, dtype=np.int64)
+        bounded = self.transforms.hasBounds[slots]
+        return positions[bounded], slots[bounded]
+
+
+    def FrustumCull(self, objects):
+        """
+        Los objetos de 'objects' que tocan el frustum de la cámara, en el mismo
+        orden. Primero esfera y después AABB (en mundo), vectorizado para todos;
+        los que no tienen volumen (p. ej. aún cargando) pasan siempre.
+        """
+        if not self.frustumCulling or not objects:
+            return objects
+
+        positions, slots = self.BoundedSlots(objects)
+        if not len(slots):
+            return objects
+
+        transforms = self.transforms
+        planes = frustum_planes(self.camera.projectionMatrix * self.camera.viewMatrix)
+        visible = spheres_visible(planes, transforms.worldCenters[slots], transforms.worldRadii[slots]) \
+            & aabbs_visible(planes, transforms.worldMins[slots], transforms.worldMaxs[slots])
+
+        keep = np.ones(len(objects), dtype=bool)
+        keep[positions] = visible
+        return [obj for obj, k in zip(objects, keep.tolist()) if k]
+
+
+    def SelectLods(self, objects):
+        """Elige el nivel de detalle de los objetos con LODs según su diámetro en pantalla."""
+        withLods = [obj for obj in objects if len(getattr(obj, "lods", ())) > 1]
+        if not withLods:
+            return
+
+        if not self.levelOfDetail:
+            for obj in withLods:
+                obj.lodLevel = 0
+            return
+
+        positions, slots = self.BoundedSlots(withLods)
+        centers = np.zeros((len(withLods), 3))
+        radii = np.zeros(len(withLods))
+        centers[positions] = self.transforms.worldCenters[slots]
+        radii[positions] = self.transforms.worldRadii[slots]
+        sizes = screen_sizes(centers, radii, self.camera.viewMatrix, self.camera.projectionMatrix,
+                             self.height)
+        for obj, size in zip(withLods, sizes.tolist()):
+            obj.SelectLod(size)
+
+
+    def ViewDepths(self, objects):
+        """Distancia a la cámara del centro de cada objeto (0 si no tiene volumen), para ordenar."""
+        depths = np.zeros(len(objects))
+        positions, slots = self.BoundedSlots(objects)
+        if len(slots):
+            depths[positions] = view_depths(self.transforms.worldCenters[slots], self.camera.viewMatrix)
+        return depths.tolist()
 
-    def Render(self):
-        glClear( GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT )
-
-        self.camera.Update()
-
-        if self.skybox is not None:
-            self.skybox.Render()
-
-
-        if self.activeShader is not None:
-            glUseProgram(self.activeShader)
-
-            glUniformMatrix4fv( glGetUniformLocation(self.activeShader, "viewMatrix"),
-                                1, GL_FALSE, glm.value_ptr(self.camera.viewMatrix) )
-
-            glUniformMatrix4fv( glGetUniformLocation(self.activeShader, "projectionMatrix"),
-                                1, GL_FALSE, glm.value_ptr(self.camera.projectionMatrix) )
-
-            glUniform3fv( glGetUniformLocation(self.activeShader, "pointLight"), 1, glm.value_ptr(self.pointLight) )
-            glUniform1f( glGetUniformLocation(self.activeShader, "ambientLight"), self.ambientLight )
 
-            glUniform1f( glGetUniformLocation(self.activeShader, "value"), self.value )
-            glUniform1f( glGetUniformLocation(self.activeShader, "time"), self.elapsedTime )
-
-
-            glUniform1i( glGetUniformLocation(self.activeShader, "tex0"), 0)
-            glUniform1i( glGetUniformLocation(self.activeShader, "tex1"), 1)
-
-
-
-        for obj in self.scene:
+    def Render(self):
+        section = self.profiler.Section if self.profiler is not None else no_section
 
-            if self.activeShader is not None:
-                glUniformMatrix4fv( glGetUniformLocation(self.activeShader, "modelMatrix"),
-                                1, GL_FALSE, glm.value_ptr( obj.GetModelMatrix() ) )
+        if self.assetLoader is not None:
+            with section("assets"):
+                self.assetLoader.Update()
 
-            obj.Render()
+        glClear( GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT )
 
+        self.camera.Update()
+        self.UpdateFrameData()
+
+
+        # Los instanced (InstancedModel) usan la variante instanciada del programa activo
+        instanced = [obj for obj in self.scene if getattr(obj, "instanced", False)]
+        objects = [obj for obj in self.scene if not getattr(obj, "instanced", False)]
+
+        with section("cull"):
+            # Una pasada vectorizada: matrices y volúmenes de los modelos que cambiaron
+            self.transforms.Update()
+            visible = self.FrustumCull(objects)
+            self.drawnCount = len(visible) + len(instanced)
+            self.culledCount = len(objects) - len(visible)
+
+            self.SelectLods(visible)
+            self.triangleCount = sum(obj.TriangleCount() for obj in visible + instanced
+                                     if hasattr(obj, "TriangleCount"))
+
+        queue = self.renderQueue
+        with section("queue"):
+            queue.Clear()
+            shader = self.activeShader
+            for obj, depth in zip(visible, self.ViewDepths(visible)):
+                obj.QueueDraws(queue, shader, depth)
+
+            if instanced:
+                shader = self.GetInstancedShader()
+                for obj in instanced:
+                    obj.QueueDraws(queue, shader)
+            queue.Sort()
+
+        if self.depthPrepass:
+            with section("prepass"):
+                glColorMask(GL_FALSE, GL_FALSE, GL_FALSE, GL_FALSE)
+                queue.Submit(self.SetProgramUniforms, transparent=False,
+                             shaders=self.GetDepthShaders(), textures=False)
+                glColorMask(GL_TRUE, GL_TRUE, GL_TRUE, GL_TRUE)
+
+        samples = self.profiler.Samples if self.profiler is not None else no_section
+        with samples("shadedFragments"):
+            with section("objects"):
+                if self.depthPrepass:
+                    glDepthFunc(GL_EQUAL)
+                    glDepthMask(GL_FALSE)
+                queue.Submit(self.SetProgramUniforms, transparent=False)
+                if self.depthPrepass:
+                    glDepthFunc(GL_LESS)
+                    glDepthMask(GL_TRUE)
+
+            # Después de los opacos y a profundidad máxima: solo lo que quedó al descubierto
+            if self.skybox is not None:
+                with section("skybox"):
+                    self.skybox.Render()
+
+            with section("transparent"):
+                stats = queue.Submit(self.SetProgramUniforms, transparent=True)
+
+        self.drawCalls = stats["draws"] + (1 if self.skybox is not None else 0)
+
+        if self.profiler is not None:
+            self.profiler.Count("drawCalls", self.drawCalls)
+            self.profiler.Count("triangles", self.triangleCount)
+            self.profiler.Count("drawn", self.drawnCount)
+            self.profiler.Count("culled", self.culledCount)
+            for name in ("programSkipped", "textureSkipped", "vaoSkipped"):
+                self.profiler.Count(name, stats[name])
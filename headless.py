@@ -0,0 +1,251 @@
+# headless.py
+# (mantén este comentario con el nombre del archivo)
+#
+# Render sin ventana (servidores sin display, con o sin GPU): contexto EGL
+# "surfaceless" + un framebuffer propio. Sin GPU, Mesa dibuja por software
+# (llvmpipe). Importar este módulo ANTES que cualquier otro que use OpenGL:
+# PyOpenGL elige la plataforma (EGL) en su primer import.
+#
+#   python headless.py "models/Count Batula.obj" --frames 36 --out frames/turntable_%03d.png
+
+import os
+os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+
+import argparse
+import ctypes
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import glm
+import numpy as np
+import pygame
+from OpenGL import EGL, platform
+from OpenGL.GL import *
+
+from transforms import model_matrices
+
+
+class HeadlessContext(object):
+    """
+    Contexto GL 3.3 (compatibility, como el de la ventana de pygame) sin
+    ventana, con un FBO RGBA8 + depth/stencil de width x height ligado.
+    """
+    def __init__(self, width, height):
+        if "EGL" not in type(platform.PLATFORM).__name__:
+            raise RuntimeError("PyOpenGL ya se inicializó sin EGL: importa headless antes que OpenGL "
+                               "(o define PYOPENGL_PLATFORM=egl)")
+        self.width = width
+        self.height = height
+
+        self.display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        if not EGL.eglInitialize(self.display, None, None):
+            raise RuntimeError("No se pudo inicializar EGL")
+
+        config = EGL.EGLConfig()
+        count = EGL.EGLint()
+        attribs = (EGL.EGLint * 5)(EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+                                   EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT, EGL.EGL_NONE)
+        if not EGL.eglChooseConfig(self.display, attribs, ctypes.byref(config), 1, ctypes.byref(count)) \
+                or count.value == 0:
+            raise RuntimeError("EGL no tiene configuraciones para OpenGL")
+
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        attribs = (EGL.EGLint * 7)(EGL.EGL_CONTEXT_MAJOR_VERSION, 3, EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+                                   EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK,
+                                   EGL.EGL_CONTEXT_OPENGL_COMPATIBILITY_PROFILE_BIT, EGL.EGL_NONE)
+        self.context = EGL.eglCreateContext(self.display, config, EGL.EGL_NO_CONTEXT, attribs)
+        if not self.context:
+            raise RuntimeError("No se pudo crear el contexto EGL")
+
+        # Sin superficie si el driver lo permite; si no, un pbuffer mínimo
+        self.surface = EGL.EGL_NO_SURFACE
+        if not EGL.eglMakeCurrent(self.display, self.surface, self.surface, self.context):
+            attribs = (EGL.EGLint * 5)(EGL.EGL_WIDTH, 1, EGL.EGL_HEIGHT, 1, EGL.EGL_NONE)
+            self.surface = EGL.eglCreatePbufferSurface(self.display, config, attribs)
+            if not EGL.eglMakeCurrent(self.display, self.surface, self.surface, self.context):
+                raise RuntimeError("No se pudo activar el contexto EGL")
+
+        self.FBO = glGenFramebuffers(1)
+        self.colorBuffer, self.depthBuffer = glGenRenderbuffers(2)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.colorBuffer)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, width, height)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.depthBuffer)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH24_STENCIL8, width, height)
+
+        glBindFramebuffer(GL_FRAMEBUFFER, self.FBO)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, self.colorBuffer)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_STENCIL_ATTACHMENT, GL_RENDERBUFFER, self.depthBuffer)
+        if glCheckFramebufferStatus(GL_FRAMEBUFFER) != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError("El framebuffer offscreen está incompleto")
+        self.Bind()
+
+    def Bind(self):
+        glBindFramebuffer(GL_FRAMEBUFFER, self.FBO)
+        glViewport(0, 0, self.width, self.height)
+
+    def Release(self):
+        glDeleteFramebuffers(1, [self.FBO])
+        glDeleteRenderbuffers(2, [self.colorBuffer, self.depthBuffer])
+        EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+        if self.surface != EGL.EGL_NO_SURFACE:
+            EGL.eglDestroySurface(self.display, self.surface)
+        EGL.eglDestroyContext(self.display, self.context)
+        EGL.eglTerminate(self.display)
+
+
+class PixelReader(object):
+    """
+    Lectura asíncrona del framebuffer con un anillo de PBOs: Read() pide la
+    copia del frame actual a un PBO y devuelve el frame de hace 'count' lecturas
+    (que ya terminó mientras se dibujaban los siguientes), o None al principio.
+    Los frames salen como (etiqueta, array (alto, ancho, 4) uint8, filas de arriba abajo).
+    """
+    def __init__(self, width, height, count=2):
+        self.width = width
+        self.height = height
+        self.size = width * height * 4
+
+        self.PBOs = list(np.atleast_1d(glGenBuffers(count)))
+        for pbo in self.PBOs:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self.size, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+
+        self.tags = [None] * count   # qué frame tiene cada PBO
+        self.next = 0
+
+    def Read(self, tag):
+        done = self._Take(self.next)
+
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.PBOs[self.next])
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        glReadPixels(0, 0, self.width, self.height, GL_RGBA, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+
+        self.tags[self.next] = tag
+        self.next = (self.next + 1) % len(self.PBOs)
+        return done
+
+    def Flush(self):
+        """Los frames pendientes, en orden."""
+        for k in range(len(self.PBOs)):
+            done = self._Take((self.next + k) % len(self.PBOs))
+            if done is not None:
+                yield done
+
+    def _Take(self, i):
+        tag = self.tags[i]
+        if tag is None:
+            return None
+        self.tags[i] = None
+
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.PBOs[i])
+        pointer = glMapBufferRange(GL_PIXEL_PACK_BUFFER, 0, self.size, GL_MAP_READ_BIT)
+        pixels = np.frombuffer(ctypes.string_at(pointer, self.size), dtype=np.uint8)
+        glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        return tag, pixels.reshape(self.height, self.width, 4)[::-1]
+
+    def Delete(self):
+        glDeleteBuffers(len(self.PBOs), self.PBOs)
+        self.PBOs = []
+
+
+def save_image(pixels, path):
+    """Guarda un array (alto, ancho, 4) uint8 (PNG/JPG/BMP/TGA según la extensión)."""
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    height, width = pixels.shape[:2]
+    pygame.image.save(pygame.image.frombuffer(np.ascontiguousarray(pixels).tobytes(), (width, height), "RGBA"), path)
+    return path
+
+
+def render_sequence(renderer, frames, update, outputPattern, pboCount=2):
+    """
+    Dibuja 'frames' frames llamando update(i) antes de cada uno y guarda el
+    frame i en outputPattern % i. La lectura va por PBOs (la copia del frame i
+    se solapa con el dibujo del siguiente) y los archivos se escriben en otro
+    hilo. Devuelve las rutas escritas.
+    """
+    reader = PixelReader(renderer.width, renderer.height, pboCount)
+    futures = []
+    with ThreadPoolExecutor(1, thread_name_prefix="frames") as writer:
+        for i in range(frames):
+            update(i)
+            renderer.Render()
+            done = reader.Read(i)
+            if done is not None:
+                futures.append(writer.submit(save_image, done[1], outputPattern % done[0]))
+        for tag, pixels in reader.Flush():
+            futures.append(writer.submit(save_image, pixels, outputPattern % tag))
+        paths = [f.result() for f in futures]
+    reader.Delete()
+    return paths
+
+
+def turntable(renderer, model, elevation=15.0, distance=2.5):
+    """
+    Deja la cámara fija mirando a 'model' desde arriba y devuelve spin(angle),
+    que gira el modelo en Y (grados) alrededor del centro de su esfera envolvente.
+    """
+    (_, (center, radius)) = model.GetWorldBounds()
+    center = np.asarray(center, dtype=np.float64)
+    localCenter = np.asarray(model.boundsCenter, dtype=np.float64)
+    radius = max(float(radius), 1e-3)
+
+    pitch = math.radians(elevation)
+    renderer.camera.position = glm.vec3(*(center + radius * distance * np.array([0.0, math.sin(pitch), math.cos(pitch)])))
+    renderer.camera.rotation = glm.vec3(-elevation, 0, 0)
+    renderer.pointLight = renderer.camera.position
+
+    def spin(angle):
+        model.rotation.y = angle
+        # T * R * S deja el centro en su lugar si T = centro - R * S * centro local
+        linear = model_matrices([(0, 0, 0)], [tuple(model.rotation)], [tuple(model.scale)])[0, :3, :3]
+        model.position = glm.vec3(*(center - localCenter @ linear))
+    return spin
+
+
+def frame_turntable(renderer, model, frames, elevation=15.0, distance=2.5):
+    """update(i) para render_sequence: una vuelta completa de 'model' en 'frames' frames."""
+    spin = turntable(renderer, model, elevation, distance)
+    return lambda i: spin(360.0 * i / frames)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Turntable de un OBJ sin ventana (EGL + FBO).")
+    parser.add_argument("model")
+    parser.add_argument("--out", default="frames/frame_%04d.png", help="patrón de salida (con %%d)")
+    parser.add_argument("--frames", type=int, default=36)
+    parser.add_argument("--size", default="960x540", help="ANCHOxALTO")
+    parser.add_argument("--vertex", default="vertex_shader", help="nombre en vertexShaders.py")
+    parser.add_argument("--fragment", default="fragment_shader", help="nombre en fragmentShaders.py")
+    parser.add_argument("--elevation", type=float, default=15.0, help="grados sobre el horizonte")
+    args = parser.parse_args(argv)
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    context = HeadlessContext(width, height)
+
+    # Después del contexto: estos módulos usan GL al construirse
+    import fragmentShaders
+    import vertexShaders
+    from gl import Renderer
+    from model import Model
+
+    renderer = Renderer(width=width, height=height)
+    renderer.SetShaders(getattr(vertexShaders, args.vertex), getattr(fragmentShaders, args.fragment))
+
+    model = Model(args.model)
+    model.LoadMaterialTextures()
+    renderer.scene.append(model)
+
+    paths = render_sequence(renderer, args.frames, frame_turntable(renderer, model, args.frames, args.elevation),
+                            args.out)
+    print(f"[Headless] {len(paths)} frames -> {os.path.dirname(args.out) or '.'}")
+    context.Release()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# instancedmodel.py
+# (mantén este comentario con el nombre del archivo)
+
+from OpenGL.GL import *
+from buffer import Buffer
+from transforms import model_matrices
+
+import numpy as np
+
+
+class InstancedModel(object):
+    """
+    Muchas copias de un Model con un draw instanciado por material
+    (glDrawElementsInstanced / glDrawArraysInstanced).
+      - La malla, los buffers y las texturas son los del Model (puede venir
+        de AssetLoader; no se dibuja nada hasta que termina de subir)
+      - Cada instancia tiene su matriz en 'matrices' ((N, 4, 4) float32, por
+        columnas), que va a un VBO con divisor 1 en las locations 3..6
+      - Con 'transforms' (TransformSystem) las matrices salen de ahí y solo
+        se vuelven a subir cuando el sistema cambió
+      - Se dibuja con las variantes *_instanced de vertexShaders; Renderer
+        las elige solo para los objetos con 'instanced = True'
+    """
+    instanced = True
+
+    def __init__(self, model, count=0, transforms=None):
+        self.model = model
+        self.matrices = np.tile(np.eye(4, dtype=np.float32), (count, 1, 1))
+
+        self.transforms = None
+        self.transformsVersion = None
+        if transforms is not None:
+            self.UseTransforms(transforms)
+
+        self.instanceBuffer = None
+        self.VAO = None
+        self.dirty = True
+
+    @property
+    def count(self):
+        return len(self.matrices)
+
+    def TriangleCount(self):
+        return self.model.TriangleCount() * self.count if self.model.VAO is not None else 0
+
+    def DrawCount(self):
+        return self.model.DrawCount() if self.model.VAO is not None and self.count else 0
+
+    def SetTransforms(self, positions, rotations=None, scales=None):
+        """Recalcula todas las matrices desde arrays (N, 3) de posición, rotación (grados) y escala."""
+        self.SetMatrices(model_matrices(positions, rotations, scales))
+
+    def SetMatrices(self, matrices):
+        """Reemplaza las matrices ((N, 4, 4) por columnas, como glm); N puede cambiar."""
+        self.matrices = np.ascontiguousarray(matrices, dtype=np.float32).reshape(-1, 4, 4)
+        self.MarkDirty()
+
+    def UseTransforms(self, transforms):
+        """Una instancia por objeto de 'transforms' (se siguen sus cambios en Render)."""
+        self.transforms = transforms
+        self.transformsVersion = None
+
+    def MarkDirty(self):
+        """Llamar después de modificar 'matrices' en el lugar."""
+        self.dirty = True
+
+    def DrawMatrices(self):
+        """Las matrices que van al VBO: con la decuantización del Model si tiene posiciones cuantizadas."""
+        if self.model.vertexMatrix is None:
+            return self.matrices
+        # matrices[i] es M^T (por columnas) -> (M * D)^T = D^T * M^T
+        dequantize = np.array(self.model.vertexMatrix, dtype=np.float32)
+        return np.matmul(dequantize.T, self.matrices)
+
+    def BuildVertexArray(self):
+        """VAO propio: atributos del Model + las matrices por instancia."""
+        self.instanceBuffer = Buffer(self.DrawMatrices(), upload=False, usage=GL_DYNAMIC_DRAW)
+        self.dirty = False
+
+        self.VAO = glGenVertexArrays(1)
+        glBindVertexArray(self.VAO)
+        self.model.BindAttributes()
+        self.instanceBuffer.UseMatrix(3)
+        glBindVertexArray(0)
+
+    def Prepare(self):
+        """Sigue a 'transforms' y sube las matrices si cambiaron. False si no hay nada que dibujar."""
+        if self.transforms is not None:
+            self.transforms.Update()
+            if self.transforms.version != self.transformsVersion:
+                self.SetMatrices(self.transforms.matrices[:self.transforms.count])
+                self.transformsVersion = self.transforms.version
+
+        if self.model.VAO is None or self.count == 0:
+            return False
+
+        if self.VAO is None:
+            self.BuildVertexArray()
+        elif self.dirty:
+            self.instanceBuffer.SetData(self.DrawMatrices())
+            self.instanceBuffer.Upload()
+            self.dirty = False
+        return True
+
+    def Render(self):
+        if self.Prepare():
+            self.model.Draw(self.VAO, self.count)
+
+    def QueueDraws(self, queue, shader, depth=0.0):
+        """Agrega sus draws instanciados a 'queue' (RenderQueue); la matriz va por instancia."""
+        if self.Prepare():
+            self.model.UploadDirty()
+            queue.Add(self.model, self.VAO, shader, None, depth, self.model.transparent, self.count)
+
+    def Delete(self):
+        """Libera el VAO y el VBO de instancias (el Model se libera aparte)."""
+        if self.instanceBuffer is not None:
+            self.instanceBuffer.Delete()
+            self.instanceBuffer = None
+        if self.VAO is not None:
+            glDeleteVertexArrays(1, [self.VAO])
+            self.VAO = None
@@ -0,0 +1,539 @@
+# mesh.py
+# (mantén este comentario con el nombre del archivo)
+
+import heapq
+import numpy as np
+
+
+# -------------------- Tabla de caras --------------------
+
+def face_table(faces):
+    """
+    Aplana una lista de caras [ [ (v,vt,vn), ... ], ... ] a:
+      - indices: array (M, 3) int64 con (v, vt, vn) por esquina (1-based, 0 si falta)
+      - offsets: array (F + 1,) con el inicio de cada cara en 'indices'
+    """
+    counts = np.fromiter((len(f) for f in faces), dtype=np.int64, count=len(faces))
+    offsets = np.zeros(len(faces) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    indices = np.array([c for f in faces for c in f], dtype=np.int64).reshape(-1, 3)
+    return indices, offsets
+
+
+def fan_triangles(offsets):
+    """
+    Triangulación por "fan" precalculada: devuelve array (T, 3) con las
+    posiciones (en la tabla de esquinas) de (0, i, i+1) para cada cara.
+    Las caras con menos de 3 esquinas se ignoran.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    counts = np.diff(offsets)
+    triCounts = np.maximum(counts - 2, 0)
+
+    faceOfTri = np.repeat(np.arange(len(counts)), triCounts)
+    triStart = np.zeros(len(counts), dtype=np.int64)
+    np.cumsum(triCounts[:-1], out=triStart[1:])
+    k = np.arange(len(faceOfTri), dtype=np.int64) - triStart[faceOfTri]
+
+    base = offsets[faceOfTri]
+    return np.stack((base, base + k + 1, base + k + 2), axis=1)
+
+
+# -------------------- Normales --------------------
+
+def triangle_normals(p1, p2, p3):
+    """
+    Normal por triángulo en float32, con el mismo orden de operaciones que
+    glm.normalize(glm.cross(p2 - p1, p3 - p1)) para dar resultados idénticos.
+    """
+    a = p2 - p1
+    b = p3 - p1
+
+    n = np.empty_like(a)
+    n[:, 0] = a[:, 1] * b[:, 2] - b[:, 1] * a[:, 2]
+    n[:, 1] = a[:, 2] * b[:, 0] - b[:, 2] * a[:, 0]
+    n[:, 2] = a[:, 0] * b[:, 1] - b[:, 0] * a[:, 1]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sq = n[:, 0] * n[:, 0] + n[:, 1] * n[:, 1]
+        sq = sq + n[:, 2] * n[:, 2]
+        inv = np.float32(1.0) / np.sqrt(sq)
+        n *= inv[:, None]
+    return n
+
+
+# -------------------- Builder OBJ -> arrays --------------------
+
+def _lookup(table, idx, width, valid):
+    """Busca filas 1-based de 'table'; las inválidas quedan en cero."""
+    if not len(table):
+        return np.zeros((len(idx), width), dtype=np.float32)
+
+    allValid = bool(valid.all())
+    rows = idx - 1 if allValid else np.where(valid, idx - 1, 0)
+    out = np.ascontiguousarray(table[:, :width]).take(rows, axis=0)
+    if not allValid:
+        out[~valid] = 0.0
+    return out
+
+
+def build_triangle_arrays(vertices, texCoords, normals, indices, offsets):
+    """
+    Convierte la tabla de caras en arrays float32 expandidos por triángulo:
+    (positions (T*3, 3), texCoords (T*3, 2), normals (T*3, 3)).
+
+    - v es obligatorio (0 -> posición en el origen)
+    - vt fuera de rango -> (0, 0)
+    - si falta alguna vn del triángulo se usa la normal plana del triángulo
+    """
+    V = np.asarray(vertices, dtype=np.float32).reshape(-1, 3) if len(vertices) else np.zeros((0, 3), np.float32)
+    VT = np.asarray(texCoords, dtype=np.float32).reshape(-1, 2) if len(texCoords) else np.zeros((0, 2), np.float32)
+    VN = np.asarray(normals, dtype=np.float32).reshape(-1, 3) if len(normals) else np.zeros((0, 3), np.float32)
+
+    corners = fan_triangles(offsets).reshape(-1)
+    idx = np.asarray(indices, dtype=np.int64)[corners]
+    v, vt, vn = idx[:, 0], idx[:, 1], idx[:, 2]
+
+    positions = _lookup(V, v, 3, v > 0)
+    uvs = _lookup(VT, vt, 2, (vt > 0) & (vt <= len(VT)))
+
+    hasNormal = (vn > 0) & (vn <= len(VN))
+    norms = _lookup(VN, vn, 3, hasNormal)
+
+    # Triángulos con alguna normal faltante -> normal plana
+    missing = ~hasNormal.reshape(-1, 3).all(axis=1)
+    if missing.any():
+        tri = positions.reshape(-1, 3, 3)[missing]
+        flat = triangle_normals(tri[:, 0], tri[:, 1], tri[:, 2])
+        norms.reshape(-1, 3, 3)[missing] = flat[:, None, :]
+
+    return positions, uvs, norms
+
+
+# -------------------- Primitivas --------------------
+
+def box_arrays(size=1.0):
+    """Cubo centrado en el origen con normales planas, en el formato de BuildArrays."""
+    axes = np.eye(3, dtype=np.float32)
+    x, y, z = axes
+    # (normal, u, v) con u x v = normal para que los triángulos queden CCW por fuera
+    sides = [(x, y, z), (-x, z, y), (y, z, x), (-y, x, z), (z, x, y), (-z, y, x)]
+    corners = np.array([(-1, -1), (1, -1), (1, 1), (-1, 1)], dtype=np.float32)
+    order = [0, 1, 2, 0, 2, 3]
+
+    positions, texCoords, normals = [], [], []
+    for n, u, v in sides:
+        quad = 0.5 * size * (n + corners[:, :1] * u + corners[:, 1:] * v)
+        positions.append(quad[order])
+        texCoords.append((corners[order] + 1) * 0.5)
+        normals.append(np.repeat(n[None, :], 6, axis=0))
+
+    return {"positions": np.concatenate(positions).astype(np.float32),
+            "texCoords": np.concatenate(texCoords).astype(np.float32),
+            "normals": np.concatenate(normals).astype(np.float32)}
+
+
+# -------------------- Volúmenes envolventes --------------------
+
+def bounding_volumes(positions):
+    """
+    AABB y esfera envolvente de un array de posiciones (N, 3):
+    (min (3,), max (3,), centro (3,), radio). La esfera se centra en la caja.
+    """
+    positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+    if len(positions) == 0:
+        zero = np.zeros(3, dtype=np.float32)
+        return zero, zero.copy(), zero.copy(), 0.0
+
+    lo = positions.min(axis=0)
+    hi = positions.max(axis=0)
+    center = (lo + hi) * np.float32(0.5)
+    radius = float(np.sqrt(((positions - center) ** 2).sum(axis=1).max()))
+    return lo, hi, center, radius
+
+
+# -------------------- Formatos compactos --------------------
+
+# Vértice intercalado: posición, UV en half float y normal en 2_10_10_10 (w = 0).
+# Con posiciones cuantizadas van como 4 int16 normalizados (el cuarto es relleno).
+PACKED_VERTEX = np.dtype([("position", "<f4", 3), ("texCoord", "<f2", 2), ("normal", "<u4")])
+QUANTIZED_VERTEX = np.dtype([("position", "<i2", 4), ("texCoord", "<f2", 2), ("normal", "<u4")])
+
+
+def pack_normals(normals):
+    """Normales (N, 3) -> uint32 con x, y, z como int10 normalizados (GL_INT_2_10_10_10_REV)."""
+    n = np.clip(np.asarray(normals, dtype=np.float32).reshape(-1, 3), -1.0, 1.0)
+    q = np.rint(n * 511.0).astype(np.int32) & 0x3FF
+    return (q[:, 0] | (q[:, 1] << 10) | (q[:, 2] << 20)).astype(np.uint32)
+
+
+def quantize_positions(positions):
+    """
+    Posiciones (N, 3) -> int16 normalizados en [-1, 1] alrededor del centro de
+    la caja, con la misma escala en los tres ejes (así las normales no cambian).
+    Devuelve (cuantizadas (N, 3), centro (3,), escala): posición = centro + escala * q.
+    """
+    positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+    if len(positions) == 0:
+        return np.zeros((0, 3), dtype=np.int16), np.zeros(3, dtype=np.float32), 1.0
+    lo, hi = positions.min(axis=0), positions.max(axis=0)
+    center = (lo + hi) * np.float32(0.5)
+    scale = float(max((hi - lo).max() * 0.5, 1e-12))
+    q = np.rint((positions - center) / scale * 32767.0)
+    return np.clip(q, -32767, 32767).astype(np.int16), center, scale
+
+
+def interleave_vertices(positions, texCoords, normals, quantize=False):
+    """
+    Un solo array de vértices intercalados (PACKED_VERTEX o QUANTIZED_VERTEX).
+    Devuelve (vértices, decuantización) con decuantización = (centro, escala)
+    si quantize, si no None.
+    """
+    positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+    vertices = np.zeros(len(positions), dtype=QUANTIZED_VERTEX if quantize else PACKED_VERTEX)
+    dequantize = None
+    if quantize:
+        q, center, scale = quantize_positions(positions)
+        vertices["position"][:, :3] = q
+        dequantize = (center, scale)
+    else:
+        vertices["position"] = positions
+    vertices["texCoord"] = np.asarray(texCoords, dtype=np.float32).reshape(-1, 2)
+    vertices["normal"] = pack_normals(normals)
+    return vertices, dequantize
+
+
+# -------------------- Grupos (materiales) --------------------
+
+def triangle_groups(offsets, faceGroups):
+    """Grupo de cada triángulo que genera fan_triangles a partir del grupo de su cara."""
+    counts = np.diff(np.asarray(offsets, dtype=np.int64))
+    return np.repeat(np.asarray(faceGroups), np.maximum(counts - 2, 0))
+
+
+def sort_by_group(triGroups, rank):
+    """
+    Orden estable de triángulos según rank[grupo] (grupo -1 usa rank[-1]).
+    Devuelve (orden, [(grupo, primer triángulo, nº de triángulos), ...]).
+    """
+    rank = np.asarray(rank, dtype=np.int64)
+    keys = rank[triGroups]
+    order = np.argsort(keys, kind="stable")
+
+    sortedKeys = keys[order]
+    change = np.flatnonzero(sortedKeys[1:] != sortedKeys[:-1]) + 1
+    first = np.concatenate(([0], change)).astype(np.int64)
+    last = np.concatenate((change, [len(keys)])).astype(np.int64)
+    groups = triGroups[order[first]] if len(keys) else np.zeros(0, np.int64)
+    return order, [(int(g), int(a), int(b - a)) for g, a, b in zip(groups, first, last)]
+
+
+# -------------------- Geometría indexada --------------------
+
+def index_dtype(vertexCount):
+    """uint16 si alcanza, si no uint32."""
+    return np.uint16 if vertexCount <= 0xFFFF else np.uint32
+
+
+def deduplicate_vertices(*attributes):
+    """
+    Une vértices con atributos idénticos (comparación exacta de bits).
+    Recibe arrays (N, k) float32 por atributo y devuelve
+    (atributos únicos..., indices) con los vértices en orden de primera aparición.
+    """
+    n = len(attributes[0])
+    rows = np.ascontiguousarray(np.hstack([a.reshape(n, -1) for a in attributes]))
+    if n == 0:
+        return tuple(a.reshape(0, *a.shape[1:]) for a in attributes) + (np.zeros(0, np.uint16),)
+
+    keys = rows.view(np.dtype((np.void, rows.dtype.itemsize * rows.shape[1]))).ravel()
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+    # np.unique ordena por bytes: se reordena por primera aparición
+    order = np.argsort(first, kind="stable")
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+
+    unique = first[order]
+    indices = remap[inverse.ravel()].astype(index_dtype(len(unique)))
+    return tuple(np.ascontiguousarray(a[unique]) for a in attributes) + (indices,)
+
+
+def optimize_vertex_cache(indices, vertexCount, cacheSize=16):
+    """
+    Reordena triángulos con Tipsify (Sander et al. 2007) para aprovechar la
+    caché post-transform. Es Python puro: pensado para mallas pequeñas o
+    para correrse una vez antes de guardar la caché binaria.
+    """
+    tris = np.asarray(indices).reshape(-1, 3)
+    T = len(tris)
+    if T == 0:
+        return np.asarray(indices)
+
+    # Adyacencia vértice -> triángulos (CSR)
+    flat = tris.ravel().astype(np.int64)
+    order = np.argsort(flat, kind="stable")
+    adjTris = (order // 3).tolist()
+    adjStart = np.zeros(vertexCount + 1, dtype=np.int64)
+    np.cumsum(np.bincount(flat, minlength=vertexCount), out=adjStart[1:])
+    adjStart = adjStart.tolist()
+
+    triList = tris.tolist()
+    live = np.bincount(flat, minlength=vertexCount).tolist()
+    cacheTime = [0] * vertexCount
+    emitted = [False] * T
+    deadEnd = []
+    out = []
+
+    timestamp = cacheSize + 1
+    cursor = 1
+    fanning = int(flat[0])
+
+    while fanning >= 0:
+        candidates = []
+        for j in range(adjStart[fanning], adjStart[fanning + 1]):
+            t = adjTris[j]
+            if emitted[t]:
+                continue
+            emitted[t] = True
+            tri = triList[t]
+            out.append(t)
+            for v in tri:
+                deadEnd.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if timestamp - cacheTime[v] > cacheSize:
+                    cacheTime[v] = timestamp
+                    timestamp += 1
+
+        # Siguiente vértice: el candidato vivo que siga en caché más tiempo
+        best, bestPriority = -1, -1
+        for v in candidates:
+            if live[v] > 0:
+                priority = 0
+                if timestamp - cacheTime[v] + 2 * live[v] <= cacheSize:
+                    priority = timestamp - cacheTime[v]
+                if priority > bestPriority:
+                    best, bestPriority = v, priority
+
+        if best < 0:
+            while deadEnd and best < 0:
+                v = deadEnd.pop()
+                if live[v] > 0:
+                    best = v
+            while best < 0 and cursor < vertexCount:
+                if live[cursor] > 0:
+                    best = cursor
+                cursor += 1
+            if best < 0 and cursor >= vertexCount:
+                # Por si quedaron triángulos con vértices bajos ya visitados
+                for v in range(vertexCount):
+                    if live[v] > 0:
+                        best = v
+                        break
+        fanning = best
+
+    return tris[np.asarray(out, dtype=np.int64)].ravel().astype(np.asarray(indices).dtype)
+
+
+def reorder_vertices_by_use(indices, *attributes):
+    """Reordena vértices según su primer uso en 'indices' (mejor localidad de fetch)."""
+    indices = np.asarray(indices)
+    n = len(attributes[0])
+    _, first = np.unique(indices, return_index=True)
+    used = indices[np.sort(first)].astype(np.int64)
+
+    remap = np.full(n, -1, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    out = tuple(np.ascontiguousarray(a[used]) for a in attributes)
+    return out + (remap[indices].astype(indices.dtype),)
+
+
+# -------------------- Simplificación (LOD) --------------------
+
+def _plane_quadrics(P, tris, boundaryWeight):
+    """
+    Cuádrica de error (10 coeficientes de la matriz simétrica 4x4) por vértice:
+    suma de los planos de sus triángulos pesados por área, más planos
+    perpendiculares en los bordes abiertos para que no se encojan.
+    """
+    p0, p1, p2 = P[tris[:, 0]], P[tris[:, 1]], P[tris[:, 2]]
+    n = np.cross(p1 - p0, p2 - p0)
+    area = np.linalg.norm(n, axis=1)
+    ok = area > 0
+    n[ok] /= area[ok, None]
+    planes = [(tris, n, -(n * p0).sum(axis=1), area * 0.5)]
+
+    # Aristas de borde: aparecen en un solo triángulo
+    edges = np.concatenate((tris[:, [0, 1]], tris[:, [1, 2]], tris[:, [2, 0]]))
+    owner = np.tile(np.arange(len(tris)), 3)
+    key = np.sort(edges, axis=1)
+    _, inverse, counts = np.unique(key, axis=0, return_inverse=True, return_counts=True)
+    border = counts[inverse.ravel()] == 1
+    if border.any() and boundaryWeight > 0:
+        e = edges[border]
+        d = P[e[:, 1]] - P[e[:, 0]]
+        bn = np.cross(d, n[owner[border]])
+        length = np.linalg.norm(bn, axis=1)
+        good = length > 0
+        bn[good] /= length[good, None]
+        planes.append((e, bn, -(bn * P[e[:, 0]]).sum(axis=1),
+                       boundaryWeight * (d * d).sum(axis=1)))
+
+    Q = np.zeros((len(P), 10))
+    for corners, normal, offset, weight in planes:
+        a, b, c = normal.T
+        coeffs = np.stack((a * a, a * b, a * c, a * offset, b * b, b * c, b * offset,
+                           c * c, c * offset, offset * offset), axis=1) * weight[:, None]
+        for column in corners.T:
+            np.add.at(Q, column, coeffs)
+    return Q.tolist()
+
+
+def _quadric_error(q, x, y, z):
+    return (q[0] * x * x + 2 * q[1] * x * y + 2 * q[2] * x * z + 2 * q[3] * x
+            + q[4] * y * y + 2 * q[5] * y * z + 2 * q[6] * y
+            + q[7] * z * z + 2 * q[8] * z + q[9])
+
+
+def _best_position(q, pa, pb):
+    """Punto que minimiza la cuádrica q (Cramer); si es singular, el mejor entre extremos y medio."""
+    a, b, c, d, e, f, g, h, i, _ = q
+    mid = ((pa[0] + pb[0]) * 0.5, (pa[1] + pb[1]) * 0.5, (pa[2] + pb[2]) * 0.5)
+    det = a * (e * h - f * f) - b * (b * h - f * c) + c * (b * f - e * c)
+    if det != 0.0:
+        # Resuelve [[a b c] [b e f] [c f h]] v = r con r = -(d, g, i)
+        r0, r1, r2 = -d, -g, -i
+        x = (r0 * (e * h - f * f) - b * (r1 * h - f * r2) + c * (r1 * f - e * r2)) / det
+        y = (a * (r1 * h - f * r2) - r0 * (b * h - f * c) + c * (b * r2 - r1 * c)) / det
+        z = (a * (e * r2 - r1 * f) - b * (b * r2 - r1 * c) + r0 * (b * f - e * c)) / det
+
+        # Casi singular (zonas planas): el punto puede salir lejísimos de la arista
+        length2 = (pb[0] - pa[0]) ** 2 + (pb[1] - pa[1]) ** 2 + (pb[2] - pa[2]) ** 2
+        if (x - mid[0]) ** 2 + (y - mid[1]) ** 2 + (z - mid[2]) ** 2 <= 4.0 * length2:
+            return _quadric_error(q, x, y, z), (x, y, z)
+
+    return min((_quadric_error(q, *p), p) for p in (pa, pb, mid))
+
+
+def _normal(p0, p1, p2):
+    ux, uy, uz = p1[0] - p0[0], p1[1] - p0[1], p1[2] - p0[2]
+    vx, vy, vz = p2[0] - p0[0], p2[1] - p0[1], p2[2] - p0[2]
+    return (uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx)
+
+
+def simplify_mesh(positions, indices, targetTriangles, boundaryWeight=10.0, maxError=None):
+    """
+    Simplificación por colapso de aristas con métrica de error cuádrica
+    (Garland & Heckbert 1997). Los vértices se unen por posición exacta, así
+    las costuras de UV/normales no cortan la malla. Se descartan colapsos que
+    dan vuelta triángulos vecinos.
+
+    Devuelve (triángulos conservados (K,) en el orden original,
+              esquinas (K, 3) con índices a 'welded', welded (W, 3) float32).
+    Python puro: para mallas de decenas de miles de triángulos, una vez al
+    cargar (el resultado va a la caché .mesh).
+    """
+    positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+    P, weld = np.unique(positions, axis=0, return_inverse=True)
+    tris = weld.ravel()[np.asarray(indices, dtype=np.int64)].reshape(-1, 3)
+
+    Q = _plane_quadrics(P.astype(np.float64), tris, boundaryWeight)
+    pos = P.astype(np.float64).tolist()
+    triList = tris.tolist()
+    alive = [t[0] != t[1] and t[1] != t[2] and t[0] != t[2] for t in triList]
+    liveCount = sum(alive)
+
+    vertTris = [set() for _ in range(len(pos))]
+    for t, tri in enumerate(triList):
+        if alive[t]:
+            for v in tri:
+                vertTris[v].add(t)
+    version = [0] * len(pos)
+
+    heap = []
+
+    def push(a, b):
+        q = [x + y for x, y in zip(Q[a], Q[b])]
+        cost, target = _best_position(q, pos[a], pos[b])
+        heapq.heappush(heap, (cost, a, b, version[a], version[b], target))
+
+    seen = set()
+    for tri in (triList[t] for t in range(len(triList)) if alive[t]):
+        for a, b in ((tri[0], tri[1]), (tri[1], tri[2]), (tri[2], tri[0])):
+            edge = (a, b) if a < b else (b, a)
+            if edge not in seen:
+                seen.add(edge)
+                push(*edge)
+
+    while heap and liveCount > targetTriangles:
+        cost, a, b, va, vb, target = heapq.heappop(heap)
+        if version[a] != va or version[b] != vb:
+            continue
+        if maxError is not None and cost > maxError:
+            break
+
+        # No dar vuelta (ni aplastar) los triángulos que sobreviven
+        flips = False
+        for v, other in ((a, b), (b, a)):
+            for t in vertTris[v]:
+                tri = triList[t]
+                if other in tri:
+                    continue
+                old = [pos[x] for x in tri]
+                new = [target if x == v else pos[x] for x in tri]
+                n0 = _normal(*old)
+                n1 = _normal(*new)
+                if n0[0] * n1[0] + n0[1] * n1[1] + n0[2] * n1[2] <= 0.0:
+                    flips = True
+                    break
+            if flips:
+                break
+        if flips:
+            continue
+
+        # Colapsa a -> b (b queda en 'target')
+        for t in list(vertTris[a]):
+            tri = triList[t]
+            if b in tri:
+                alive[t] = False
+                liveCount -= 1
+                for x in tri:
+                    vertTris[x].discard(t)
+            else:
+                tri[tri.index(a)] = b
+                vertTris[b].add(t)
+        vertTris[a] = set()
+
+        pos[b] = target
+        Q[b] = [x + y for x, y in zip(Q[a], Q[b])]
+        version[a] += 1
+        version[b] += 1
+
+        neighbors = {x for t in vertTris[b] for x in triList[t]}
+        neighbors.discard(b)
+        for x in neighbors:
+            push(min(x, b), max(x, b))
+
+    kept = np.flatnonzero(alive)
+    corners = np.asarray([triList[t] for t in kept], dtype=np.int64).reshape(-1, 3)
+    return kept, corners, np.asarray(pos, dtype=np.float32).reshape(-1, 3)
+
+
+def acmr(indices, cacheSize=16):
+    """Average Cache Miss Ratio con una caché FIFO (misses por triángulo)."""
+    indices = np.asarray(indices).tolist()
+    if not indices:
+        return 0.0
+    cache = []
+    inCache = set()
+    misses = 0
+    for v in indices:
+        if v not in inCache:
+            misses += 1
+            cache.append(v)
+            inCache.add(v)
+            if len(cache) > cacheSize:
+                inCache.discard(cache.pop(0))
+    return misses / (len(indices) / 3)
@@ -2,139 +2,520 @@
 # (mantén este comentario con el nombre del archivo)
 
 from OpenGL.GL import *
-from obj import Obj, get_diffuse_maps_from_obj, parse_mtl_maps
-from buffer import Buffer
+from obj import Obj, get_diffuse_maps_from_obj, parse_mtl_maps, parse_mtl_materials
+from buffer import Buffer, IndexBuffer, InterleavedBuffer
+from mesh import (bounding_volumes, box_arrays, build_triangle_arrays, deduplicate_vertices, index_dtype,
+                  interleave_vertices, optimize_vertex_cache, reorder_vertices_by_use, simplify_mesh,
+                  sort_by_group, triangle_groups, triangle_normals)
+from transforms import TransformSystem, TransformVector, sceneTransforms
+from assetcache import cache_path, read_blob, write_blob
+from texturecache import textureCache
 
+import ctypes
 import glm
+import numpy as np
 import os
-import pygame
+
+
+# Subir cuando cambie lo que produce BuildArrays (invalida los .mesh viejos)
+MESH_CACHE_VERSION = 4
+
+# Diámetro en pantalla (pixeles) por debajo del cual se pasa al siguiente nivel de detalle
+LOD_SCREEN_SIZES = (320, 160, 80, 40, 20)
+
+# Formatos de vértice en la GPU (los shaders ven lo mismo en las locations 0..2):
+#   "float"     : tres VBOs float32 (posición, UV, normal), 32 bytes por vértice
+#   "packed"    : un VBO intercalado, UV half float y normal 2_10_10_10, 20 bytes
+#   "quantized" : como "packed" pero con posiciones int16 normalizadas, 16 bytes
+#                 (la decuantización va en la matriz de modelo, ver GetDrawMatrix).
+#                 Los shaders que deforman en espacio local (fat, water, twist) ven
+#                 coordenadas centradas y escaladas: con ellos conviene "packed"
+# (location, componentes, tipo, normalizado, offset) de los formatos intercalados
+VERTEX_ATTRIBUTES = {
+    "packed":    [(0, 3, GL_FLOAT, GL_FALSE, 0),
+                  (1, 2, GL_HALF_FLOAT, GL_FALSE, 12),
+                  (2, 4, GL_INT_2_10_10_10_REV, GL_TRUE, 16)],
+    "quantized": [(0, 3, GL_SHORT, GL_TRUE, 0),
+                  (1, 2, GL_HALF_FLOAT, GL_FALSE, 8),
+                  (2, 4, GL_INT_2_10_10_10_REV, GL_TRUE, 12)],
+}
 
 
 class Model(object):
-    def __init__(self, filename):
-        self.objFile = Obj(filename)
+    """
+    Modelo OBJ listo para dibujar. Con load=False no se lee nada: el modelo queda
+    vacío (se dibuja como una caja) hasta que alguien le pase sus arrays, p. ej.
+    AssetLoader con ApplyMeshData() + UploadSteps().
+    """
+    def __init__(self, filename, useCache=True, cacheDir=None, indexed=True, optimizeCache=False,
+                 lodLevels=0, lodRatio=0.5, vertexFormat="float", load=True, transforms=None):
+        if vertexFormat != "float" and vertexFormat not in VERTEX_ATTRIBUTES:
+            raise ValueError(f"Formato de vértice desconocido: '{vertexFormat}'")
+
         self.path = filename
+        self.indexed = indexed              # vértices únicos + glDrawElements
+        self.optimizeCache = optimizeCache  # reordenar triángulos (Tipsify) al construir
+        self.lodLevels = lodLevels          # niveles simplificados extra (ver BuildLods)
+        self.lodRatio = lodRatio            # fracción de triángulos de cada nivel respecto al anterior
+        self.vertexFormat = vertexFormat    # ver VERTEX_ATTRIBUTES
+        self.objFile = None
+        self.mtlPath = None
+        self.diffuseMaps = None   # map_Kd resueltos (None = aún no se leyó el .mtl)
+
+        # Transformación en un TransformSystem (sceneTransforms salvo que se pase
+        # otro): position, rotation y scale escriben en su índice y la matriz se
+        # calcula junto con la de todos los demás
+        self.transforms = transforms if transforms is not None else sceneTransforms
+        self.transformIndex = self.transforms.Add()
+        self._position = TransformVector(self.transforms, "positions", self.transformIndex)
+        self._rotation = TransformVector(self.transforms, "rotations", self.transformIndex)
+        self._scale    = TransformVector(self.transforms, "scales", self.transformIndex)
+
+        # La matriz como glm.mat4 y el 'stamp' del sistema del que salió (ver GetModelMatrix)
+        self.modelMatrix = None
+        self.modelMatrixStamp = None
 
-        self.position = glm.vec3(0, 0, 0)
-        self.rotation = glm.vec3(0, 0, 0)
-        self.scale    = glm.vec3(1, 1, 1)
+        # Con posiciones cuantizadas: matriz que las lleva a espacio local, y la
+        # última modelMatrix * vertexMatrix (ver GetDrawMatrix)
+        self.vertexMatrix = None
+        self.drawMatrix = None
 
-        self.BuildBuffers()
         self.textures = []  # GL texture ids (tex0, tex1, ...)
 
+        # Transparente: se dibuja después de los opacos, de atrás hacia adelante y con blending
+        self.transparent = False
+
+        # Rangos por material: [{"material", "texture", "first", "count"}, ...]
+        # first/count en vértices (o índices si hay element buffer)
+        self.submeshes = []
+        self.materialTextures = {}  # ruta map_Kd -> GL texture id (compartidas)
+        self.textureRefs = []       # ids pedidos a textureCache (se sueltan en Delete)
+
+        # Niveles de detalle: [{"submeshes", "triangles"}, ...], 0 = malla completa.
+        # Vacío si no hay LODs; lodLevel lo elige Renderer según el tamaño en pantalla.
+        self.lods = []
+        self.lodLevel = 0
+        self.lodScreenSizes = LOD_SCREEN_SIZES
+
+        self.VAO = None             # None mientras no se hayan subido los arrays
+        self.vertexCount = 0
+        self.posBuffer = self.texCoordsBuffer = self.normalsBuffer = self.indexBuffer = None
+        self.vertexBuffer = None    # InterleavedBuffer con los formatos "packed" / "quantized"
+
+        # Volúmenes envolventes en espacio local (None = sin malla todavía, no se descarta)
+        self.boundsMin = self.boundsMax = None
+        self.boundsCenter = None
+        self.boundsRadius = 0.0
+        self.worldBounds = None   # (stamp, (min, max), (centro, radio)) en mundo
+
+        if load:
+            self.UploadArrays(self.LoadArrays(useCache, cacheDir))
+
+    # position / rotation / scale: glm.vec3 que se pueden cambiar en el lugar
+    # (rotation.y += ...) o reemplazar; en los dos casos marcan la matriz
+
+    @property
+    def position(self):
+        return self._position
+
+    @position.setter
+    def position(self, value):
+        self._position.Assign(value)
+
+    @property
+    def rotation(self):
+        return self._rotation
+
+    @rotation.setter
+    def rotation(self, value):
+        self._rotation.Assign(value)
+
+    @property
+    def scale(self):
+        return self._scale
+
+    @scale.setter
+    def scale(self, value):
+        self._scale.Assign(value)
+
     def GetModelMatrix(self):
-        I = glm.mat4(1)
-        T = glm.translate(I, self.position)
-        Rx = glm.rotate(I, glm.radians(self.rotation.x), glm.vec3(1, 0, 0))
-        Ry = glm.rotate(I, glm.radians(self.rotation.y), glm.vec3(0, 1, 0))
-        Rz = glm.rotate(I, glm.radians(self.rotation.z), glm.vec3(0, 0, 1))
-        R = Rx * Ry * Rz
-        S = glm.scale(I, self.scale)
-        return T * R * S
+        # Las matrices las calcula self.transforms para todos los modelos juntos
+        # (Renderer llama a Update() una vez por frame); acá solo se pasa a
+        # glm.mat4 la que cambió. Devuelve la matriz guardada: no modificarla.
+        transforms, index = self.transforms, self.transformIndex
+        if transforms.dirty[index]:
+            transforms.Update()
+        stamp = transforms.stamps[index]
+        if stamp != self.modelMatrixStamp:
+            self.modelMatrix = transforms.Matrix(index)
+            self.modelMatrixStamp = stamp
+        return self.modelMatrix
+
+    def GetDrawMatrix(self):
+        """
+        La matriz para el uniform modelMatrix: GetModelMatrix() con la
+        decuantización de posiciones ya aplicada (la misma matriz si no hay).
+        """
+        matrix = self.GetModelMatrix()
+        if self.vertexMatrix is None:
+            return matrix
+        if self.drawMatrix is None or self.drawMatrix[0] is not matrix:
+            self.drawMatrix = (matrix, matrix * self.vertexMatrix)
+        return self.drawMatrix[1]
+
+    def SetBounds(self, positions):
+        """AABB + esfera locales desde las posiciones finales de la malla."""
+        self.boundsMin, self.boundsMax, self.boundsCenter, self.boundsRadius = bounding_volumes(positions)
+        self.transforms.SetBounds(self.transformIndex, self.boundsMin, self.boundsMax,
+                                  self.boundsCenter, self.boundsRadius)
+        self.worldBounds = None
+
+    def GetWorldBounds(self):
+        """
+        ((min, max), (centro, radio)) en mundo con la matriz de modelo actual, o
+        None si todavía no hay malla. Salen de self.transforms (calculadas en su
+        Update()); la tupla es nueva solo si cambiaron.
+        """
+        if self.boundsMin is None:
+            return None
+        transforms, index = self.transforms, self.transformIndex
+        if transforms.dirty[index]:
+            transforms.Update()
+        stamp = transforms.stamps[index]
+        if self.worldBounds is None or self.worldBounds[0] != stamp:
+            self.worldBounds = (stamp, (transforms.worldMins[index].copy(), transforms.worldMaxs[index].copy()),
+                                (transforms.worldCenters[index].copy(), float(transforms.worldRadii[index])))
+        return self.worldBounds[1], self.worldBounds[2]
 
     # -------------- Parser robusto -> Buffers -----------------
 
-    def BuildBuffers(self):
-        """Triangula caras de N lados y tolera faltas de vt / vn."""
-        V = self.objFile.vertices
-        VT = self.objFile.texCoords
-        VN = self.objFile.normals
-
-        positions = []
-        texCoords = []
-        normals   = []
-
-        def add_triangle(a, b, c):
-            # a,b,c = (v,vt,vn)
-            idx = [a, b, c]
-            # posiciones de los 3 vértices (obligatorio tener v)
-            P = []
-            UV = []
-            NN = []
-
-            for (v, vt, vn) in idx:
-                # v es obligatorio
-                p = V[v - 1] if v > 0 else [0.0, 0.0, 0.0]
-                P.append(p)
-                # uv opcional
-                uv = VT[vt - 1] if vt > 0 and vt <= len(VT) else [0.0, 0.0]
-                UV.append(uv)
-                # normal opcional, si no hay la calculamos luego
-                n = VN[vn - 1] if vn > 0 and vn <= len(VN) else None
-                NN.append(n)
-
-            # Si faltan normales, calcula normal por triángulo
-            if NN[0] is None or NN[1] is None or NN[2] is None:
-                import math
-                p1 = glm.vec3(P[0][0], P[0][1], P[0][2])
-                p2 = glm.vec3(P[1][0], P[1][1], P[1][2])
-                p3 = glm.vec3(P[2][0], P[2][1], P[2][2])
-                ntri = glm.normalize(glm.cross(p2 - p1, p3 - p1))
-                ntri = [float(ntri.x), float(ntri.y), float(ntri.z)]
-                NN = [ntri, ntri, ntri]
+    def LoadArrays(self, useCache=True, cacheDir=None):
+        """Arrays finales desde la caché o desde el OBJ (solo CPU, no toca GL)."""
+        arrays = self.LoadCachedArrays(cacheDir) if useCache else None
+        if arrays is None:
+            self.objFile = Obj(self.path)
+            self.mtlPath = self.objFile.mtl_path
+            arrays = self.BuildArrays()
+            if useCache:
+                self.StoreCachedArrays(arrays, cacheDir)
+        return arrays
+
+    def ApplyMeshData(self, data):
+        """Toma el resultado de load_mesh_data() y devuelve sus arrays para subirlos."""
+        self.mtlPath = data["mtlPath"]
+        self.diffuseMaps = data["diffuseMaps"]
+        self.submeshes = data["submeshes"]
+        self.lods = data.get("lods", [])
+        return data["arrays"]
+
+    def BuildArrays(self):
+        """Arrays finales: la malla base y, con lodLevels, sus niveles de detalle (BuildLods)."""
+        arrays = self.BuildBaseArrays()
+        if self.lodLevels:
+            arrays = self.BuildLods(arrays)
+        return arrays
+
+    def BuildBaseArrays(self):
+        """
+        Triangula caras de N lados y tolera faltas de vt / vn.
+        Con 'indexed' une los vértices repetidos y agrega "indices".
+        Los triángulos quedan agrupados por material (ver BuildSubmeshes).
+        """
+        positions, texCoords, normals = build_triangle_arrays(self.objFile.vertexArray,
+                                                              self.objFile.texCoordArray,
+                                                              self.objFile.normalArray,
+                                                              self.objFile.faceIndices,
+                                                              self.objFile.faceOffsets)
+        order = self.BuildSubmeshes()
+        if order is not None:
+            positions, texCoords, normals = (a.reshape(-1, 3, a.shape[1])[order].reshape(-1, a.shape[1])
+                                             for a in (positions, texCoords, normals))
+
+        if not self.indexed:
+            return {"positions": positions, "texCoords": texCoords, "normals": normals}
+
+        expanded = {"positions": positions, "texCoords": texCoords, "normals": normals}
+        positions, texCoords, normals, indices = deduplicate_vertices(positions, texCoords, normals)
+
+        # Con normales planas casi no hay esquinas compartidas: si indexar no
+        # ahorra memoria se queda la versión expandida
+        if positions.nbytes + texCoords.nbytes + normals.nbytes + indices.nbytes >= \
+                sum(a.nbytes for a in expanded.values()):
+            return expanded
+
+        if self.optimizeCache:
+            # Por rango, para no mezclar triángulos de distintos materiales
+            for sub in self.submeshes or [{"first": 0, "count": len(indices)}]:
+                a, b = sub["first"], sub["first"] + sub["count"]
+                indices[a:b] = optimize_vertex_cache(indices[a:b], len(positions))
+            positions, texCoords, normals, indices = reorder_vertices_by_use(indices, positions,
+                                                                             texCoords, normals)
+        return {"positions": positions, "texCoords": texCoords, "normals": normals,
+                "indices": indices}
+
+    def BuildLods(self, arrays):
+        """
+        Agrega hasta lodLevels niveles simplificados (mesh.simplify_mesh, cada uno
+        con ~lodRatio de los triángulos del anterior) a continuación de la malla
+        base, en los mismos buffers: cambiar de nivel es dibujar otros rangos.
+        Cada esquina conserva su UV; las normales planas (OBJ sin vn) se recalculan.
+        Sin 'indexed' los niveles se expanden a arrays planos (para glDrawArrays).
+        """
+        positions, texCoords, normals = arrays["positions"], arrays["texCoords"], arrays["normals"]
+        indices = arrays.get("indices")
+        if indices is None:
+            indices = np.arange(len(positions))
+        indices = np.asarray(indices, dtype=np.int64)
+
+        if not self.submeshes:
+            self.submeshes = [{"material": None, "texture": None, "first": 0, "count": len(indices)}]
+        self.lods = [{"submeshes": self.submeshes, "triangles": len(indices) // 3}]
+
+        corners = normals[indices].reshape(-1, 3, 3)
+        flat = bool((corners == corners[:, :1]).all())
+
+        # Rango (material) de cada triángulo; los niveles conservan el orden
+        triRange = np.repeat(np.arange(len(self.submeshes)), [sub["count"] // 3 for sub in self.submeshes])
+        parts = [(positions, texCoords, normals, indices)]
+        vertexOffset, indexOffset = len(positions), len(indices)
+
+        for level in range(1, self.lodLevels + 1):
+            target = int(self.lods[0]["triangles"] * self.lodRatio ** level)
+            if target < 4:
+                break
+            kept, welded, weldedPositions = simplify_mesh(positions, indices, target)
+            if len(kept) >= self.lods[-1]["triangles"]:
+                break
+            source = indices.reshape(-1, 3)[kept].ravel()
+            triRange = triRange[kept]
+
+            if flat:
+                positions = weldedPositions[welded.ravel()]
+                texCoords = texCoords[source]
+                normals = np.repeat(triangle_normals(positions[0::3], positions[1::3], positions[2::3]),
+                                    3, axis=0)
+                indices = np.arange(len(positions))
             else:
-                # asegurar ser listas de float
-                NN = [[float(x), float(y), float(z)] for (x, y, z) in NN]
-
-            # push a arrays finales
-            for i in range(3):
-                positions.extend(P[i])
-                texCoords.extend(UV[i])
-                normals.extend(NN[i])
-
-        # triangulación por "fan"
-        for face in self.objFile.faces:
-            if len(face) < 3:
-                continue
-            for i in range(1, len(face) - 1):
-                add_triangle(face[0], face[i], face[i + 1])
-
-        self.vertexCount = len(positions) // 3
-        self.posBuffer      = Buffer(positions)
-        self.texCoordsBuffer= Buffer(texCoords)
-        self.normalsBuffer  = Buffer(normals)
+                # Un vértice por (posición simplificada, atributos de la esquina original)
+                pairs, indices = np.unique(np.stack((welded.ravel(), source), axis=1), axis=0,
+                                           return_inverse=True)
+                indices = indices.ravel()
+                positions = weldedPositions[pairs[:, 0]]
+                texCoords = texCoords[pairs[:, 1]]
+                normals = normals[pairs[:, 1]]
 
-    # -------------- Texturas (BMP/PNG con alfa) ----------------
+            submeshes = []
+            first = indexOffset
+            for sub, count in zip(self.submeshes, np.bincount(triRange, minlength=len(self.submeshes))):
+                if count:
+                    submeshes.append({"material": sub["material"], "texture": sub["texture"],
+                                      "first": first, "count": int(count) * 3})
+                    first += int(count) * 3
+            self.lods.append({"submeshes": submeshes, "triangles": len(kept)})
 
-    def AddTexture(self, filename):
-        """Carga BMP/JPG/PNG (RGBA si aplica), flip vertical, mipmaps."""
-        if not os.path.isfile(filename):
-            print(f"[Model] ⚠ No existe la textura: {filename}")
-            return
-        try:
-            surf = pygame.image.load(filename)
-            surf = pygame.transform.flip(surf, False, True)
-            surf = surf.convert_alpha()
+            parts.append((positions, texCoords, normals, indices + vertexOffset))
+            vertexOffset += len(positions)
+            indexOffset += len(indices)
+
+        positions = np.concatenate([p[0] for p in parts]).astype(np.float32)
+        texCoords = np.concatenate([p[1] for p in parts]).astype(np.float32)
+        normals = np.concatenate([p[2] for p in parts]).astype(np.float32)
+        indices = np.concatenate([p[3] for p in parts])
+        if not self.indexed:
+            # Una esquina por vértice: los rangos (first/count en el flujo de
+            # índices) quedan iguales, ahora en vértices
+            return {"positions": positions[indices], "texCoords": texCoords[indices],
+                    "normals": normals[indices]}
+        return {"positions": positions, "texCoords": texCoords, "normals": normals,
+                "indices": indices.astype(index_dtype(vertexOffset))}
+
+    def BuildSubmeshes(self):
+        """
+        Un rango contiguo por material ('usemtl'). Los materiales se ordenan por
+        textura difusa para que los que comparten archivo queden seguidos.
+        Devuelve el orden de triángulos a aplicar (None si no hay materiales).
+        """
+        obj = self.objFile
+        self.submeshes = []
+        if not obj.materialNames:
+            return None
+
+        textures = {}
+        if self.mtlPath:
+            for name, maps in parse_mtl_materials(self.mtlPath).items():
+                if maps.get("map_Kd"):
+                    textures[name] = os.path.normpath(maps["map_Kd"])
+
+        # Material -1 (caras antes de cualquier usemtl) usa rank[-1] y va primero
+        names = obj.materialNames
+        byTexture = sorted(range(len(names)), key=lambda m: (textures.get(names[m]) or "", m))
+        rank = [0] * (len(names) + 1)
+        for r, m in enumerate(byTexture):
+            rank[m] = r
+        rank[-1] = -1
+
+        triGroups = triangle_groups(obj.faceOffsets, obj.faceMaterials)
+        order, ranges = sort_by_group(triGroups, rank)
 
-            w, h = surf.get_size()
-            pixels = pygame.image.tostring(surf, "RGBA", True)
+        for m, first, count in ranges:
+            name = names[m] if m >= 0 else None
+            self.submeshes.append({"material": name, "texture": textures.get(name),
+                                   "first": first * 3, "count": count * 3})
+        return order
 
-            glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
-            tex_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, tex_id)
+    def MeshLayout(self):
+        """Identifica el formato de los arrays (se guarda en la caché)."""
+        if not self.indexed:
+            layout = "expanded"
+        else:
+            layout = "indexed+vcache" if self.optimizeCache else "indexed"
+        if self.lodLevels:
+            layout += f"+lod{self.lodLevels}x{self.lodRatio}"
+        return layout
+
+    def BuildBuffers(self):
+        self.UploadArrays(self.BuildArrays())
+
+    def UploadArrays(self, arrays):
+        """Sube los arrays finales (propios o mapeados desde la caché) a la GPU."""
+        for _ in self.UploadSteps(arrays):
+            pass
+
+    def UploadSteps(self, arrays, chunkBytes=None):
+        """
+        Generador: sube los arrays en partes de 'chunkBytes' (todo junto si es
+        None) entregando los bytes de cada parte. El VAO se arma al final, así
+        que el modelo no se dibuja hasta que todo está en la GPU.
+        """
+        if self.vertexFormat == "float":
+            self.posBuffer      = Buffer(arrays["positions"], upload=False)
+            self.texCoordsBuffer= Buffer(arrays["texCoords"], upload=False)
+            self.normalsBuffer  = Buffer(arrays["normals"], upload=False)
+        else:
+            # Se empaqueta al subir: la caché sigue guardando float32 y sirve para cualquier formato
+            vertices, dequantize = interleave_vertices(arrays["positions"], arrays["texCoords"],
+                                                       arrays["normals"], self.vertexFormat == "quantized")
+            self.vertexBuffer = InterleavedBuffer(vertices, VERTEX_ATTRIBUTES[self.vertexFormat], upload=False)
+            if dequantize is not None:
+                center, scale = dequantize
+                self.vertexMatrix = glm.scale(glm.translate(glm.mat4(1), glm.vec3(*center.tolist())),
+                                              glm.vec3(scale))
+
+        # Sin "indices" se dibuja expandido con glDrawArrays
+        self.indexBuffer = IndexBuffer(arrays["indices"], upload=False) if "indices" in arrays else None
+
+        for buf in self.Buffers():
+            yield from buf.UploadSteps(chunkBytes)
+
+        self.vertexCount = len(arrays["positions"])
+        self.SetBounds(arrays["positions"])
+        self.BuildVertexArray()
+
+    # -------------- Caché binaria (.mesh) ----------------
+
+    def LoadCachedArrays(self, cacheDir=None):
+        """Arrays finales desde la caché (memmap), o None si no hay o está vieja."""
+        blob = read_blob(cache_path(self.path, "mesh", cacheDir), MESH_CACHE_VERSION)
+        if blob is None:
+            return None
+
+        meta, arrays = blob
+        if meta.get("layout") != self.MeshLayout():
+            return None
+        self.mtlPath = meta.get("mtl_path")
+        self.diffuseMaps = meta.get("diffuse_maps")
+        self.submeshes = meta.get("submeshes", [])
+        self.lods = meta.get("lods", [])
+        return arrays
 
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, w, h, 0, GL_RGBA, GL_UNSIGNED_BYTE, pixels)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glGenerateMipmap(GL_TEXTURE_2D)
+    def StoreCachedArrays(self, arrays, cacheDir=None):
+        """Guarda arrays + referencias de texturas; depende del OBJ y del MTL."""
+        if self.mtlPath:
+            maps = parse_mtl_maps(self.mtlPath)
+            self.diffuseMaps = [p for p in maps.get("map_Kd", []) if p]
 
+        meta = {"mtl_path": self.mtlPath, "diffuse_maps": self.diffuseMaps,
+                "layout": self.MeshLayout(), "submeshes": self.submeshes, "lods": self.lods}
+        ok = write_blob(cache_path(self.path, "mesh", cacheDir), MESH_CACHE_VERSION,
+                        [self.path, self.mtlPath], arrays, meta)
+        if not ok:
+            print(f"[Model] ⚠ No se pudo escribir la caché de {self.path}")
+
+    def BuildVertexArray(self):
+        """Graba en un VAO los bindings de atributos (una sola vez)."""
+        self.VAO = glGenVertexArrays(1)
+        glBindVertexArray(self.VAO)
+        self.BindAttributes()
+        glBindVertexArray(0)
+
+    def BindAttributes(self):
+        """Atributos 0..2 (+ EBO) en el VAO ligado; otros VAOs pueden compartir los buffers."""
+        if self.vertexBuffer is not None:
+            self.vertexBuffer.Use()
+        else:
+            self.posBuffer.Use(0, 3)
+            self.texCoordsBuffer.Use(1, 2)
+            self.normalsBuffer.Use(2, 3)
+
+        if self.indexBuffer is not None:
+            self.indexBuffer.Use()
+
+    def Buffers(self):
+        """Los buffers de vértices e índices que existen."""
+        return [buf for buf in (self.posBuffer, self.texCoordsBuffer, self.normalsBuffer,
+                                self.vertexBuffer, self.indexBuffer) if buf is not None]
+
+    def VertexBytes(self):
+        """Bytes de vértices (sin índices) en la GPU."""
+        if self.vertexBuffer is not None:
+            return self.vertexBuffer.data.nbytes
+        return sum(buf.vertexBuffer.nbytes for buf in (self.posBuffer, self.texCoordsBuffer, self.normalsBuffer)
+                   if buf is not None)
+
+    # -------------- Texturas (BMP/PNG con alfa) ----------------
+
+    def AddTexture(self, filename):
+        """Agrega una textura a la lista tex0, tex1, ..."""
+        tex_id = self.LoadTexture(filename)
+        if tex_id is not None:
             self.textures.append(tex_id)
-            print(f"[Model] ✓ Textura cargada: {filename}")
-        except Exception as e:
-            print(f"[Model] ✖ Error cargando textura {filename}: {e}")
+
+    def LoadTexture(self, filename):
+        """
+        Textura compartida desde la caché global (BMP/JPG/PNG, RGBA, flip vertical,
+        mipmaps; comprimida si se preprocesó con texturebuild.py). Devuelve el
+        id o None; Delete() suelta las referencias.
+        """
+        tex_id = textureCache.Acquire(filename)
+        if tex_id is not None:
+            self.textureRefs.append(tex_id)
+        return tex_id
+
+    def LoadMaterialTextures(self):
+        """
+        Carga el map_Kd de cada material una sola vez; los rangos que usan el
+        mismo archivo comparten la textura. En Render cada rango la usa como tex0.
+        """
+        for sub in self.submeshes:
+            path = sub["texture"]
+            if path and path not in self.materialTextures:
+                tex_id = self.LoadTexture(path)
+                if tex_id is not None:
+                    self.materialTextures[path] = tex_id
 
     def AddDiffuseFromMTL(self, load_all=False):
         """
         Carga texturas difusas (map_Kd) del .mtl del OBJ.
           - load_all=False: solo el primer map_Kd -> tex0
           - load_all=True : todos los map_Kd     -> tex0, tex1, ...
+        Para texturizar cada material con su propio map_Kd usa LoadMaterialTextures().
         """
         diffuse_maps = []
-        # Preferimos mtl ya resuelto por el parser:
-        if getattr(self.objFile, "mtl_path", None):
-            maps = parse_mtl_maps(self.objFile.mtl_path)
+        # Preferimos mtl ya resuelto por el parser (o guardado en la caché):
+        if self.diffuseMaps is not None:
+            diffuse_maps = list(self.diffuseMaps)
+        elif self.mtlPath:
+            maps = parse_mtl_maps(self.mtlPath)
             diffuse_maps = [p for p in maps.get("map_Kd", []) if p]
         else:
             diffuse_maps = get_diffuse_maps_from_obj(self.path)
@@ -150,20 +531,145 @@ class Model(object):
             if os.path.isfile(p):
                 self.AddTexture(p)
 
+    def Delete(self):
+        """Libera buffers, VAO, las referencias a texturas compartidas y su lugar en self.transforms."""
+        if self.transformIndex is not None:
+            self.transforms.Release(self.transformIndex)
+            self.transformIndex = None
+
+        for tex_id in self.textureRefs:
+            textureCache.Release(tex_id)
+        self.textureRefs = []
+        self.textures = []
+        self.materialTextures = {}
+
+        for buf in self.Buffers():
+            buf.Delete()
+        if self.VAO is not None:
+            glDeleteVertexArrays(1, [self.VAO])
+            self.VAO = None
+
     # -------------- Render ----------------
 
     def Render(self):
-        # Bindea todas las texturas cargadas secuencialmente (tex0, tex1, ...)
-        for i, tex in enumerate(self.textures):
-            glActiveTexture(GL_TEXTURE0 + i)
-            glBindTexture(GL_TEXTURE_2D, tex)
+        if self.VAO is None:
+            # Todavía cargando: una caja en su lugar
+            placeholder_model().Render()
+            return
+        self.Draw(self.VAO)
+
+    def Draw(self, vao, instances=None):
+        """
+        Texturas + un draw por material usando 'vao'. Con 'instances' cada draw
+        dibuja esa cantidad de copias (ver InstancedModel). Renderer no pasa por
+        acá: junta los mismos rangos en su RenderQueue (ver QueueDraws).
+        """
+        self.UploadDirty()
+
+        glBindVertexArray(vao)
+        # Un draw por material; solo se re-bindea una unidad cuando cambia su textura
+        bound = {}
+        for textures, first, count in self.DrawRanges():
+            for unit, tex in enumerate(textures):
+                if bound.get(unit) != tex:
+                    glActiveTexture(GL_TEXTURE0 + unit)
+                    glBindTexture(GL_TEXTURE_2D, tex)
+                    bound[unit] = tex
+            self.DrawRange(first, count, instances)
+        glBindVertexArray(0)
+
+    def UploadDirty(self):
+        """Solo se re-suben los buffers marcados con MarkDirty()."""
+        for buf in self.Buffers():
+            if buf.dirty:
+                buf.Upload()
+
+    def DrawRanges(self):
+        """
+        [(texturas por unidad, first, count), ...] con el nivel actual: uno por
+        material, con su map_Kd en la unidad 0 y el resto de self.textures
+        (tex1, ...) en las demás.
+        """
+        base = tuple(self.textures)
+        submeshes = self.lods[self.lodLevel]["submeshes"] if self.lods else self.submeshes
+        if not submeshes:
+            return [(base, 0, self.indexBuffer.count if self.indexBuffer else self.vertexCount)]
+
+        default = base[0] if base else None
+        ranges = []
+        for sub in submeshes:
+            tex = self.materialTextures.get(sub["texture"], default)
+            ranges.append((base if tex is None else (tex,) + base[1:], sub["first"], sub["count"]))
+        return ranges
+
+    def QueueDraws(self, queue, shader, depth):
+        """Agrega sus draws a 'queue' (RenderQueue); la caja de placeholder mientras carga."""
+        if self.VAO is None:
+            placeholder = placeholder_model()
+            queue.Add(placeholder, placeholder.VAO, shader, self.GetDrawMatrix(), depth, self.transparent)
+            return
+        self.UploadDirty()
+        queue.Add(self, self.VAO, shader, self.GetDrawMatrix(), depth, self.transparent)
+
+    def SelectLod(self, screenSize):
+        """Elige el nivel según el diámetro en pantalla (pixeles) y lodScreenSizes."""
+        if self.lods:
+            level = sum(1 for size in self.lodScreenSizes if screenSize < size)
+            self.lodLevel = min(level, len(self.lods) - 1)
+        return self.lodLevel
+
+    def TriangleCount(self):
+        """Triángulos que dibuja Render() con el nivel actual."""
+        if self.lods:
+            return self.lods[self.lodLevel]["triangles"]
+        if self.VAO is None:
+            return 12   # la caja de placeholder_model
+        return (self.indexBuffer.count if self.indexBuffer else self.vertexCount) // 3
+
+    def DrawCount(self):
+        """Draw calls de Render() con el nivel actual (uno por material)."""
+        if self.VAO is None:
+            return 1
+        submeshes = self.lods[self.lodLevel]["submeshes"] if self.lods else self.submeshes
+        return max(1, len(submeshes))
+
+    def DrawRange(self, first, count, instances=None):
+        if self.indexBuffer is not None:
+            offset = ctypes.c_void_p(first * self.indexBuffer.indexBuffer.itemsize)
+            if instances is None:
+                glDrawElements(GL_TRIANGLES, count, self.indexBuffer.type, offset)
+            else:
+                glDrawElementsInstanced(GL_TRIANGLES, count, self.indexBuffer.type, offset, instances)
+        elif instances is None:
+            glDrawArrays(GL_TRIANGLES, first, count)
+        else:
+            glDrawArraysInstanced(GL_TRIANGLES, first, count, instances)
+
+
+# -------------- Carga fuera del hilo de render ----------------
+
+def load_mesh_data(filename, useCache=True, cacheDir=None, indexed=True, optimizeCache=False,
+                   lodLevels=0, lodRatio=0.5, vertexFormat="float"):
+    """
+    Parte de CPU de Model (caché / OBJ -> arrays finales, materiales) sin tocar GL,
+    para correr en otro hilo o proceso. El resultado va a Model.ApplyMeshData().
+    """
+    # Un TransformSystem propio: este Model no se dibuja y sceneTransforms es del hilo de render
+    model = Model(filename, useCache, cacheDir, indexed, optimizeCache,
+                  lodLevels=lodLevels, lodRatio=lodRatio, vertexFormat=vertexFormat, load=False,
+                  transforms=TransformSystem(capacity=1))
+    arrays = model.LoadArrays(useCache, cacheDir)
+    return {"arrays": arrays, "mtlPath": model.mtlPath, "diffuseMaps": model.diffuseMaps,
+            "submeshes": model.submeshes, "lods": model.lods}
+
 
-        self.posBuffer.Use(0, 3)
-        self.texCoordsBuffer.Use(1, 2)
-        self.normalsBuffer.Use(2, 3)
+_placeholder = None
 
-        glDrawArrays(GL_TRIANGLES, 0, self.vertexCount)
 
-        glDisableVertexAttribArray(0)
-        glDisableVertexAttribArray(1)
-        glDisableVertexAttribArray(2)
+def placeholder_model():
+    """Caja unitaria compartida que se dibuja en lugar de los modelos que aún cargan."""
+    global _placeholder
+    if _placeholder is None:
+        _placeholder = Model(None, load=False)
+        _placeholder.UploadArrays(box_arrays())
+    return _placeholder
@@ -1,24 +1,228 @@
 # obj.py
 # (mantén este comentario con el nombre del archivo)
 
+import io
 import os
+import warnings
+
+import numpy as np
+
+from mesh import face_table
+
+
+# Tamaño de bloque para la lectura en streaming (bytes)
+CHUNK_SIZE = 1 << 24
+
 
 class Obj(object):
     """
     Lector OBJ robusto:
       - Acepta: v, vt, vn
       - Caras: v / v/vt / v//vn / v/vt/vn
-      - Guarda self.faces como lista de listas de tuplas (v, vt, vn) con índices 1-based o 0 si falta.
+      - Guarda los datos en arrays contiguos:
+          self.vertexArray   (N, 3) float32
+          self.texCoordArray (N, 2) float32
+          self.normalArray   (N, 3) float32
+          self.faceIndices   (M, 3) int32  -> (v, vt, vn) por esquina, 1-based o 0 si falta
+          self.faceOffsets   (F + 1,) int32 -> la cara i usa faceIndices[off[i]:off[i+1]]
+      - self.vertices / texCoords / normals / faces siguen disponibles como listas
+        (se generan bajo demanda a partir de los arrays).
       - self.mtl_path si hay 'mtllib'.
+      - Materiales ('usemtl'):
+          self.materialNames  [nombre, ...] en orden de aparición
+          self.faceMaterials  (F,) int32 -> índice en materialNames, -1 si no hay
+          self.materialRanges [(nombre, primera cara, nº de caras), ...] contiguos
+
+    streaming=True lee el archivo en bloques grandes y convierte los registros
+    numéricos en bloque; streaming=False usa el lector línea por línea original.
     """
-    def __init__(self, filename):
+    def __init__(self, filename, streaming=True):
         self.source_path = filename
-        self.vertices = []   # [ [x,y,z], ... ]
-        self.texCoords = []  # [ [u,v], ... ]
-        self.normals = []    # [ [nx,ny,nz], ... ]
-        self.faces = []      # [ [ (v,vt,vn), (v,vt,vn), ... ], ... ]
         self.mtl_path = None
 
+        self.vertexArray = None
+        self.texCoordArray = None
+        self.normalArray = None
+        self.faceIndices = None
+        self.faceOffsets = None
+
+        self.materialNames = []
+        self.faceMaterials = None
+        self._materialIds = {}
+        self._currentMaterial = -1
+
+        self._lists = {}
+
+        if streaming:
+            self._ParseStreaming(filename)
+        else:
+            self._ParseLines(filename)
+
+    # -------------- Compatibilidad (listas) ----------------
+
+    @property
+    def vertices(self):
+        if "vertices" not in self._lists:
+            self._lists["vertices"] = self.vertexArray.tolist()
+        return self._lists["vertices"]
+
+    @property
+    def texCoords(self):
+        if "texCoords" not in self._lists:
+            self._lists["texCoords"] = self.texCoordArray.tolist()
+        return self._lists["texCoords"]
+
+    @property
+    def normals(self):
+        if "normals" not in self._lists:
+            self._lists["normals"] = self.normalArray.tolist()
+        return self._lists["normals"]
+
+    @property
+    def faces(self):
+        if "faces" not in self._lists:
+            idx = [tuple(c) for c in self.faceIndices.tolist()]
+            off = self.faceOffsets.tolist()
+            self._lists["faces"] = [idx[off[i]:off[i + 1]] for i in range(len(off) - 1)]
+        return self._lists["faces"]
+
+    @property
+    def materialRanges(self):
+        mats = self.faceMaterials
+        if not len(mats):
+            return []
+        change = np.flatnonzero(mats[1:] != mats[:-1]) + 1
+        first = np.concatenate(([0], change)).tolist()
+        last = np.concatenate((change, [len(mats)])).tolist()
+        names = [self.materialNames[m] if m >= 0 else None for m in mats[first].tolist()]
+        return [(name, a, b - a) for name, a, b in zip(names, first, last)]
+
+    def _UseMaterial(self, line):
+        parts = line.split(None, 1)
+        if len(parts) < 2:
+            self._currentMaterial = -1
+            return
+        name = parts[1].strip()
+        if name not in self._materialIds:
+            self._materialIds[name] = len(self.materialNames)
+            self.materialNames.append(name)
+        self._currentMaterial = self._materialIds[name]
+
+    def _ResolveMtl(self, base_dir, line):
+        parts = line.split(None, 1)
+        if len(parts) == 2:
+            mtl_file = parts[1].strip()
+            cand = os.path.join(base_dir, mtl_file)
+            if os.path.isfile(cand):
+                self.mtl_path = cand
+            else:
+                alt = os.path.join(base_dir, os.path.basename(mtl_file))
+                if os.path.isfile(alt):
+                    self.mtl_path = alt
+
+    # -------------- Lector en streaming ----------------
+
+    def _ParseStreaming(self, filename):
+        base_dir = os.path.dirname(filename)
+        blocks = {"v": [], "vt": [], "vn": [], "idx": [], "counts": [], "mat": []}
+
+        with open(filename, "rb") as f:
+            tail = b""
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                chunk = tail + chunk
+                cut = chunk.rfind(b"\n") + 1
+                tail = chunk[cut:]
+                if cut:
+                    self._ParseChunk(chunk[:cut], base_dir, blocks)
+            if tail:
+                self._ParseChunk(tail, base_dir, blocks)
+
+        self.vertexArray = _concat(blocks["v"], (0, 3), np.float32)
+        self.texCoordArray = _concat(blocks["vt"], (0, 2), np.float32)
+        self.normalArray = _concat(blocks["vn"], (0, 3), np.float32)
+        idx = _concat(blocks["idx"], (0, 3), np.int32)
+        counts = _concat(blocks["counts"], (0,), np.int32)
+        mats = _concat(blocks["mat"], (0,), np.int32)
+
+        # Caras con menos de 3 esquinas se descartan
+        keep = counts >= 3
+        if not keep.all():
+            idx = idx[np.repeat(keep, counts)]
+            counts = counts[keep]
+            mats = mats[keep]
+
+        self.faceIndices = idx
+        self.faceMaterials = mats
+        self.faceOffsets = np.zeros(len(counts) + 1, dtype=np.int32)
+        np.cumsum(counts, out=self.faceOffsets[1:])
+
+    def _ParseChunk(self, data, base_dir, blocks):
+        buf = np.frombuffer(data, dtype=np.uint8)
+        starts, ends, kinds = _classify_lines(buf)
+
+        # Las líneas del mismo tipo suelen venir en bloques contiguos:
+        # se cortan directamente del chunk sin recorrerlas una por una.
+        pieces = {kind: [] for kind in _TAGS}
+        lineCounts = dict.fromkeys(_TAGS, 0)
+        matRuns = []    # (material, nº de líneas 'f') en orden
+
+        change = np.flatnonzero(kinds[1:] != kinds[:-1]) + 1
+        runStarts = np.concatenate(([0], change))
+        runEnds = np.concatenate((change, [len(kinds)]))
+
+        for r0, r1, a, b, kind in zip(runStarts.tolist(), runEnds.tolist(),
+                                      starts[runStarts].tolist(), ends[runEnds - 1].tolist(),
+                                      kinds[runStarts].tolist()):
+            if kind != _OTHER:
+                pieces[kind].append(data[a:b])
+                lineCounts[kind] += r1 - r0
+                if kind == _F:
+                    matRuns.append((self._currentMaterial, r1 - r0))
+                continue
+
+            # Casos raros: sangría, comentarios, mtllib, usemtl...
+            for i in range(r0, r1):
+                line = data[starts[i]:ends[i]].strip()
+                if not line or line.startswith(b"#"):
+                    continue
+                if line.lower().startswith(b"mtllib"):
+                    self._ResolveMtl(base_dir, line.decode("utf-8", "ignore"))
+                    continue
+                if line.lower().startswith(b"usemtl"):
+                    self._UseMaterial(line.decode("utf-8", "ignore"))
+                    continue
+                kind = _HEADS.get(line.split(None, 1)[0], _OTHER)
+                if kind != _OTHER:
+                    pieces[kind].append(line)
+                    lineCounts[kind] += 1
+                    if kind == _F:
+                        matRuns.append((self._currentMaterial, 1))
+
+        for kind, (tag, width) in _TAGS.items():
+            if not pieces[kind]:
+                continue
+            block = b"\n".join(pieces[kind])
+            if kind == _F:
+                idx, counts = _parse_faces(block, lineCounts[kind])
+                blocks["idx"].append(idx)
+                blocks["counts"].append(counts)
+                mats, runs = zip(*matRuns)
+                blocks["mat"].append(np.repeat(np.array(mats, dtype=np.int32), runs))
+            else:
+                blocks[tag.decode()].append(_parse_vectors(block, lineCounts[kind], tag, width))
+
+    # -------------- Lector línea por línea ----------------
+
+    def _ParseLines(self, filename):
+        vertices = []   # [ [x,y,z], ... ]
+        texCoords = []  # [ [u,v], ... ]
+        normals = []    # [ [nx,ny,nz], ... ]
+        faces = []      # [ [ (v,vt,vn), (v,vt,vn), ... ], ... ]
+        materials = []  # material de cada cara
+
         base_dir = os.path.dirname(filename)
         with open(filename, "r", encoding="utf-8", errors="ignore") as f:
             for raw in f:
@@ -29,38 +233,269 @@ class Obj(object):
                 low = line.lower()
 
                 if low.startswith("mtllib"):
-                    parts = line.split(None, 1)
-                    if len(parts) == 2:
-                        mtl_file = parts[1].strip()
-                        cand = os.path.join(base_dir, mtl_file)
-                        if os.path.isfile(cand):
-                            self.mtl_path = cand
-                        else:
-                            alt = os.path.join(base_dir, os.path.basename(mtl_file))
-                            if os.path.isfile(alt):
-                                self.mtl_path = alt
+                    self._ResolveMtl(base_dir, line)
+                    continue
+
+                if low.startswith("usemtl"):
+                    self._UseMaterial(line)
                     continue
 
                 head, *rest = line.split()
                 if head == "v":
-                    self.vertices.append(list(map(float, rest)))
+                    vertices.append(list(map(float, rest)))
                 elif head == "vt":
                     # Solo (u,v)
                     uv = list(map(float, rest[:2])) if len(rest) >= 2 else [0.0, 0.0]
-                    self.texCoords.append(uv)
+                    texCoords.append(uv)
                 elif head == "vn":
-                    self.normals.append(list(map(float, rest)))
+                    normals.append(list(map(float, rest)))
                 elif head == "f":
-                    verts = []
-                    for token in rest:
-                        # v | v/vt | v//vn | v/vt/vn
-                        a = token.split('/')
-                        v  = int(a[0]) if a[0] else 0
-                        vt = int(a[1]) if len(a) > 1 and a[1] != '' else 0
-                        vn = int(a[2]) if len(a) > 2 and a[2] != '' else 0
-                        verts.append((v, vt, vn))
+                    verts = _parse_face_tokens(rest)
                     if len(verts) >= 3:
-                        self.faces.append(verts)
+                        faces.append(verts)
+                        materials.append(self._currentMaterial)
+
+        self._lists = {"vertices": vertices, "texCoords": texCoords,
+                       "normals": normals, "faces": faces}
+
+        self.vertexArray = _pad_rows(vertices, 3)
+        self.texCoordArray = _pad_rows(texCoords, 2)
+        self.normalArray = _pad_rows(normals, 3)
+
+        if faces:
+            indices, offsets = face_table(faces)
+        else:
+            indices, offsets = np.zeros((0, 3)), np.zeros(1)
+        self.faceIndices = indices.astype(np.int32)
+        self.faceOffsets = offsets.astype(np.int32)
+        self.faceMaterials = np.array(materials, dtype=np.int32)
+
+
+# -------------------- Parsing en bloque --------------------
+
+def _concat(parts, emptyShape, dtype):
+    if not parts:
+        return np.zeros(emptyShape, dtype=dtype)
+    return np.ascontiguousarray(np.concatenate(parts), dtype=dtype)
+
+
+def _pad_rows(rows, width):
+    """Lista de listas (posiblemente irregular) -> array (N, width) float32."""
+    out = np.zeros((len(rows), width), dtype=np.float32)
+    for i, r in enumerate(rows):
+        r = r[:width]
+        out[i, :len(r)] = r
+    return out
+
+
+def _bulk_numbers(data, dtype):
+    """Convierte un bloque de texto con números separados por espacios; None si falla."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            return np.fromstring(data, dtype=dtype, sep=" ")
+        except (ValueError, DeprecationWarning):
+            return None
+
+
+# Tipos de línea que se parsean en bloque
+_V, _VT, _VN, _F, _OTHER = range(5)
+_TAGS = {_V: (b"v", 3), _VT: (b"vt", 2), _VN: (b"vn", 3), _F: (b"f", 0)}
+_HEADS = {tag: kind for kind, (tag, _) in _TAGS.items()}
+
+
+def _classify_lines(buf):
+    """
+    Devuelve (starts, ends, kinds) de cada línea del bloque, usando solo los
+    primeros bytes de la línea para decidir si es v / vt / vn / f u otra cosa.
+    """
+    newlines = np.flatnonzero(buf == 10)
+    starts = np.concatenate(([0], newlines + 1))
+    ends = np.concatenate((newlines, [len(buf)]))
+    if starts[-1] >= len(buf):
+        starts, ends = starts[:-1], ends[:-1]
+
+    last = len(buf) - 1
+    b0 = buf[starts]
+    b1 = buf[np.minimum(starts + 1, last)]
+    b2 = buf[np.minimum(starts + 2, last)]
+    sep1 = (b1 == 32) & (ends - starts > 1)
+    sep2 = (b2 == 32) & (ends - starts > 2)
+
+    kinds = np.full(len(starts), _OTHER, dtype=np.int8)
+    kinds[(b0 == ord("v")) & sep1] = _V
+    kinds[(b0 == ord("f")) & sep1] = _F
+    kinds[(b0 == ord("v")) & (b1 == ord("t")) & sep2] = _VT
+    kinds[(b0 == ord("v")) & (b1 == ord("n")) & sep2] = _VN
+    return starts, ends, kinds
+
+
+def _token_starts(buf):
+    """Posiciones donde empieza cada token (bytes <= 32 cuentan como espacio)."""
+    space = buf <= 32
+    start = ~space
+    start[1:] &= space[:-1]
+    return np.flatnonzero(start)
+
+
+def _tokens_per_line(buf, startPos):
+    lineEnds = np.append(np.flatnonzero(buf == 10), len(buf))
+    return np.diff(np.searchsorted(startPos, lineEnds), prepend=0)
+
+
+def _parse_vectors(data, n, tag, width):
+    """Bloque de n líneas 'tag x y z ...' -> array (n, width) float32."""
+    # loadtxt toma las primeras 'width' columnas y falla si alguna línea trae menos
+    try:
+        return np.loadtxt(io.BytesIO(data), dtype=np.float32, usecols=range(1, width + 1),
+                          comments=None, ndmin=2)
+    except ValueError:
+        pass
+
+    # Registros irregulares: uno por uno
+    out = np.zeros((n, width), dtype=np.float32)
+    for i, line in enumerate(data.split(b"\n")):
+        rest = line.split()[1:]
+        if tag == b"vt" and len(rest) < 2:
+            continue
+        vals = list(map(float, rest[:width]))
+        out[i, :len(vals)] = vals
+    return out
+
+
+def _parse_face_tokens(tokens):
+    verts = []
+    for token in tokens:
+        # v | v/vt | v//vn | v/vt/vn
+        a = token.split('/')
+        v  = int(a[0]) if a[0] else 0
+        vt = int(a[1]) if len(a) > 1 and a[1] != '' else 0
+        vn = int(a[2]) if len(a) > 2 and a[2] != '' else 0
+        verts.append((v, vt, vn))
+    return verts
+
+
+# Formato de esquina -> columnas que ocupa en (v, vt, vn)
+_FACE_FORMATS = {
+    (0, False): (0,),           # v
+    (1, False): (0, 1),         # v/vt
+    (2, True):  (0, 2),         # v//vn
+    (2, False): (0, 1, 2),      # v/vt/vn
+}
+
+# 'f' y '/' -> espacio en una sola pasada
+_FACE_TABLE = bytes.maketrans(b"f/", b"  ")
+
+
+def _uniform_face_format(buf, startPos):
+    """
+    Si todas las esquinas tienen la misma forma devuelve su clave en
+    _FACE_FORMATS; si no, None. Con k barras por esquina, las barras
+    2i..2i+k-1 deben caer dentro del token i.
+    """
+    T = len(startPos)
+    slashPos = np.flatnonzero(buf == 47)
+    if len(slashPos) % T:
+        return None
+
+    k = len(slashPos) // T
+    if k == 0:
+        return (0, False)
+    if k > 2:
+        return None
+
+    S = slashPos.reshape(T, k)
+    nextPos = np.append(startPos[1:], len(buf))
+    if not ((S[:, 0] > startPos) & (S[:, -1] < nextPos)).all():
+        return None
+
+    if k == 1:
+        return (1, False)
+    adjacent = S[:, 1] == S[:, 0] + 1
+    if adjacent.all():
+        return (2, True)
+    if not adjacent.any():
+        return (2, False)
+    return None
+
+
+def _parse_uniform_faces(data, n):
+    """
+    Caso común: todas las caras con el mismo número de esquinas y el mismo
+    formato que la primera línea. Se valida con conteos de barras y con el
+    número de columnas por fila; devuelve None si no aplica.
+    """
+    end = data.find(b"\n")
+    tokens = (data if end < 0 else data[:end]).split()[1:]
+    if len(tokens) < 3:
+        return None
+
+    fmt = (tokens[0].count(b"/"), b"//" in tokens[0])
+    if fmt not in _FACE_FORMATS:
+        return None
+    cols = _FACE_FORMATS[fmt]
+
+    c = len(tokens)
+    k, double = fmt
+    if k == 1:
+        # 'v/vt' podría mezclarse con 'v' y 'v/vt/vn' sin cambiar los totales
+        return None
+    if data.count(b"/") != n * c * k or data.count(b"//") != (n * c if double else 0):
+        return None
+
+    try:
+        values = np.loadtxt(io.BytesIO(data.translate(_FACE_TABLE)), dtype=np.int32,
+                            comments=None, ndmin=2)
+    except ValueError:
+        return None
+    if values.shape != (n, c * len(cols)):
+        return None
+
+    idx = np.zeros((n * c, 3), dtype=np.int32)
+    idx[:, cols] = values.reshape(n * c, len(cols))
+    return idx, np.full(n, c, dtype=np.int32)
+
+
+def _parse_faces(data, n):
+    """
+    Bloque de n líneas 'f ...' -> (indices (M, 3) int32, counts (n,) int32).
+    Devuelve una entrada por línea (también las de menos de 3 esquinas, que
+    se descartan al final para no desalinear los materiales). Si todas las
+    esquinas del bloque comparten formato se parsean de una vez; si no, se
+    cae al parser por token.
+    """
+    uniform = _parse_uniform_faces(data, n)
+    if uniform is not None:
+        return uniform
+
+    buf = np.frombuffer(data, dtype=np.uint8)
+
+    # Cada línea empieza con el token 'f', que no es una esquina
+    startPos = _token_starts(buf)
+    counts = _tokens_per_line(buf, startPos) - 1
+    startPos = startPos[buf[startPos] != ord("f")]
+
+    T = len(startPos)
+    idx = None
+
+    fmt = _uniform_face_format(buf, startPos) if T else None
+    if fmt is not None:
+        cols = _FACE_FORMATS[fmt]
+        values = _bulk_numbers(data.translate(_FACE_TABLE), np.int32)
+        if values is not None and len(values) == T * len(cols):
+            idx = np.zeros((T, 3), dtype=np.int32)
+            idx[:, cols] = values.reshape(T, len(cols))
+
+    if idx is None:
+        rows = []
+        counts = np.zeros(n, dtype=np.int64)
+        for i, line in enumerate(data.split(b"\n")):
+            verts = _parse_face_tokens(line.decode("utf-8", "ignore").split()[1:])
+            counts[i] = len(verts)
+            rows.extend(verts)
+        idx = np.array(rows, dtype=np.int32).reshape(-1, 3)
+
+    return idx, counts.astype(np.int32)
 
 
 # -------------------- Utilidades MTL --------------------
@@ -89,21 +524,63 @@ def get_mtl_path_from_obj(obj_path: str) -> str | None:
         return None
 
 
+# Mapas reconocidos en el .mtl (las claves se comparan sin distinguir mayúsculas)
+_MTL_MAPS = ("map_Kd", "map_Ks", "map_Bump", "bump", "map_Ka", "map_Ns", "map_d")
+_MTL_KEYS = {key.lower(): key for key in _MTL_MAPS}
+
+
+def _resolve_map_path(base_dir, line):
+    """Ruta de la textura de una línea 'map_xx [opciones] archivo' (o None)."""
+    tokens = line.split()
+    if len(tokens) < 2:
+        return None
+    # toma último token como ruta (ignora opciones -blabla)
+    cand = tokens[-1]
+    path = os.path.join(base_dir, cand)
+    if not os.path.isfile(path):
+        alt = os.path.join(base_dir, os.path.basename(cand))
+        tex = os.path.join(base_dir, "textures", os.path.basename(cand))
+        if os.path.isfile(alt):
+            path = alt
+        elif os.path.isfile(tex):
+            path = tex
+    return path
+
+
+def parse_mtl_materials(mtl_path: str):
+    """
+    Devuelve dict nombre de material -> {tipo de mapa: ruta} con las rutas
+    resueltas (solo el primer mapa de cada tipo por material).
+    """
+    materials = {}
+    try:
+        base_dir = os.path.dirname(mtl_path)
+        current = None
+        with open(mtl_path, "r", encoding="utf-8", errors="ignore") as f:
+            for raw in f:
+                line = raw.strip()
+                if not line or line.startswith("#"):
+                    continue
+                head = line.split(None, 1)[0].lower()
+                if head == "newmtl":
+                    parts = line.split(None, 1)
+                    current = materials.setdefault(parts[1].strip() if len(parts) == 2 else "", {})
+                elif head in _MTL_KEYS and current is not None:
+                    path = _resolve_map_path(base_dir, line)
+                    if path:
+                        current.setdefault(_MTL_KEYS[head], path)
+    except Exception:
+        pass
+    return materials
+
+
 def parse_mtl_maps(mtl_path: str):
     """
     Devuelve dict con listas de rutas por tipo de mapa (se resuelven rutas relativas):
       - map_Kd: difusas
       - map_Ks, map_Bump/bump, map_Ka, map_Ns, map_d (por si los quieres luego)
     """
-    maps = {
-        "map_Kd": [],
-        "map_Ks": [],
-        "map_Bump": [],
-        "bump": [],
-        "map_Ka": [],
-        "map_Ns": [],
-        "map_d": [],
-    }
+    maps = {key: [] for key in _MTL_MAPS}
     try:
         base_dir = os.path.dirname(mtl_path)
         with open(mtl_path, "r", encoding="utf-8", errors="ignore") as f:
@@ -111,23 +588,11 @@ def parse_mtl_maps(mtl_path: str):
                 line = raw.strip()
                 if not line or line.startswith("#"):
                     continue
-                low = line.lower()
-                for key in list(maps.keys()):
-                    if low.startswith(key):
-                        tokens = line.split()
-                        if len(tokens) >= 2:
-                            # toma último token como ruta (ignora opciones -blabla)
-                            cand = tokens[-1]
-                            path = os.path.join(base_dir, cand)
-                            if not os.path.isfile(path):
-                                alt = os.path.join(base_dir, os.path.basename(cand))
-                                tex = os.path.join(base_dir, "textures", os.path.basename(cand))
-                                if os.path.isfile(alt):
-                                    path = alt
-                                elif os.path.isfile(tex):
-                                    path = tex
-                            maps[key].append(path)
-                        break
+                key = _MTL_KEYS.get(line.split(None, 1)[0].lower())
+                if key:
+                    path = _resolve_map_path(base_dir, line)
+                    if path:
+                        maps[key].append(path)
     except Exception:
         pass
     return maps
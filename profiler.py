@@ -0,0 +1,388 @@
+# profiler.py
+# (mantén este comentario con el nombre del archivo)
+
+from OpenGL.GL import *
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import ctypes
+import json
+import time
+
+import glm
+import numpy as np
+import pygame
+
+from shaderprogram import shaderCache
+
+
+_NO_SECTION = nullcontext()
+
+
+def no_section(name):
+    """Section() que no mide nada (para cuando no hay Profiler)."""
+    return _NO_SECTION
+
+
+def _query_result(query):
+    value = ctypes.c_uint64()
+    glGetQueryObjectui64v(query, GL_QUERY_RESULT, ctypes.byref(value))
+    return value.value
+
+
+def _query_available(query):
+    value = ctypes.c_int()
+    glGetQueryObjectiv(query, GL_QUERY_RESULT_AVAILABLE, ctypes.byref(value))
+    return value.value != 0
+
+
+class Profiler(object):
+    """
+    Tiempos por sección de CPU (perf_counter_ns) y GPU (glQueryCounter con
+    GL_TIMESTAMP al entrar y al salir, así las secciones se pueden anidar).
+      - BeginFrame() / EndFrame() delimitan el frame ("frame" es una sección más)
+      - with profiler.Section("skybox"): ...   mide un pase
+      - Count("drawCalls", n) guarda contadores del frame
+      - with profiler.Samples("shadedFragments"): ...   cuenta los fragmentos que
+        pasaron el test de profundidad (GL_SAMPLES_PASSED); llega como contador
+        cuando se leen las queries (no se pueden anidar)
+    Las queries de un frame se leen recién cuando la GPU ya las terminó (se
+    revisa GL_QUERY_RESULT_AVAILABLE, hasta 'latency' frames después): leerlas
+    en el mismo frame obligaría a esperar a la GPU.
+    Stats() da percentiles de los últimos 'history' frames y StartTrace() /
+    DumpTrace() graban un JSON para chrome://tracing o Perfetto.
+    """
+    def __init__(self, gpu=True, history=240, latency=3):
+        self.enabled = True
+        self.gpu = gpu
+        self.history = history
+        self.latency = latency
+
+        self.frameIndex = 0
+        self.frameStart = None   # perf_counter_ns del último BeginFrame()
+        self.frame = None        # frame en curso: {"index", "start", "cpu", "queries", "counters"}
+        self.pending = deque()   # frames con queries aún sin leer
+        self.freeQueries = []
+        self.freeSampleQueries = []   # GL_SAMPLES_PASSED (una query no cambia de tipo)
+
+        self.intervals = deque(maxlen=history)   # ms entre BeginFrame() (incluye esperar vsync)
+        self.cpuTimes = {}       # nombre -> deque de ms
+        self.gpuTimes = {}
+        self.counters = {}       # nombre -> deque de valores
+        self.lastCounters = {}
+
+        self.trace = None        # lista de eventos mientras se graba
+        self.gpuOffset = None    # timestamp GPU - perf_counter_ns
+
+    # -------------- Frame ----------------
+
+    def BeginFrame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        if self.frameStart is not None:
+            self.intervals.append((now - self.frameStart) / 1e6)
+        self.frameStart = now
+
+        self.frame = {"index": self.frameIndex, "start": now, "cpu": [], "queries": [], "counters": {},
+                      "samples": [], "stack": []}
+        self.frameIndex += 1
+        self.Begin("frame")
+
+    def EndFrame(self):
+        if self.frame is None:
+            return
+        while self.frame["stack"]:
+            self.End()
+
+        frame, self.frame = self.frame, None
+        for name, start, end in frame["cpu"]:
+            self._Record(self.cpuTimes, name, (end - start) / 1e6)
+            if self.trace is not None:
+                self.trace.append({"name": name, "ph": "X", "pid": 1, "tid": 1,
+                                   "ts": start / 1e3, "dur": (end - start) / 1e3})
+
+        for name, value in frame["counters"].items():
+            self._Record(self.counters, name, value)
+            if self.trace is not None:
+                self.trace.append({"name": name, "ph": "C", "pid": 1, "ts": frame["start"] / 1e3,
+                                   "args": {name: value}})
+        self.lastCounters = frame["counters"]
+
+        if frame["queries"] or frame["samples"]:
+            self.pending.append(frame)
+        self.CollectQueries()
+
+    def CollectQueries(self, wait=False):
+        """Lee las queries de los frames que la GPU ya terminó (wait=True espera a todas)."""
+        while self.pending:
+            frame = self.pending[0]
+            stale = self.frameIndex - frame["index"] > self.latency
+            # La última query del frame (timestamp o samples) es la que termina después
+            last = frame["queries"][-1][2] if frame["queries"] else frame["samples"][-1][1]
+            if not (wait or stale or _query_available(last)):
+                break
+            self.pending.popleft()
+            self._ReadQueries(frame)
+
+    def _ReadQueries(self, frame):
+        for name, startQuery, endQuery in frame["queries"]:
+            start, end = _query_result(startQuery), _query_result(endQuery)
+            self._Record(self.gpuTimes, name, (end - start) / 1e6)
+            if self.trace is not None and self.gpuOffset is not None:
+                self.trace.append({"name": name, "ph": "X", "pid": 1, "tid": 2,
+                                   "ts": (start - self.gpuOffset) / 1e3, "dur": (end - start) / 1e3})
+            self.freeQueries += [startQuery, endQuery]
+
+        for name, query in frame["samples"]:
+            value = _query_result(query)
+            self._Record(self.counters, name, value)
+            if self.trace is not None:
+                self.trace.append({"name": name, "ph": "C", "pid": 1, "ts": frame["start"] / 1e3,
+                                   "args": {name: value}})
+            self.freeSampleQueries.append(query)
+
+    def _Record(self, table, name, value):
+        values = table.get(name)
+        if values is None:
+            values = table[name] = deque(maxlen=self.history)
+        values.append(value)
+
+    # -------------- Secciones ----------------
+
+    def Begin(self, name):
+        if self.frame is None:
+            return
+        query = None
+        if self.gpu:
+            query = self._Query()
+            glQueryCounter(query, GL_TIMESTAMP)
+        self.frame["stack"].append((name, time.perf_counter_ns(), query))
+
+    def End(self):
+        if self.frame is None or not self.frame["stack"]:
+            return
+        name, start, startQuery = self.frame["stack"].pop()
+        self.frame["cpu"].append((name, start, time.perf_counter_ns()))
+        if startQuery is not None:
+            endQuery = self._Query()
+            glQueryCounter(endQuery, GL_TIMESTAMP)
+            self.frame["queries"].append((name, startQuery, endQuery))
+
+    @contextmanager
+    def Section(self, name):
+        self.Begin(name)
+        try:
+            yield
+        finally:
+            self.End()
+
+    @contextmanager
+    def Samples(self, name):
+        if self.frame is None or not self.gpu:
+            yield
+            return
+        if not self.freeSampleQueries:
+            self.freeSampleQueries = list(np.atleast_1d(glGenQueries(8)))
+        query = self.freeSampleQueries.pop()
+        glBeginQuery(GL_SAMPLES_PASSED, query)
+        try:
+            yield
+        finally:
+            glEndQuery(GL_SAMPLES_PASSED)
+            self.frame["samples"].append((name, query))
+
+    def Count(self, name, value):
+        if self.frame is not None:
+            self.frame["counters"][name] = value
+
+    def _Query(self):
+        if not self.freeQueries:
+            self.freeQueries = list(np.atleast_1d(glGenQueries(32)))
+        return self.freeQueries.pop()
+
+    # -------------- Resultados ----------------
+
+    def Stats(self, percentiles=(50, 95, 99)):
+        """{sección: {"cpu": {p: ms}, "gpu": {p: ms}}} con los últimos 'history' frames."""
+        stats = {}
+        for kind, table in (("cpu", self.cpuTimes), ("gpu", self.gpuTimes)):
+            for name, values in table.items():
+                if values:
+                    stats.setdefault(name, {})[kind] = dict(zip(percentiles,
+                                                                np.percentile(values, percentiles).tolist()))
+        return stats
+
+    def StartTrace(self):
+        """Empieza a grabar eventos para DumpTrace() (y alinea el reloj de la GPU con el de CPU)."""
+        self.trace = []
+        if self.gpu:
+            glFinish()
+            query = self._Query()
+            now = time.perf_counter_ns()
+            glQueryCounter(query, GL_TIMESTAMP)
+            self.gpuOffset = _query_result(query) - now
+            self.freeQueries.append(query)
+
+    def DumpTrace(self, path):
+        """Escribe el JSON de Chrome trace (CPU en el hilo 1, GPU en el 2) y deja de grabar."""
+        self.CollectQueries(wait=True)
+        events = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": "CPU"}},
+                  {"name": "thread_name", "ph": "M", "pid": 1, "tid": 2, "args": {"name": "GPU"}}]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events + (self.trace or []), "displayTimeUnit": "ms"}, f)
+        self.trace = None
+        return path
+
+    def Delete(self):
+        self.CollectQueries(wait=True)
+        for queries in (self.freeQueries, self.freeSampleQueries):
+            if queries:
+                glDeleteQueries(len(queries), queries)
+        self.freeQueries = []
+        self.freeSampleQueries = []
+
+
+# -------------- Overlay ----------------
+
+overlay_vertex_shader = '''
+#version 330 core
+
+uniform vec4 rect;    // x, y, ancho, alto en coordenadas de pantalla (-1..1)
+
+out vec2 outTexCoords;
+
+void main()
+{
+    vec2 corner = vec2(gl_VertexID & 1, gl_VertexID >> 1);
+    outTexCoords = vec2(corner.x, 1.0 - corner.y);
+    gl_Position = vec4(rect.xy + corner * rect.zw, 0.0, 1.0);
+}
+'''
+
+overlay_fragment_shader = '''
+#version 330 core
+
+in vec2 outTexCoords;
+
+uniform sampler2D tex0;
+
+out vec4 fragColor;
+
+void main()
+{
+    fragColor = texture(tex0, outTexCoords);
+}
+'''
+
+
+class ProfilerOverlay(object):
+    """
+    Texto en la esquina superior izquierda con el tiempo de frame, los pases
+    más caros (CPU / GPU, p50 y p95), draw calls y triángulos. El texto se
+    vuelve a dibujar cada 'interval' segundos, no en cada frame.
+    """
+    def __init__(self, profiler, interval=0.25, fontSize=16, sections=6):
+        self.profiler = profiler
+        self.interval = interval
+        self.sections = sections
+        self.visible = True
+
+        if not pygame.font.get_init():
+            pygame.font.init()
+        self.font = pygame.font.SysFont("consolas,dejavusansmono,monospace", fontSize)
+
+        self.shader = shaderCache.Acquire(overlay_vertex_shader, overlay_fragment_shader)
+        self.VAO = glGenVertexArrays(1)   # vacío: las esquinas salen de gl_VertexID
+        self.texture = glGenTextures(1)
+        self.size = (0, 0)
+        self.lastUpdate = None
+
+    def Lines(self):
+        stats = self.profiler.Stats((50, 95))
+        counters = self.profiler.lastCounters
+
+        def times(name):
+            cpu = stats.get(name, {}).get("cpu")
+            gpu = stats.get(name, {}).get("gpu")
+            text = f"cpu {cpu[50]:6.2f}/{cpu[95]:6.2f}" if cpu else "cpu      -"
+            return text + (f"  gpu {gpu[50]:6.2f}/{gpu[95]:6.2f}" if gpu else "")
+
+        intervals = self.profiler.intervals
+        fps = 1000.0 / np.median(intervals) if intervals else 0.0
+        lines = [f"{fps:5.1f} fps          ms p50/p95",
+                 f"{'frame':<12}{times('frame')}"]
+        passes = sorted((name for name in stats if name != "frame"),
+                        key=lambda name: -stats[name].get("cpu", {50: 0})[50])
+        lines += [f"{name:<12}{times(name)}" for name in passes[:self.sections]]
+        lines.append("draws {}   tris {:,}   objetos {} (+{} fuera)".format(
+            counters.get("drawCalls", 0), counters.get("triangles", 0),
+            counters.get("drawn", 0), counters.get("culled", 0)))
+        fragments = self.profiler.counters.get("shadedFragments")
+        if fragments:
+            lines.append(f"fragmentos sombreados {fragments[-1]:,}")
+        return lines
+
+    def UpdateTexture(self):
+        rendered = [self.font.render(line, True, (255, 255, 255)) for line in self.Lines()]
+        width = max(s.get_width() for s in rendered) + 8
+        height = sum(s.get_height() for s in rendered) + 8
+
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 160))
+        y = 4
+        for s in rendered:
+            surface.blit(s, (4, y))
+            y += s.get_height()
+
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE,
+                     pygame.image.tostring(surface, "RGBA", False))
+        self.size = (width, height)
+
+    def Render(self, screenWidth, screenHeight):
+        if not self.visible or self.shader is None:
+            return
+
+        now = time.perf_counter()
+        if self.lastUpdate is None or now - self.lastUpdate >= self.interval:
+            self.UpdateTexture()
+            self.lastUpdate = now
+
+        # Estado que cambia el overlay (y que Renderer espera encontrar igual)
+        depthTest = glIsEnabled(GL_DEPTH_TEST)
+        cullFace = glIsEnabled(GL_CULL_FACE)
+        blend = glIsEnabled(GL_BLEND)
+        polygonMode = np.atleast_1d(glGetIntegerv(GL_POLYGON_MODE)).tolist()   # [front, back]
+
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_CULL_FACE)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
+
+        width, height = self.size
+        w, h = 2.0 * width / screenWidth, 2.0 * height / screenHeight
+        self.shader.Use()
+        self.shader.Set("rect", glm.vec4(-1.0, 1.0 - h, w, h))
+        self.shader.Set("tex0", 0)
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glBindVertexArray(self.VAO)
+        glDrawArrays(GL_TRIANGLE_STRIP, 0, 4)
+        glBindVertexArray(0)
+
+        glPolygonMode(GL_FRONT, polygonMode[0])
+        glPolygonMode(GL_BACK, polygonMode[-1])
+        for cap, enabled in ((GL_DEPTH_TEST, depthTest), (GL_CULL_FACE, cullFace), (GL_BLEND, blend)):
+            (glEnable if enabled else glDisable)(cap)
+
+    def Delete(self):
+        if self.shader is not None:
+            shaderCache.Release(self.shader)
+            self.shader = None
+        glDeleteTextures(1, [self.texture])
+        glDeleteVertexArrays(1, [self.VAO])
@@ -0,0 +1,167 @@
+# renderqueue.py
+# (mantén este comentario con el nombre del archivo)
+
+from OpenGL.GL import *
+
+
+# Clave de orden (entero), de más a menos significativo:
+#   opacos:        0 | programa | texturas | VAO | profundidad (cerca -> lejos)
+#   transparentes: 1 | profundidad invertida (lejos -> cerca) | programa | texturas | VAO
+# Los opacos se agrupan primero por estado (lo caro de cambiar) y dentro de
+# cada grupo van de adelante hacia atrás; los transparentes necesitan el
+# orden de atrás hacia adelante antes que nada.
+DEPTH_BITS = 16
+STATE_BITS = 16   # para cada uno: programa, conjunto de texturas, VAO
+
+_DEPTH_MAX = (1 << DEPTH_BITS) - 1
+_STATE_MASK = (1 << STATE_BITS) - 1
+
+
+def sort_key(program, textures, vao, depth, transparent):
+    """Clave empaquetada de un item; 'depth' ya cuantizada en [0, 2^DEPTH_BITS)."""
+    state = (((program << STATE_BITS) | textures) << STATE_BITS) | vao
+    if transparent:
+        top = 1 << (DEPTH_BITS + 3 * STATE_BITS)
+        return top | ((_DEPTH_MAX - depth) << (3 * STATE_BITS)) | state
+    return (state << DEPTH_BITS) | depth
+
+
+class RenderQueue(object):
+    """
+    Draws de un frame (uno por rango de material) juntados con Add(),
+    ordenados por su clave (Sort) y mandados con Submit(), que solo llama a
+    glUseProgram / glBindTexture / glBindVertexArray cuando el estado cambia
+    respecto al draw anterior.
+      - Los transparentes van al final con blending y sin escribir profundidad
+      - Submit(transparent=False / True) manda solo una de las dos partes, para
+        dibujar algo en el medio (el skybox) o repetir los opacos (pre-pass)
+      - 'stats' acumula los cambios de estado hechos y los evitados desde Clear()
+    """
+    def __init__(self):
+        # [clave, profundidad, transparente, shader, vao, texturas, modelo, first, count, instancias, matriz]
+        self.items = []
+        self.sortItems = True  # False: en el orden en que se agregaron (para comparar)
+
+        self.stateIds = {}     # programa / texturas / VAO -> índice chico para la clave (por frame)
+        self.stats = {}
+        self.Clear()
+
+    def Clear(self):
+        self.items = []
+        # Los índices valen solo dentro del frame: no se acumulan los estados de
+        # modelos, texturas y programas ya liberados
+        self.stateIds = {}
+        self.stats = {"items": 0, "draws": 0,
+                      "programChanges": 0, "programSkipped": 0,
+                      "textureChanges": 0, "textureSkipped": 0,
+                      "vaoChanges": 0, "vaoSkipped": 0}
+
+    def Add(self, model, vao, shader, matrix, depth, transparent=False, instances=None):
+        """
+        Un item por rango de model.DrawRanges(), dibujado con 'vao' (el del
+        modelo o el de un InstancedModel, con 'instances' copias). 'matrix' es
+        la modelMatrix (None en los instanced) y 'depth' la distancia a la
+        cámara en vista.
+        """
+        for textures, first, count in model.DrawRanges():
+            self.items.append([0, depth, transparent, shader, vao, textures, model, first, count,
+                               instances, matrix])
+
+    def _StateId(self, value):
+        stateId = self.stateIds.get(value)
+        if stateId is None:
+            # Más de 2^STATE_BITS estados en un frame: los que sobran comparten el
+            # último índice (se ordenan juntos) en vez de mezclarse con los primeros
+            stateId = self.stateIds[value] = min(len(self.stateIds), _STATE_MASK)
+        return stateId
+
+    def Sort(self):
+        """Calcula las claves (profundidad cuantizada en el rango del frame) y ordena."""
+        if not self.sortItems or not self.items:
+            return
+
+        depths = [item[1] for item in self.items]
+        near, far = min(depths), max(depths)
+        scale = _DEPTH_MAX / (far - near) if far > near else 0.0
+
+        for item in self.items:
+            shader = item[3]
+            depth = min(_DEPTH_MAX, int((item[1] - near) * scale))
+            item[0] = sort_key(self._StateId(("program", shader.program if shader is not None else 0)),
+                               self._StateId(("textures", item[5])),
+                               self._StateId(("vao", item[4])), depth, item[2])
+        self.items.sort(key=lambda item: item[0])   # estable: empates en orden de llegada
+
+    def Submit(self, prepare=None, transparent=None, shaders=None, textures=True):
+        """
+        Dibuja los items en orden (con transparent=False / True solo los
+        opacos / transparentes). 'prepare(shader)' se llama la primera vez que
+        se usa cada programa en este Submit (uniforms por frame). 'shaders'
+        reemplaza programas ({programa: otro}) y textures=False no bindea
+        texturas: así se hace el pre-pass de profundidad con la misma cola.
+        El estado se sigue desde cero en cada Submit: entre medio otros
+        (skybox, subidas de AssetLoader, overlay) bindean por su cuenta.
+        """
+        stats = self.stats
+        stats["items"] = len(self.items)
+        prepared = set()
+        current, vaoBound, activeUnit = None, None, None
+        boundTextures = {}
+        lastMatrix = None
+        blending = False
+
+        for _, _, isTransparent, shader, vao, itemTextures, model, first, count, instances, matrix in self.items:
+            if transparent is not None and isTransparent != transparent:
+                continue
+            if shaders is not None:
+                shader = shaders.get(shader, shader)
+
+            if isTransparent and not blending:
+                glEnable(GL_BLEND)
+                glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+                glDepthMask(GL_FALSE)
+                blending = True
+
+            if shader is not current:
+                current = shader
+                lastMatrix = None
+                stats["programChanges"] += 1
+                if shader is not None:
+                    shader.Use()
+                    if prepare is not None and shader not in prepared:
+                        prepare(shader)
+                        prepared.add(shader)
+            else:
+                stats["programSkipped"] += 1
+
+            if shader is not None and matrix is not None and matrix is not lastMatrix:
+                shader.Set("modelMatrix", matrix)
+                lastMatrix = matrix
+
+            if vao != vaoBound:
+                glBindVertexArray(vao)
+                vaoBound = vao
+                stats["vaoChanges"] += 1
+            else:
+                stats["vaoSkipped"] += 1
+
+            for unit, tex in enumerate(itemTextures if textures else ()):
+                if boundTextures.get(unit) == tex:
+                    stats["textureSkipped"] += 1
+                    continue
+                if unit != activeUnit:
+                    glActiveTexture(GL_TEXTURE0 + unit)
+                    activeUnit = unit
+                glBindTexture(GL_TEXTURE_2D, tex)
+                boundTextures[unit] = tex
+                stats["textureChanges"] += 1
+
+            model.DrawRange(first, count, instances)
+            stats["draws"] += 1
+
+        if vaoBound is not None:
+            glBindVertexArray(0)
+        if blending:
+            glDepthMask(GL_TRUE)
+            glDisable(GL_BLEND)
+        return stats
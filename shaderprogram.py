@@ -0,0 +1,276 @@
+# shaderprogram.py
+# (mantén este comentario con el nombre del archivo)
+
+from OpenGL.GL import *
+from OpenGL.GL.shaders import compileShader
+from collections import OrderedDict
+
+from assetcache import read_blob, write_blob
+from framedata import FRAME_DATA_BINDING
+
+import ctypes
+import glm
+import hashlib
+import numpy as np
+import os
+
+# Entradas "raw" de PyOpenGL para los setters: sin la capa de conversión de
+# argumentos ni glGetError por llamada (se suben miles por frame)
+from OpenGL.raw.GL.VERSION import GL_2_0 as _raw
+
+
+def _upload_matrix4(location, value):
+    _raw.glUniformMatrix4fv(location, 1, GL_FALSE, glm.value_ptr(value))
+
+
+def _upload_matrix3(location, value):
+    _raw.glUniformMatrix3fv(location, 1, GL_FALSE, glm.value_ptr(value))
+
+
+def _upload_int(location, value):
+    _raw.glUniform1i(location, int(value))
+
+
+_SAMPLERS = (GL_SAMPLER_1D, GL_SAMPLER_2D, GL_SAMPLER_3D, GL_SAMPLER_CUBE,
+             GL_SAMPLER_2D_SHADOW, GL_SAMPLER_2D_ARRAY)
+
+# Tipo GL del uniform -> función que sube un valor (float, int o tipo glm)
+_UPLOADERS = {
+    int(GL_FLOAT):      lambda loc, v: _raw.glUniform1f(loc, v),
+    int(GL_FLOAT_VEC2): lambda loc, v: _raw.glUniform2fv(loc, 1, glm.value_ptr(v)),
+    int(GL_FLOAT_VEC3): lambda loc, v: _raw.glUniform3fv(loc, 1, glm.value_ptr(v)),
+    int(GL_FLOAT_VEC4): lambda loc, v: _raw.glUniform4fv(loc, 1, glm.value_ptr(v)),
+    int(GL_FLOAT_MAT3): _upload_matrix3,
+    int(GL_FLOAT_MAT4): _upload_matrix4,
+    int(GL_INT):        _upload_int,
+    int(GL_BOOL):       _upload_int,
+}
+_UPLOADERS.update({int(s): _upload_int for s in _SAMPLERS})
+
+
+def link_program(vertexShader, fragmentShader, retrievable=False):
+    """
+    Compila y enlaza un programa. Con retrievable=True se pide al driver que
+    deje disponible el binario (glGetProgramBinary).
+    """
+    stages = [compileShader(vertexShader, GL_VERTEX_SHADER),
+              compileShader(fragmentShader, GL_FRAGMENT_SHADER)]
+
+    program = glCreateProgram()
+    for stage in stages:
+        glAttachShader(program, stage)
+    if retrievable:
+        glProgramParameteri(program, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
+    glLinkProgram(program)
+
+    # Los objetos shader ya no hacen falta una vez enlazado
+    for stage in stages:
+        glDetachShader(program, stage)
+        glDeleteShader(stage)
+
+    if glGetProgramiv(program, GL_LINK_STATUS) != GL_TRUE:
+        log = glGetProgramInfoLog(program)
+        glDeleteProgram(program)
+        raise RuntimeError(f"Link failure: {log}")
+    return program
+
+
+def _snapshot(value):
+    """Copia del valor para comparar después (los vec/mat de glm son mutables)."""
+    if isinstance(value, (int, float)):
+        return value
+    return type(value)(value)
+
+
+class ShaderProgram(object):
+    """
+    Programa enlazado + sus uniforms activos, leídos una sola vez con
+    glGetActiveUniform. Set() sube un valor solo si cambió desde la última
+    vez (por programa) y siempre desde una copia propia, así el puntero que
+    recibe GL no apunta a un temporal de glm.
+    Set() asume que el programa está en uso (Use()).
+    """
+    def __init__(self, vertexShader, fragmentShader, program=None):
+        if program is None:
+            program = link_program(vertexShader, fragmentShader)
+        self.program = program
+
+        self.uniforms = {}  # nombre -> (location, tipo GL, tamaño)
+        self.values = {}    # nombre -> último valor subido
+
+        for i in range(glGetProgramiv(program, GL_ACTIVE_UNIFORMS)):
+            name, size, kind = glGetActiveUniform(program, i)
+            name = name.decode() if isinstance(name, bytes) else name
+            location = glGetUniformLocation(program, name)
+            if location < 0:
+                continue    # uniforms de bloques (UBO) no tienen location
+            if name.endswith("[0]"):
+                name = name[:-3]
+            self.uniforms[name] = (location, int(kind), size)
+
+        # Bloque de datos por frame (framedata.py): siempre en el mismo binding.
+        # Se hace acá y no solo al enlazar: los programas cargados de binario también
+        index = glGetUniformBlockIndex(program, "FrameData")
+        if index != GL_INVALID_INDEX:
+            glUniformBlockBinding(program, index, FRAME_DATA_BINDING)
+
+    def Use(self):
+        glUseProgram(self.program)
+
+    def Has(self, name):
+        return name in self.uniforms
+
+    def Set(self, name, value):
+        """Sube 'value' al uniform 'name' si existe y cambió. Devuelve True si se subió."""
+        uniform = self.uniforms.get(name)
+        if uniform is None:
+            return False
+
+        last = self.values.get(name)
+        if last is not None and last == value:
+            return False
+
+        upload = _UPLOADERS.get(uniform[1])
+        if upload is None:
+            raise TypeError(f"Tipo de uniform no soportado para '{name}': {uniform[1]:#x}")
+
+        value = _snapshot(value)
+        self.values[name] = value
+        upload(uniform[0], value)
+        return True
+
+    def Invalidate(self):
+        """Olvida los valores subidos (p. ej. si alguien los cambió por fuera)."""
+        self.values.clear()
+
+    def Delete(self):
+        if self.program is not None:
+            glDeleteProgram(self.program)
+            self.program = None
+
+
+# Subir si cambia el formato de los .prog guardados
+SHADER_BINARY_VERSION = 1
+
+
+class ShaderCache(object):
+    """
+    Programas enlazados por (hash del vertex, hash del fragment): cada
+    combinación se compila una sola vez por proceso.
+      - Acquire() devuelve el ShaderProgram compartido y suma una referencia;
+        Release() la resta. Los que quedan sin referencias siguen en la caché
+        para volver a usarlos sin compilar.
+      - Con maxPrograms, al pasarse se borran (glDeleteProgram) los menos
+        usados entre los que no tienen referencias.
+      - Con binaryDir los programas enlazados se guardan en disco
+        (glGetProgramBinary) y el próximo arranque los carga con glProgramBinary;
+        si el driver cambió o el binario no enlaza, se compila de nuevo.
+    """
+    def __init__(self, maxPrograms=None, binaryDir=None):
+        self.maxPrograms = maxPrograms
+        self.binaryDir = binaryDir
+
+        self.programs = OrderedDict()  # key -> ShaderProgram, en orden LRU
+        self.refs = {}                 # key -> referencias
+
+        self.hits = 0
+        self.compiles = 0
+        self.binaryLoads = 0
+        self.evictions = 0
+
+        self._driver = None
+
+    @staticmethod
+    def Key(vertexShader, fragmentShader):
+        return (hashlib.sha1(vertexShader.encode("utf-8")).hexdigest(),
+                hashlib.sha1(fragmentShader.encode("utf-8")).hexdigest())
+
+    def Acquire(self, vertexShader, fragmentShader):
+        key = self.Key(vertexShader, fragmentShader)
+        shader = self.programs.get(key)
+        if shader is not None:
+            self.hits += 1
+            self.programs.move_to_end(key)
+        else:
+            program = self.LoadBinary(key) if self.binaryDir else None
+            if program is None:
+                program = link_program(vertexShader, fragmentShader, retrievable=bool(self.binaryDir))
+                self.compiles += 1
+                if self.binaryDir:
+                    self.SaveBinary(key, program)
+            else:
+                self.binaryLoads += 1
+
+            shader = ShaderProgram(vertexShader, fragmentShader, program)
+            shader.key = key
+            self.programs[key] = shader
+
+        self.refs[key] = self.refs.get(key, 0) + 1
+        self.Evict()
+        return shader
+
+    def Release(self, shader):
+        key = getattr(shader, "key", None)
+        if key in self.refs:
+            self.refs[key] = max(0, self.refs[key] - 1)
+            self.Evict()
+
+    def Evict(self):
+        if self.maxPrograms is None:
+            return
+        for key in [k for k in self.programs if self.refs.get(k, 0) == 0]:
+            if len(self.programs) <= self.maxPrograms:
+                break
+            self.programs.pop(key).Delete()
+            self.refs.pop(key, None)
+            self.evictions += 1
+
+    def Clear(self):
+        """Borra todos los programas (p. ej. antes de destruir el contexto GL)."""
+        for shader in self.programs.values():
+            shader.Delete()
+        self.programs.clear()
+        self.refs.clear()
+
+    def Stats(self):
+        return {"hits": self.hits, "compiles": self.compiles, "binaryLoads": self.binaryLoads,
+                "evictions": self.evictions, "programs": len(self.programs)}
+
+    # -------------- Binarios en disco ----------------
+
+    def BinaryPath(self, key):
+        # El binario solo sirve para el mismo driver: entra en el nombre del archivo
+        if self._driver is None:
+            self._driver = b"|".join(glGetString(e) or b"" for e in (GL_VENDOR, GL_RENDERER, GL_VERSION))
+        digest = hashlib.sha1(self._driver + "|".join(key).encode("utf-8")).hexdigest()[:24]
+        return os.path.join(self.binaryDir, f"{digest}.prog")
+
+    def LoadBinary(self, key):
+        """Programa enlazado desde su binario guardado, o None si no hay o no sirve."""
+        blob = read_blob(self.BinaryPath(key), SHADER_BINARY_VERSION)
+        if blob is None:
+            return None
+        meta, arrays = blob
+        data = np.ascontiguousarray(arrays["binary"])
+
+        program = glCreateProgram()
+        glProgramBinary(program, meta["format"], data.ctypes.data_as(ctypes.c_void_p), data.nbytes)
+        if glGetProgramiv(program, GL_LINK_STATUS) != GL_TRUE:
+            glDeleteProgram(program)
+            return None
+        return program
+
+    def SaveBinary(self, key, program):
+        size = glGetProgramiv(program, GL_PROGRAM_BINARY_LENGTH)
+        if not size:
+            return False
+        data = np.empty(size, dtype=np.uint8)
+        length, fmt = GLsizei(0), GLenum(0)
+        glGetProgramBinary(program, size, ctypes.byref(length), ctypes.byref(fmt),
+                           data.ctypes.data_as(ctypes.c_void_p))
+        return write_blob(self.BinaryPath(key), SHADER_BINARY_VERSION, [],
+                          {"binary": data[:length.value]}, {"format": fmt.value})
+
+
+# Caché compartida por todo el proceso
+shaderCache = ShaderCache()
@@ -1,19 +1,27 @@
 # skybox.py
 
-from numpy import array, float32
+from concurrent.futures import ThreadPoolExecutor
+from numpy import array, ascontiguousarray, float32, frombuffer, stack, uint8, uint16
 import glm
 from OpenGL.GL import * 
-from OpenGL.GL.shaders import compileProgram, compileShader
+import hashlib
+import os
 import pygame
 
+from assetcache import cache_path, read_blob, write_blob
+from framedata import frame_uniforms
+from shaderprogram import shaderCache
+
+
+# Subir si cambia el contenido del .cubemap (caras + mipmaps)
+SKYBOX_CACHE_VERSION = 1
+
 
 skybox_vertex_shader = '''
 #version 450 core
 
 layout (location = 0) in vec3 inPosition;
-
-uniform mat4 viewMatrix;
-uniform mat4 projectionMatrix;
+''' + frame_uniforms + '''
 
 
 out vec3 texCoords;
@@ -22,7 +30,8 @@ void main()
 {
     texCoords = inPosition;
     mat4 vm = mat4(mat3(viewMatrix));
-    gl_Position = projectionMatrix * vm * vec4(inPosition, 1.0);
+    // z = w: profundidad máxima (1.0), solo pasa donde no se dibujó nada
+    gl_Position = (projectionMatrix * vm * vec4(inPosition, 1.0)).xyww;
 }
 
 '''
@@ -45,9 +54,73 @@ void main()
 '''
 
 
+def decode_skybox_face(filename):
+	# Decodifica una cara del cubemap a (ancho, alto, bytes RGB); no necesita contexto GL
+	texture = pygame.image.load(filename)
+	return texture.get_width(), texture.get_height(), pygame.image.tostring(texture, "RGB", False)
+
+
+def build_mip_chain(faces):
+	"""
+	Niveles del cubemap desde el nivel 0 (6, lado, lado, 3) uint8 hasta 1x1,
+	promediando bloques de 2x2 (lo mismo que haría glGenerateMipmap).
+	"""
+	levels = [faces]
+	while levels[-1].shape[1] > 1:
+		level = levels[-1]
+		n = level.shape[1] // 2
+		total = level[:, 0:2 * n:2, 0:2 * n:2].astype(uint16)
+		total += level[:, 1:2 * n:2, 0:2 * n:2]
+		total += level[:, 0:2 * n:2, 1:2 * n:2]
+		total += level[:, 1:2 * n:2, 1:2 * n:2]
+		total += 2
+		total >>= 2
+		levels.append(total.astype(uint8))
+	return levels
+
+
+def cubemap_cache_path(textureList, cacheDir = None):
+	# Una entrada por combinación de caras (en orden), junto a la primera
+	digest = hashlib.sha1("|".join(os.path.abspath(p) for p in textureList).encode("utf-8")).hexdigest()[:16]
+	return cache_path(textureList[0], f"{digest}.cubemap", cacheDir)
+
+
+def load_cubemap(textureList, useCache = True, cacheDir = None):
+	"""
+	Las 6 caras y sus mipmaps como lista de arrays (6, alto, ancho, 3) uint8.
+	Con caché válida (misma ruta, mtime y tamaño de las 6 imágenes) son memmaps
+	del .cubemap y no se decodifica nada; si no, las caras se decodifican en
+	paralelo y se guarda el resultado. No necesita contexto GL.
+	"""
+	path = cubemap_cache_path(textureList, cacheDir)
+	if useCache:
+		blob = read_blob(path, SKYBOX_CACHE_VERSION)
+		if blob is not None:
+			meta, arrays = blob
+			return [arrays[f"level{k}"] for k in range(meta["levels"])]
+
+	with ThreadPoolExecutor(len(textureList)) as pool:
+		decoded = list(pool.map(decode_skybox_face, textureList))
+
+	if len({(w, h) for w, h, _ in decoded}) != 1 or decoded[0][0] != decoded[0][1]:
+		raise ValueError("Las caras del skybox deben ser cuadradas y del mismo tamaño")
+	w, h = decoded[0][:2]
+	faces = stack([frombuffer(pixels, dtype = uint8).reshape(h, w, 3) for _, _, pixels in decoded])
+	levels = build_mip_chain(faces)
+
+	if useCache:
+		if not write_blob(path, SKYBOX_CACHE_VERSION, textureList,
+						  {f"level{k}": level for k, level in enumerate(levels)}, {"levels": len(levels)}):
+			print(f"[Skybox] ⚠ No se pudo escribir la caché de {textureList[0]}")
+	return levels
+
+
 class Skybox(object):
-	def __init__(self, textureList):
-		self.cameraRef = None
+	def __init__(self, textureList, load = True, useCache = True, cacheDir = None):
+		# Con load=False las caras llegan después con UploadLevels / UploadFace (carga en segundo plano)
+		self.faceCount = len(textureList)
+		self.facesLoaded = 0
+		self.mipLevels = 1
 		
 		skyboxVertices = [-1.0,  1.0, -1.0,
 						  -1.0, -1.0, -1.0,
@@ -93,71 +166,137 @@ class Skybox(object):
 		
 		self.vertexBuffer = array(skyboxVertices, dtype = float32 )
 		self.VBO = glGenBuffers(1)
+
+		# El cubo no cambia: se sube una vez y el VAO guarda el atributo
+		self.VAO = glGenVertexArrays(1)
+		glBindVertexArray(self.VAO)
+
+		glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+
+		glBufferData(GL_ARRAY_BUFFER,
+					 self.vertexBuffer.nbytes,
+					 self.vertexBuffer,
+					 GL_STATIC_DRAW)
+
+		glEnableVertexAttribArray(0)
+
+		glVertexAttribPointer(0,
+							  3,
+							  GL_FLOAT,
+							  GL_FALSE,
+							  4 * 3,
+							  ctypes.c_void_p(0) )
+
+		glBindVertexArray(0)
 		
-		self.shaders = compileProgram(compileShader(skybox_vertex_shader, GL_VERTEX_SHADER),
-									  compileShader(skybox_fragment_shader, GL_FRAGMENT_SHADER) )
+		self.shaders = shaderCache.Acquire(skybox_vertex_shader, skybox_fragment_shader)
 		
 		self.texture = glGenTextures(1)
 		glBindTexture(GL_TEXTURE_CUBE_MAP, self.texture)
 		
-		for i in range(len(textureList)):
-			texture = pygame.image.load(textureList[i])
-			textureData = pygame.image.tostring(texture, "RGB", False)
-			
-			glTexImage2D(GL_TEXTURE_CUBE_MAP_POSITIVE_X + i,
-						 0,
-						 GL_RGB,
-						 texture.get_width(),
-						 texture.get_height(),
-						 0,
-						 GL_RGB,
-						 GL_UNSIGNED_BYTE,
-						 textureData)
-			
-		glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-		glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+		# Con mipmaps, que el filtrado no marque las aristas entre caras
+		glEnable(GL_TEXTURE_CUBE_MAP_SEAMLESS)
+
+		glBindTexture(GL_TEXTURE_CUBE_MAP, self.texture)
 		glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
 		glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
 		glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_WRAP_R, GL_CLAMP_TO_EDGE)
-		
+		self.SetMipLevels(1)
+
+		if load:
+			self.UploadLevels(load_cubemap(textureList, useCache, cacheDir))
+
+
+	def SetMipLevels(self, levels):
+		# Solo se usan niveles ya subidos completos: hasta entonces, GL_LINEAR sobre el nivel 0
+		self.mipLevels = levels
+		glBindTexture(GL_TEXTURE_CUBE_MAP, self.texture)
+		glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MAX_LEVEL, levels - 1)
+		glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+		glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MIN_FILTER,
+						GL_LINEAR_MIPMAP_LINEAR if levels > 1 else GL_LINEAR)
+
+
+	def UploadLevels(self, levels):
+		for _ in self.UploadLevelsSteps(levels):
+			pass
+
+
+	def UploadLevelsSteps(self, levels, chunkBytes = None):
+		# Generador: sube las 6 caras de cada nivel (de load_cubemap) y al final activa los mipmaps
+		for level, faces in enumerate(levels):
+			height, width = faces.shape[1:3]
+			for i in range(len(faces)):
+				yield from self.UploadFaceSteps(i, width, height, ascontiguousarray(faces[i]).reshape(-1),
+												chunkBytes, level)
+		self.SetMipLevels(len(levels))
+
+
+	def UploadFace(self, i, width, height, textureData, level = 0):
+		for _ in self.UploadFaceSteps(i, width, height, textureData, level = level):
+			pass
+
+
+	def UploadFaceSteps(self, i, width, height, textureData, chunkBytes = None, level = 0):
+		# Generador: sube la cara por bloques de filas y entrega los bytes de cada bloque
+		rowBytes = width * 3
+		if chunkBytes is None or len(textureData) <= chunkBytes:
+			rows = height
+		else:
+			rows = max(1, chunkBytes // rowBytes)
+
+		# Filas RGB sin relleno (el orden de carga con otras texturas puede variar)
+		glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+		glBindTexture(GL_TEXTURE_CUBE_MAP, self.texture)
+
+		glTexImage2D(GL_TEXTURE_CUBE_MAP_POSITIVE_X + i,
+					 level,
+					 GL_RGB,
+					 width,
+					 height,
+					 0,
+					 GL_RGB,
+					 GL_UNSIGNED_BYTE,
+					 textureData if rows == height else None)
+
+		if rows == height:
+			yield len(textureData)
+		else:
+			data = memoryview(textureData)
+			for y in range(0, height, rows):
+				n = min(rows, height - y)
+				glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+				glBindTexture(GL_TEXTURE_CUBE_MAP, self.texture)
+				glTexSubImage2D(GL_TEXTURE_CUBE_MAP_POSITIVE_X + i, level, 0, y, width, n,
+								GL_RGB, GL_UNSIGNED_BYTE, data[y * rowBytes:(y + n) * rowBytes].tobytes())
+				yield n * rowBytes
+
+		if level == 0:
+			self.facesLoaded += 1
+
 
 	def Render(self):
-		if self.shaders == None:
+		if self.shaders == None or self.facesLoaded < self.faceCount:
 			return
 		
-		glUseProgram(self.shaders)
-		
-		if self.cameraRef is not None:
-			glUniformMatrix4fv( glGetUniformLocation(self.shaders, "viewMatrix"),
-								1, GL_FALSE, glm.value_ptr( self.cameraRef.viewMatrix) )
-			
-			glUniformMatrix4fv( glGetUniformLocation(self.shaders, "projectionMatrix"),
-								1, GL_FALSE, glm.value_ptr( self.cameraRef.projectionMatrix) )
+		# La cámara sale del UBO FrameData (Renderer.frameData)
+		self.shaders.Use()
 		
+		# Va después de los opacos: con LEQUAL contra el 1.0 del clear solo
+		# se sombrean los pixeles que ningún modelo tapó
 		glDepthMask(GL_FALSE)
+		glDepthFunc(GL_LEQUAL)
 		
+		# El sampler 'skybox' lee la unidad 0; RenderQueue.Submit deja activa la última que usó
+		glActiveTexture(GL_TEXTURE0)
 		glBindTexture(GL_TEXTURE_CUBE_MAP, self.texture)
 		
-		glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
-		
-		glBufferData(GL_ARRAY_BUFFER,
-					 self.vertexBuffer.nbytes,
-					 self.vertexBuffer,
-					 GL_STATIC_DRAW)
-		
-		glEnableVertexAttribArray(0)
-		
-		glVertexAttribPointer(0,
-							  3,
-							  GL_FLOAT,
-							  GL_FALSE,
-							  4 * 3,
-							  ctypes.c_void_p(0) )
-		
+		glBindVertexArray(self.VAO)
 		
 		glDrawArrays(GL_TRIANGLES, 0, 36)
 		
-		glDisableVertexAttribArray(0)
+		glBindVertexArray(0)
 
+		glDepthFunc(GL_LESS)
 		glDepthMask(GL_TRUE)
 		
@@ -0,0 +1,341 @@
+# spatialindex.py
+# (mantén este comentario con el nombre del archivo)
+
+from culling import transform_bounds
+
+import numpy as np
+
+
+def _spread_bits(x):
+    """Intercala 2 ceros entre los 10 bits bajos de cada entero (para códigos Morton 3D)."""
+    x = x.astype(np.uint32) & 0x3FF
+    x = (x | (x << 16)) & 0x030000FF
+    x = (x | (x << 8)) & 0x0300F00F
+    x = (x | (x << 4)) & 0x030C30C3
+    x = (x | (x << 2)) & 0x09249249
+    return x
+
+
+def morton_codes(points):
+    """Código Morton de 30 bits de cada punto (N, 3), normalizado a la caja que los contiene."""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if len(points) == 0:
+        return np.zeros(0, dtype=np.uint32)
+    lo = points.min(axis=0)
+    size = np.maximum(points.max(axis=0) - lo, 1e-12)
+    q = np.clip((points - lo) / size * 1023.0, 0, 1023).astype(np.uint32)
+    return _spread_bits(q[:, 0]) << 2 | _spread_bits(q[:, 1]) << 1 | _spread_bits(q[:, 2])
+
+
+class BVH(object):
+    """
+    Jerarquía de AABBs (en mundo) para consultas espaciales sin recorrer toda la escena.
+      - Los objetos se ordenan por código Morton y se agrupan de a 'leafSize'
+        en hojas; encima va un árbol binario completo implícito (nivel l tiene
+        2^l nodos). Construir, reajustar y consultar es todo numpy por niveles.
+      - SetBounds() actualiza objetos que se movieron; la próxima consulta
+        reajusta las cajas (refit). Si el árbol se degrada (hojas que crecieron
+        más de 'rebuildFactor' veces su superficie) se reconstruye.
+      - Consultas: QueryFrustum, QueryRay, QueryRadius. Devuelven índices de
+        objeto (la posición en los arrays con que se cargaron).
+    Los objetos quitados (Remove) o sin volumen tienen una caja vacía (min > max)
+    y nunca aparecen en las consultas.
+    """
+    def __init__(self, mins=None, maxs=None, leafSize=8, rebuildFactor=2.0):
+        self.leafSize = leafSize
+        self.rebuildFactor = rebuildFactor
+
+        self.mins = np.zeros((0, 3), dtype=np.float64)
+        self.maxs = np.zeros((0, 3), dtype=np.float64)
+
+        self.slots = None      # objeto en cada posición de las hojas (-1 = relleno)
+        self.slotOf = None     # posición de cada objeto en 'slots'
+        self.moved = []        # índices cambiados desde el último refit
+        self.levels = []       # [(mins, maxs)] por nivel, de la raíz a las hojas
+        self.builtCost = 0.0
+
+        self.needsBuild = True
+        self.needsRefit = False
+        self.builds = 0
+        self.refits = 0
+
+        self.models = None     # ver FromModels / UpdateModels
+        self.modelBounds = None
+        self.syncedVersion = None
+
+        if mins is not None:
+            self.SetAll(mins, maxs)
+
+    # -------------- Contenido ----------------
+
+    def __len__(self):
+        return len(self.mins)
+
+    def SetAll(self, mins, maxs):
+        """Reemplaza todos los objetos (se reconstruye en la próxima consulta)."""
+        self.mins = np.array(mins, dtype=np.float64).reshape(-1, 3)
+        self.maxs = np.array(maxs, dtype=np.float64).reshape(-1, 3)
+        self.needsBuild = True
+
+    def Add(self, lo, hi):
+        """Agrega un objeto y devuelve su índice (se reconstruye en la próxima consulta)."""
+        self.mins = np.vstack((self.mins, np.reshape(lo, (1, 3))))
+        self.maxs = np.vstack((self.maxs, np.reshape(hi, (1, 3))))
+        self.needsBuild = True
+        return len(self.mins) - 1
+
+    def Remove(self, index):
+        """Deja al objeto sin volumen: los índices del resto no cambian."""
+        self.SetBounds(index, np.inf, -np.inf)
+
+    def SetBounds(self, index, lo, hi):
+        """Nuevas cajas para uno o varios objetos ('index' int, slice o array)."""
+        self.mins[index] = lo
+        self.maxs[index] = hi
+        self.moved.append(np.arange(len(self.mins))[index].reshape(-1))
+        self.needsRefit = True
+
+    # -------------- Construcción ----------------
+
+    def Build(self):
+        n = len(self.mins)
+        valid = (self.mins <= self.maxs).all(axis=1)
+        with np.errstate(invalid="ignore"):
+            centers = np.where(valid[:, None], (self.mins + self.maxs) * 0.5, 0.0)
+        codes = morton_codes(centers)
+        # Los vacíos van al final
+        order = np.lexsort((codes, ~valid))
+
+        leafCount = max(1, -(-n // self.leafSize))
+        depth = int(np.ceil(np.log2(leafCount))) if leafCount > 1 else 0
+        self.slots = np.full((1 << depth) * self.leafSize, -1, dtype=np.int64)
+        self.slots[:n] = order
+        self.slotOf = np.empty(n, dtype=np.int64)
+        self.slotOf[order] = np.arange(n)
+
+        self.moved = []
+        self.Refit(rebuild=False)
+        self.builtCost = self.Cost()
+        self.needsBuild = False
+        self.builds += 1
+
+    def _LeafBounds(self, leaves):
+        slots = self.slots.reshape(-1, self.leafSize)[leaves]
+        used = (slots >= 0)[..., None]
+        ids = np.where(slots >= 0, slots, 0)
+        return (np.where(used, self.mins[ids], np.inf).min(axis=-2),
+                np.where(used, self.maxs[ids], -np.inf).max(axis=-2))
+
+    def Refit(self, rebuild=True):
+        """
+        Recalcula las cajas con el orden actual: solo las hojas con objetos
+        movidos y sus ancestros (todo el árbol si se movió mucho).
+        """
+        moved = np.unique(np.concatenate(self.moved)) if self.moved else None
+        self.moved = []
+
+        if moved is None or not self.levels or len(moved) * 4 > len(self.mins):
+            lo, hi = self._LeafBounds(slice(None))
+            levels = [(lo, hi)]
+            while len(lo) > 1:
+                lo = lo.reshape(-1, 2, 3).min(axis=1)
+                hi = hi.reshape(-1, 2, 3).max(axis=1)
+                levels.append((lo, hi))
+            self.levels = levels[::-1]
+        else:
+            nodes = np.unique(self.slotOf[moved] // self.leafSize)
+            lo, hi = self.levels[-1]
+            lo[nodes], hi[nodes] = self._LeafBounds(nodes)
+            for level in range(len(self.levels) - 2, -1, -1):
+                nodes = np.unique(nodes // 2)
+                childLo, childHi = self.levels[level + 1]
+                lo, hi = self.levels[level]
+                lo[nodes] = np.minimum(childLo[2 * nodes], childLo[2 * nodes + 1])
+                hi[nodes] = np.maximum(childHi[2 * nodes], childHi[2 * nodes + 1])
+
+        self.needsRefit = False
+        self.refits += 1
+
+        if rebuild and self.Cost() > self.rebuildFactor * max(self.builtCost, 1e-12):
+            self.Build()
+
+    def Cost(self):
+        """Suma de superficies de las hojas (crece cuando los objetos se separan)."""
+        lo, hi = self.levels[-1]
+        valid = (lo <= hi).all(axis=1)
+        d = (hi - lo)[valid]
+        return float((d[:, 0] * d[:, 1] + d[:, 1] * d[:, 2] + d[:, 2] * d[:, 0]).sum())
+
+    def Ready(self):
+        if self.needsBuild:
+            self.Build()
+        elif self.needsRefit:
+            self.Refit()
+
+    # -------------- Consultas ----------------
+
+    def _Traverse(self, classify):
+        """
+        Recorre el árbol por niveles. 'classify(mins, maxs)' devuelve
+        (toca, adentro) para un lote de cajas ('adentro' puede ser None).
+        Los nodos completamente adentro aportan todos sus objetos sin más
+        pruebas. Devuelve los índices que tocan, sin orden.
+        """
+        # Sin objetos no hay árbol que recorrer (una escena vacía es válida)
+        if len(self.mins) == 0:
+            return np.zeros(0, dtype=np.int64)
+        self.Ready()
+        depth = len(self.levels) - 1
+        nodes = np.zeros(1, dtype=np.int64)
+        found = []
+
+        for level, (lo, hi) in enumerate(self.levels):
+            lo, hi = lo[nodes], hi[nodes]
+            hit, inside = classify(lo, hi)
+            hit &= (lo <= hi).all(axis=1)
+
+            if inside is not None:
+                inside &= hit
+                shift = depth - level
+                for node in nodes[inside].tolist():
+                    a = (node << shift) * self.leafSize
+                    b = ((node + 1) << shift) * self.leafSize
+                    found.append(self.slots[a:b])
+                hit &= ~inside
+
+            nodes = nodes[hit]
+            if level < depth:
+                nodes = (nodes[:, None] * 2 + np.arange(2)).ravel()
+
+        # Hojas parciales: prueba por objeto
+        ids = self.slots[(nodes[:, None] * self.leafSize + np.arange(self.leafSize)).ravel()]
+        ids = ids[ids >= 0]
+        lo, hi = self.mins[ids], self.maxs[ids]
+        hit, _ = classify(lo, hi)
+        found.append(ids[hit & (lo <= hi).all(axis=1)])
+
+        ids = np.concatenate(found)
+        ids = ids[ids >= 0]
+        # Los nodos "adentro" pueden traer objetos quitados después del último Build
+        return ids[(self.mins[ids] <= self.maxs[ids]).all(axis=1)]
+
+    def QueryFrustum(self, planes):
+        """Objetos cuya caja toca el frustum ('planes' de culling.frustum_planes), ordenados."""
+        normals, d = planes[:, :3], planes[:, 3]
+        positive = normals >= 0
+
+        def classify(lo, hi):
+            near = np.where(positive[None], hi[:, None, :], lo[:, None, :])   # más adentro
+            far = np.where(positive[None], lo[:, None, :], hi[:, None, :])    # más afuera
+            with np.errstate(invalid="ignore"):   # cajas vacías (inf * 0); se descartan igual
+                hit = ((near * normals).sum(axis=2) + d >= 0).all(axis=1)
+                inside = ((far * normals).sum(axis=2) + d >= 0).all(axis=1)
+            return hit, inside
+
+        return np.sort(self._Traverse(classify))
+
+    def QueryRadius(self, center, radius):
+        """Objetos cuya caja toca la esfera (center, radius), ordenados."""
+        center = np.asarray(center, dtype=np.float64).reshape(3)
+        r2 = float(radius) ** 2
+
+        def classify(lo, hi):
+            closest = np.clip(center, lo, hi)
+            hit = ((closest - center) ** 2).sum(axis=1) <= r2
+            farthest = np.where(np.abs(lo - center) > np.abs(hi - center), lo, hi)
+            inside = ((farthest - center) ** 2).sum(axis=1) <= r2
+            return hit, inside
+
+        return np.sort(self._Traverse(classify))
+
+    def QueryRay(self, origin, direction, maxDistance=np.inf):
+        """
+        Objetos cuya caja cruza el rayo, del más cercano al más lejano:
+        (índices, distancia de entrada). 'direction' no necesita estar normalizada
+        (las distancias quedan en unidades de 'direction').
+        """
+        origin = np.asarray(origin, dtype=np.float64).reshape(3)
+        direction = np.asarray(direction, dtype=np.float64).reshape(3)
+        # Ejes paralelos al rayo: sin 1/0 (el origen sobre una cara daría 0 * inf = nan)
+        parallel = direction == 0.0
+        inverse = 1.0 / np.where(parallel, 1.0, direction)
+
+        def slabs(lo, hi):
+            t1 = (lo - origin) * inverse
+            t2 = (hi - origin) * inverse
+            enter, leave = np.minimum(t1, t2), np.maximum(t1, t2)
+            if parallel.any():
+                # El slab de un eje paralelo pasa entero si el origen está entre sus caras
+                between = (lo <= origin) & (origin <= hi)
+                enter = np.where(parallel, np.where(between, -np.inf, np.inf), enter)
+                leave = np.where(parallel, np.where(between, np.inf, -np.inf), leave)
+            return enter.max(axis=1), leave.min(axis=1)
+
+        def classify(lo, hi):
+            enter, leave = slabs(lo, hi)
+            return (enter <= leave) & (leave >= 0) & (enter <= maxDistance), None
+
+        ids = self._Traverse(classify)
+        enter, _ = slabs(self.mins[ids], self.maxs[ids])
+        enter = np.maximum(enter, 0.0)
+        order = np.argsort(enter, kind="stable")
+        return ids[order], enter[order]
+
+    # -------------- Fuentes de cajas ----------------
+
+    @classmethod
+    def FromModels(cls, models, **options):
+        """BVH sobre las cajas en mundo de 'models' (índice = posición en la lista)."""
+        bvh = cls(**options)
+        bvh.models = list(models)
+        bvh.modelBounds = [None] * len(bvh.models)
+        bvh.SetAll(np.full((len(bvh.models), 3), np.inf), np.full((len(bvh.models), 3), -np.inf))
+        bvh.UpdateModels()
+        return bvh
+
+    def UpdateModels(self):
+        """
+        Vuelve a leer las cajas de los modelos que cambiaron (los que se movieron
+        o terminaron de cargar). Devuelve cuántos cambiaron.
+        """
+        changed, mins, maxs = [], [], []
+        for i, model in enumerate(self.models):
+            bounds = model.GetWorldBounds()
+            # GetWorldBounds solo crea una tupla nueva si la matriz cambió
+            current = model.worldBounds
+            if bounds is not None and current is not self.modelBounds[i]:
+                self.modelBounds[i] = current
+                changed.append(i)
+                mins.append(bounds[0][0])
+                maxs.append(bounds[0][1])
+        if changed:
+            self.SetBounds(changed, mins, maxs)
+        return len(changed)
+
+    def SyncTransforms(self, transforms, localMin, localMax):
+        """
+        Cajas desde un TransformSystem: objeto i = transforms i con la caja local
+        (localMin, localMax) ((3,) para todos o (N, 3)). Solo recalcula los que
+        cambiaron en el último Update() del sistema (o todos si se perdió alguno).
+        """
+        transforms.Update()
+        if transforms.version == self.syncedVersion:
+            return 0
+
+        n = transforms.count
+        if self.syncedVersion is None or transforms.version != self.syncedVersion + 1 or len(self) != n:
+            changed = np.arange(n)
+        else:
+            changed = transforms.changed
+        self.syncedVersion = transforms.version
+
+        localMin = np.asarray(localMin, dtype=np.float64)
+        localMax = np.asarray(localMax, dtype=np.float64)
+        if localMin.ndim == 2:
+            localMin, localMax = localMin[changed], localMax[changed]
+        lo, hi = transform_bounds(transforms.matrices[changed], localMin, localMax)
+
+        if len(self) != n:
+            self.SetAll(np.full((n, 3), np.inf), np.full((n, 3), -np.inf))
+        self.SetBounds(changed, lo, hi)
+        return len(changed)
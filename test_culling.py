@@ -0,0 +1,114 @@
+# test_culling.py
+# (mantén este comentario con el nombre del archivo)
+#
+# Frustum culling en CPU: no necesita contexto GL (python -m pytest test_culling.py)
+
+import glm
+import numpy as np
+
+from camera import Camera
+from culling import aabbs_visible, frustum_planes, spheres_visible
+from gl import Renderer
+from model import Model
+from transforms import TransformSystem
+
+
+def camera_planes(position=(0, 0, 0), rotation=(0, 0, 0)):
+    camera = Camera(640, 360)
+    camera.position = glm.vec3(*position)
+    camera.rotation = glm.vec3(*rotation)
+    camera.Update()
+    return camera, frustum_planes(camera.projectionMatrix * camera.viewMatrix)
+
+
+def outside_one_plane(viewProjection, mins, maxs):
+    """Referencia: las 8 esquinas en clip space caen del mismo lado afuera de algún plano."""
+    m = np.array(viewProjection, dtype=np.float64)
+    corners = np.stack([np.where(np.array(bits)[None, :], maxs, mins)
+                        for bits in np.ndindex(2, 2, 2)], axis=1)          # (N, 8, 3)
+    clip = np.concatenate([corners, np.ones(corners.shape[:2] + (1,))], axis=2) @ m.T
+    x, y, z, w = np.moveaxis(clip, 2, 0)
+    tests = [x < -w, x > w, y < -w, y > w, z < -w, z > w]
+    return np.any([t.all(axis=1) for t in tests], axis=0)
+
+
+def test_frustum_planes_known_camera():
+    # Cámara en el origen mirando a -Z, 60° vertical, cerca 0.1 y lejos 1000
+    _, planes = camera_planes()
+    assert planes.shape == (6, 4)
+    assert np.allclose(np.linalg.norm(planes[:, :3], axis=1), 1.0)
+
+    near, far = planes[4], planes[5]
+    assert np.allclose(near, [0, 0, -1, -0.1], atol=1e-6)
+    assert np.allclose(far, [0, 0, 1, 1000], rtol=1e-3)   # la proyección de glm es float32
+
+    # Arriba / abajo a ±30° de -Z: normales hacia adentro
+    half = np.radians(30)
+    bottom, top = planes[2], planes[3]
+    assert np.allclose(bottom[:3], [0, np.cos(half), -np.sin(half)], atol=1e-6)
+    assert np.allclose(top[:3], [0, -np.cos(half), -np.sin(half)], atol=1e-6)
+    assert np.allclose(planes[:4, 3], 0, atol=1e-6)
+
+
+def test_spheres_inside_outside_straddling():
+    _, planes = camera_planes()
+    centers = [(0, 0, -10),      # adentro
+               (0, 0, 10),       # detrás de la cámara
+               (0, 0, -2000),    # más allá del plano lejano
+               (100, 0, -10),    # a la derecha
+               (0, 0, 0.5),      # cruza el plano cercano
+               (9, 0, -10)]      # cruza el plano derecho
+    radii = [1, 1, 1, 1, 1, 4]
+    assert spheres_visible(planes, centers, radii).tolist() == [True, False, False, False, True, True]
+
+
+def test_aabbs_inside_outside_straddling():
+    _, planes = camera_planes()
+    mins = np.array([(-1, -1, -11), (-1, -1, 9), (50, -1, -11), (-1, -1, -1), (8, -1, -11), (-1, 20, -11)])
+    maxs = mins + 2
+    # adentro, detrás, a la derecha, con la cámara adentro, cruza el borde derecho, arriba
+    assert aabbs_visible(planes, mins, maxs).tolist() == [True, False, False, True, True, False]
+
+
+def test_random_boxes_match_clip_space_reference():
+    camera, planes = camera_planes((1, 2, 3), (-10, 35, 5))
+    viewProjection = camera.projectionMatrix * camera.viewMatrix
+
+    rng = np.random.default_rng(13)
+    mins = rng.uniform(-60, 60, (5000, 3))
+    maxs = mins + rng.uniform(0.01, 8, (5000, 3))
+    centers = (mins + maxs) * 0.5
+    radii = np.linalg.norm(maxs - mins, axis=1) * 0.5
+
+    visible = spheres_visible(planes, centers, radii) & aabbs_visible(planes, mins, maxs)
+    # Una caja afuera de un solo plano es exactamente lo que descarta la prueba por planos
+    assert (visible == ~outside_one_plane(viewProjection, mins, maxs)).all()
+    assert 0 < visible.sum() < len(visible)
+
+
+def test_renderer_frustum_cull_counts():
+    # FrustumCull sin ventana: solo usa la cámara y las cajas de un TransformSystem
+    renderer = Renderer.__new__(Renderer)
+    renderer.camera, planes = camera_planes()
+    renderer.frustumCulling = True
+    renderer.transforms = TransformSystem()
+
+    rng = np.random.default_rng(7)
+    corners = np.array([(-0.5, -0.5, -0.5), (0.5, 0.5, 0.5)])
+    positions = rng.uniform(-40, 40, (300, 3))
+    models = []
+    for position in positions:
+        model = Model(None, load=False, transforms=renderer.transforms)
+        model.SetBounds(corners)
+        model.position = glm.vec3(*position)
+        models.append(model)
+    loading = Model(None, load=False, transforms=renderer.transforms)   # sin volumen: no se descarta
+    objects = models + [loading]
+
+    renderer.transforms.Update()
+    drawn = renderer.FrustumCull(objects)
+
+    expected = aabbs_visible(planes, positions - 0.5, positions + 0.5)
+    assert drawn == [m for m, v in zip(models, expected) if v] + [loading]
+    assert len(drawn) - 1 == expected.sum()
+    assert len(objects) - len(drawn) == (~expected).sum()
@@ -0,0 +1,298 @@
+# texturebuild.py
+# (mantén este comentario con el nombre del archivo)
+#
+# Preprocesado de texturas: cada imagen se convierte una sola vez en un
+# contenedor .texture (assetcache) con todos sus mipmaps ya calculados y
+# comprimidos por bloques. Al cargar (texturecache.py) solo se mapea el
+# archivo y se suben los niveles tal cual: nada que decodificar ni generar.
+#
+#   python texturebuild.py textures
+#   python texturebuild.py textures/Face.png --format rgba8
+#
+# Formatos:
+#   bc1   (DXT1)  RGB, 8 bytes por bloque de 4x4 -> 1/8 de RGBA8
+#   bc3   (DXT5)  RGBA, 16 bytes por bloque      -> 1/4 de RGBA8
+#   rgba8         sin comprimir, solo los mipmaps precalculados
+#   auto          bc1 si la imagen es opaca, si no bc3
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from assetcache import cache_path, read_blob, write_blob
+
+
+TEXTURE_VERSION = 1
+
+BLOCK_BYTES = {"bc1": 8, "bc3": 16}   # formatos comprimidos por bloques de 4x4
+FORMATS = ("auto", "bc1", "bc3", "rgba8")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tga")
+
+_BC1_BLOCK = np.dtype([("c0", "<u2"), ("c1", "<u2"), ("indices", "<u4")])
+
+
+def build_mip_levels(pixels):
+    """
+    Cadena completa de mipmaps de una imagen (alto, ancho, 4) uint8, hasta 1x1,
+    con filtro de caja 2x2 (como glGenerateMipmap). En lados impares se
+    descarta la última fila/columna.
+    """
+    levels = [pixels]
+    while levels[-1].shape[0] > 1 or levels[-1].shape[1] > 1:
+        level = levels[-1].astype(np.uint16)
+        h, w = level.shape[:2]
+        if h > 1:
+            level = level[0:h - 1:2] + level[1:h:2]
+        else:
+            level = level * 2
+        if w > 1:
+            level = level[:, 0:w - 1:2] + level[:, 1:w:2]
+        else:
+            level = level * 2
+        levels.append(((level + 2) >> 2).astype(np.uint8))
+    return levels
+
+
+def _blocks(pixels):
+    """(alto, ancho, 4) -> (bloques, 16, 4) en orden de filas; los bordes se completan repitiendo."""
+    h, w = pixels.shape[:2]
+    pixels = np.pad(pixels, ((0, -h % 4), (0, -w % 4), (0, 0)), mode="edge")
+    bh, bw = pixels.shape[0] // 4, pixels.shape[1] // 4
+    return pixels.reshape(bh, 4, bw, 4, 4).transpose(0, 2, 1, 3, 4).reshape(-1, 16, 4)
+
+
+def _unblocks(blocks, w, h):
+    bh, bw = (h + 3) // 4, (w + 3) // 4
+    pixels = blocks.reshape(bh, bw, 4, 4, 4).transpose(0, 2, 1, 3, 4).reshape(bh * 4, bw * 4, 4)
+    return np.ascontiguousarray(pixels[:h, :w])
+
+
+def _rgb565(colors):
+    """float RGB (..., 3) -> (565 empaquetado, RGB que devuelve el decodificador)."""
+    q = np.rint(np.clip(colors, 0, 255) * np.array([31, 63, 31]) / 255.0).astype(np.uint16)
+    packed = (q[..., 0] << 11) | (q[..., 1] << 5) | q[..., 2]
+    return packed, _expand565(packed)
+
+
+def _expand565(packed):
+    packed = packed.astype(np.uint16)
+    r, g, b = packed >> 11, (packed >> 5) & 63, packed & 31
+    return np.stack([(r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)], axis=-1).astype(np.float32)
+
+
+def _color_palette(c0, c1):
+    """Los 4 colores de un bloque en modo de 4 colores (c0 > c1), en orden de índice."""
+    return np.stack([c0, c1, (2 * c0 + c1) / 3.0, (c0 + 2 * c1) / 3.0], axis=1)
+
+
+def _encode_colors(blocks):
+    """
+    Bloques de color BC1: extremos sobre el eje principal de los 16 colores
+    (PCA con unas iteraciones de potencia) y a cada texel el más cercano de
+    la paleta. Siempre en modo de 4 colores (c0 > c1), que es el único que
+    BC3 admite; si c0 == c1 todos los índices quedan en 0.
+    """
+    colors = blocks[..., :3].astype(np.float32)
+    mean = colors.mean(axis=1, keepdims=True)
+    centered = colors - mean
+    cov = np.einsum("nki,nkj->nij", centered, centered)
+
+    axis = np.ones((len(blocks), 3), np.float32)
+    for _ in range(8):
+        axis = np.einsum("nij,nj->ni", cov, axis)
+        axis /= np.maximum(np.linalg.norm(axis, axis=1, keepdims=True), 1e-8)
+
+    t = np.einsum("nki,ni->nk", centered, axis)
+    lo = mean[:, 0] + t.min(axis=1)[:, None] * axis
+    hi = mean[:, 0] + t.max(axis=1)[:, None] * axis
+
+    packedHi, _ = _rgb565(hi)
+    packedLo, _ = _rgb565(lo)
+    c0 = np.maximum(packedHi, packedLo)
+    c1 = np.minimum(packedHi, packedLo)
+
+    palette = _color_palette(_expand565(c0), _expand565(c1))
+    distances = ((colors[:, :, None, :] - palette[:, None, :, :]) ** 2).sum(axis=-1)
+    codes = distances.argmin(axis=2).astype(np.uint32)
+    codes[c0 == c1] = 0
+
+    out = np.empty(len(blocks), _BC1_BLOCK)
+    out["c0"], out["c1"] = c0, c1
+    out["indices"] = (codes << (2 * np.arange(16, dtype=np.uint32))).sum(axis=1, dtype=np.uint32)
+    return out.view(np.uint8).reshape(-1, 8)
+
+
+def _alpha_palette(a0, a1):
+    """Los 8 alfas de un bloque BC3 con a0 > a1, en orden de índice."""
+    steps = np.arange(1, 7, dtype=np.float32)
+    middle = ((7 - steps) * a0[:, None] + steps * a1[:, None]) / 7.0
+    return np.concatenate([a0[:, None], a1[:, None], middle], axis=1)
+
+
+def _encode_alpha(blocks):
+    """Bloques de alfa BC3: extremos = mín/máx del bloque, índices de 3 bits."""
+    alpha = blocks[..., 3].astype(np.float32)
+    a0, a1 = alpha.max(axis=1), alpha.min(axis=1)
+    palette = _alpha_palette(a0, a1)
+    codes = np.abs(alpha[:, :, None] - palette[:, None, :]).argmin(axis=2).astype(np.uint64)
+    codes[a0 == a1] = 0
+
+    bits = (codes << (3 * np.arange(16, dtype=np.uint64))).sum(axis=1, dtype=np.uint64)
+    out = np.empty((len(blocks), 8), np.uint8)
+    out[:, 0], out[:, 1] = a0, a1
+    out[:, 2:] = bits.astype("<u8").view(np.uint8).reshape(-1, 8)[:, :6]
+    return out
+
+
+def encode_level(pixels, fmt):
+    """Un nivel (alto, ancho, 4) uint8 -> bytes en 'fmt' (bloques en orden de filas)."""
+    if fmt == "rgba8":
+        return np.ascontiguousarray(pixels).reshape(-1)
+    blocks = _blocks(pixels)
+    if fmt == "bc1":
+        return _encode_colors(blocks).reshape(-1)
+    if fmt == "bc3":
+        return np.concatenate([_encode_alpha(blocks), _encode_colors(blocks)], axis=1).reshape(-1)
+    raise ValueError(f"Formato de textura desconocido '{fmt}' (usar uno de {FORMATS})")
+
+
+def decode_level(data, fmt, w, h):
+    """
+    Inverso de encode_level: bytes en 'fmt' -> (alto, ancho, 4) uint8. Es el
+    respaldo para GPUs sin S3TC (se suben como RGBA8).
+    """
+    if fmt == "rgba8":
+        return np.asarray(data, np.uint8).reshape(h, w, 4)
+
+    blockBytes = BLOCK_BYTES[fmt]
+    raw = np.asarray(data, np.uint8).reshape(-1, blockBytes)
+    color = raw[:, blockBytes - 8:].copy().view(_BC1_BLOCK).reshape(-1)
+    c0, c1 = color["c0"], color["c1"]
+
+    palette = _color_palette(_expand565(c0), _expand565(c1))
+    threeColor = (c0 <= c1) & (fmt == "bc1")   # BC1 con c0 <= c1: 3 colores + negro transparente
+    if threeColor.any():
+        e0, e1 = _expand565(c0[threeColor]), _expand565(c1[threeColor])
+        palette[threeColor, 2] = (e0 + e1) / 2.0
+        palette[threeColor, 3] = 0.0
+
+    shifts = 2 * np.arange(16, dtype=np.uint32)
+    codes = (color["indices"][:, None] >> shifts) & 3
+    rgb = np.take_along_axis(palette, codes[:, :, None].astype(np.intp), axis=1)
+
+    alpha = np.full(codes.shape, 255.0, np.float32)
+    if fmt == "bc1":
+        alpha[threeColor[:, None] & (codes == 3)] = 0.0
+    else:
+        a0, a1 = raw[:, 0].astype(np.float32), raw[:, 1].astype(np.float32)
+        bits = np.zeros(len(raw), np.uint64)
+        for i in range(6):
+            bits |= raw[:, 2 + i].astype(np.uint64) << np.uint64(8 * i)
+        alphaCodes = (bits[:, None] >> (3 * np.arange(16, dtype=np.uint64))) & np.uint64(7)
+
+        alphas = _alpha_palette(a0, a1)
+        sixAlpha = a0 <= a1   # modo de 6 alfas + 0 y 255
+        if sixAlpha.any():
+            steps = np.arange(1, 5, dtype=np.float32)
+            alphas[sixAlpha, 2:6] = ((5 - steps) * a0[sixAlpha, None] + steps * a1[sixAlpha, None]) / 5.0
+            alphas[sixAlpha, 6] = 0.0
+            alphas[sixAlpha, 7] = 255.0
+        alpha = np.take_along_axis(alphas, alphaCodes.astype(np.intp), axis=1)
+
+    pixels = np.concatenate([rgb, alpha[:, :, None]], axis=2)
+    return _unblocks(np.rint(pixels).astype(np.uint8), w, h)
+
+
+def level_bytes(fmt, w, h):
+    """Tamaño en bytes de un nivel de w x h en 'fmt'."""
+    if fmt == "rgba8":
+        return w * h * 4
+    return ((w + 3) // 4) * ((h + 3) // 4) * BLOCK_BYTES[fmt]
+
+
+def texture_path(filename, cacheDir=None):
+    return cache_path(filename, "texture", cacheDir)
+
+
+def build_texture(filename, fmt="auto", cacheDir=None, force=False):
+    """
+    Escribe el contenedor .texture de 'filename' (si falta o cambió la imagen,
+    o con force=True). Devuelve (ruta, formato).
+    """
+    path = texture_path(filename, cacheDir)
+    if not force:
+        cached = read_blob(path, TEXTURE_VERSION)
+        if cached is not None and fmt in ("auto", cached[0]["format"]):
+            return path, cached[0]["format"]
+
+    from texturecache import decode_image   # pygame; este módulo no necesita GL
+    w, h, pixels = decode_image(filename)
+    pixels = np.frombuffer(pixels, np.uint8).reshape(h, w, 4)
+    if fmt == "auto":
+        fmt = "bc1" if (pixels[..., 3] == 255).all() else "bc3"
+
+    levels, chunks, offset = [], [], 0
+    for level in build_mip_levels(pixels):
+        data = encode_level(level, fmt)
+        levels.append([level.shape[1], level.shape[0], offset, int(data.nbytes)])
+        chunks.append(data)
+        offset += data.nbytes
+
+    meta = {"format": fmt, "width": w, "height": h, "levels": levels}
+    if not write_blob(path, TEXTURE_VERSION, [filename], {"data": np.concatenate(chunks)}, meta):
+        raise OSError(f"No se pudo escribir {path}")
+    return path, fmt
+
+
+def load_texture(filename, cacheDir=None):
+    """
+    Contenedor ya construido de 'filename' como dict {"format", "width",
+    "height", "levels": [(w, h, bytes), ...]} con los bytes mapeados del
+    archivo; None si no hay uno válido (no existe o la imagen cambió).
+    """
+    cached = read_blob(texture_path(filename, cacheDir), TEXTURE_VERSION)
+    if cached is None:
+        return None
+    meta, arrays = cached
+    data = arrays["data"]
+    levels = [(w, h, data[offset:offset + size]) for w, h, offset, size in meta["levels"]]
+    return {"format": meta["format"], "width": meta["width"], "height": meta["height"], "levels": levels}
+
+
+def decompress_texture(texture):
+    """Misma textura con todos los niveles pasados a RGBA8 (respaldo sin S3TC)."""
+    if texture["format"] == "rgba8":
+        return texture
+    levels = [(w, h, decode_level(data, texture["format"], w, h).reshape(-1))
+              for w, h, data in texture["levels"]]
+    return dict(texture, format="rgba8", levels=levels)
+
+
+def _image_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convierte texturas a contenedores .texture con mipmaps comprimidos.")
+    parser.add_argument("paths", nargs="+", help="imágenes o carpetas")
+    parser.add_argument("--format", default="auto", choices=FORMATS)
+    parser.add_argument("--force", action="store_true", help="reconstruir aunque estén al día")
+    args = parser.parse_args(argv)
+
+    for filename in _image_files(args.paths):
+        start = time.perf_counter()
+        path, fmt = build_texture(filename, args.format, force=args.force)
+        print(f"[Textures] {filename} -> {fmt}, {os.path.getsize(path) / 1024.0:.1f} KB "
+              f"({(time.perf_counter() - start) * 1000.0:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+# texturecache.py
+# (mantén este comentario con el nombre del archivo)
+
+from OpenGL.GL import *
+from OpenGL.GL.EXT.texture_compression_s3tc import (GL_COMPRESSED_RGB_S3TC_DXT1_EXT,
+                                                     GL_COMPRESSED_RGBA_S3TC_DXT5_EXT)
+from collections import OrderedDict
+
+import os
+import pygame
+
+from texturebuild import decompress_texture, load_texture
+
+
+# (min filter, mag filter, wrap S, wrap T); con min filter *_MIPMAP_* se generan mipmaps
+# (o se usan los precalculados, si la textura tiene contenedor de texturebuild.py)
+DEFAULT_SAMPLER = (GL_LINEAR_MIPMAP_LINEAR, GL_LINEAR, GL_REPEAT, GL_REPEAT)
+
+_MIPMAP_FILTERS = (GL_NEAREST_MIPMAP_NEAREST, GL_LINEAR_MIPMAP_NEAREST,
+                   GL_NEAREST_MIPMAP_LINEAR, GL_LINEAR_MIPMAP_LINEAR)
+
+# Formatos de los contenedores de texturebuild.py -> formato interno de GL
+COMPRESSED_FORMATS = {"bc1": GL_COMPRESSED_RGB_S3TC_DXT1_EXT, "bc3": GL_COMPRESSED_RGBA_S3TC_DXT5_EXT}
+
+_s3tcSupported = None
+
+
+def decode_image(filename):
+    """
+    Decodifica BMP/JPG/PNG a (ancho, alto, bytes RGBA) en el orden de filas que
+    espera el UV del OBJ. No necesita ventana ni contexto GL (sirve en hilos/procesos).
+    """
+    surf = pygame.image.load(filename)
+
+    w, h = surf.get_size()
+    return w, h, pygame.image.tostring(surf, "RGBA", False)
+
+
+def compression_supported():
+    """True si la GPU acepta S3TC (BC1/BC3). Se consulta una vez; necesita el contexto GL."""
+    global _s3tcSupported
+    if _s3tcSupported is None:
+        names = {glGetStringi(GL_EXTENSIONS, i) for i in range(glGetIntegerv(GL_NUM_EXTENSIONS))}
+        _s3tcSupported = b"GL_EXT_texture_compression_s3tc" in names
+    return _s3tcSupported
+
+
+def read_texture(filename, compressed=True):
+    """
+    Lo que hay que subir para 'filename': el contenedor de texturebuild.py si
+    está construido (dict con los niveles; pasado a RGBA8 si compressed=False)
+    o, si no, la imagen decodificada (ancho, alto, bytes). Sin GL: sirve en hilos.
+    """
+    texture = load_texture(filename)
+    if texture is None:
+        return decode_image(filename)
+    return texture if compressed else decompress_texture(texture)
+
+
+def upload_texture(w, h, pixels, sampler=DEFAULT_SAMPLER):
+    """Crea una textura 2D RGBA8 con los parámetros de 'sampler'. Devuelve el id."""
+    steps = upload_texture_steps(w, h, pixels, sampler)
+    try:
+        while True:
+            next(steps)
+    except StopIteration as done:
+        return done.value
+
+
+def upload_texture_steps(w, h, pixels, sampler=DEFAULT_SAMPLER, chunkBytes=None):
+    """
+    Generador: sube la textura por bloques de filas (de ~chunkBytes) y entrega
+    los bytes de cada bloque; al terminar devuelve el id (StopIteration.value).
+    """
+    minFilter = sampler[0]
+
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    tex_id = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D, tex_id)
+
+    if chunkBytes is None or len(pixels) <= chunkBytes:
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, w, h, 0, GL_RGBA, GL_UNSIGNED_BYTE, pixels)
+        yield len(pixels)
+    else:
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, w, h, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+        pixels = memoryview(pixels)
+        rows = max(1, chunkBytes // (w * 4))
+        for y in range(0, h, rows):
+            n = min(rows, h - y)
+            glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+            glBindTexture(GL_TEXTURE_2D, tex_id)
+            glTexSubImage2D(GL_TEXTURE_2D, 0, 0, y, w, n, GL_RGBA, GL_UNSIGNED_BYTE,
+                            pixels[y * w * 4:(y + n) * w * 4].tobytes())
+            yield n * w * 4
+        glBindTexture(GL_TEXTURE_2D, tex_id)
+
+    _set_sampler(sampler)
+    if minFilter in _MIPMAP_FILTERS:
+        glGenerateMipmap(GL_TEXTURE_2D)
+    return tex_id
+
+
+def upload_levels(texture, sampler=DEFAULT_SAMPLER):
+    """Como upload_texture, para un contenedor de read_texture(). Devuelve el id."""
+    steps = upload_levels_steps(texture, sampler)
+    try:
+        while True:
+            next(steps)
+    except StopIteration as done:
+        return done.value
+
+
+def upload_levels_steps(texture, sampler=DEFAULT_SAMPLER):
+    """
+    Generador: sube los niveles precalculados de 'texture' (comprimidos tal
+    cual con glCompressedTexImage2D) de a uno y entrega sus bytes; al terminar
+    devuelve el id. Sin filtro *_MIPMAP_* solo se sube el nivel 0.
+    """
+    fmt = texture["format"]
+    levels = texture["levels"] if sampler[0] in _MIPMAP_FILTERS else texture["levels"][:1]
+
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    tex_id = glGenTextures(1)
+    for level, (w, h, data) in enumerate(levels):
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        glBindTexture(GL_TEXTURE_2D, tex_id)
+        if fmt in COMPRESSED_FORMATS:
+            glCompressedTexImage2D(GL_TEXTURE_2D, level, COMPRESSED_FORMATS[fmt], w, h, 0, data)
+        else:
+            glTexImage2D(GL_TEXTURE_2D, level, GL_RGBA, w, h, 0, GL_RGBA, GL_UNSIGNED_BYTE, data)
+        yield data.nbytes
+
+    glBindTexture(GL_TEXTURE_2D, tex_id)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAX_LEVEL, len(levels) - 1)
+    _set_sampler(sampler)
+    return tex_id
+
+
+def _set_sampler(sampler):
+    minFilter, magFilter, wrapS, wrapT = sampler
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, minFilter)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, magFilter)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, wrapS)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, wrapT)
+
+
+def texture_bytes(w, h, sampler=DEFAULT_SAMPLER):
+    """Memoria estimada en GPU: RGBA8 más 1/3 extra si lleva mipmaps."""
+    size = w * h * 4
+    return size * 4 // 3 if sampler[0] in _MIPMAP_FILTERS else size
+
+
+def levels_bytes(texture, sampler=DEFAULT_SAMPLER):
+    """Memoria en GPU de un contenedor: la suma de los niveles que se suben."""
+    levels = texture["levels"] if sampler[0] in _MIPMAP_FILTERS else texture["levels"][:1]
+    return sum(data.nbytes for _, _, data in levels)
+
+
+class TextureCache(object):
+    """
+    Texturas compartidas por ruta resuelta + sampler.
+      - Acquire() devuelve el id (lo carga si no estaba) y suma una referencia
+      - Release() resta una referencia; con 0 la textura sigue residente
+        hasta que haga falta espacio
+      - Si los bytes residentes pasan de 'budgetBytes' se borran las texturas
+        sin referencias, de la menos usada a la más reciente (LRU).
+        Las que siguen en uso nunca se borran.
+    """
+    def __init__(self, budgetBytes=512 << 20):
+        self.budgetBytes = budgetBytes  # None = sin límite
+
+        self.entries = OrderedDict()  # key -> {"id", "bytes", "refs"}, en orden LRU
+        self.keyById = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytesResident = 0
+
+    @staticmethod
+    def Key(filename, sampler=DEFAULT_SAMPLER):
+        return (os.path.normcase(os.path.realpath(filename)), tuple(int(s) for s in sampler))
+
+    def Acquire(self, filename, sampler=DEFAULT_SAMPLER):
+        """Id de la textura compartida para 'filename', o None si no se pudo cargar."""
+        key = self.Key(filename, sampler)
+        tex_id = self.Lookup(key)
+        if tex_id is not None:
+            return tex_id
+
+        if not os.path.isfile(filename):
+            print(f"[Textures] ⚠ No existe la textura: {filename}")
+            return None
+        try:
+            texture = read_texture(filename, compression_supported())
+            if isinstance(texture, dict):
+                tex_id, nbytes = upload_levels(texture, sampler), levels_bytes(texture, sampler)
+            else:
+                w, h, pixels = texture
+                tex_id, nbytes = upload_texture(w, h, pixels, sampler), texture_bytes(w, h, sampler)
+        except Exception as e:
+            print(f"[Textures] ✖ Error cargando textura {filename}: {e}")
+            return None
+
+        self.misses += 1
+        self.Insert(key, tex_id, nbytes)
+        print(f"[Textures] ✓ Textura cargada: {filename}")
+        return tex_id
+
+    def Lookup(self, key):
+        """Como Acquire pero solo si ya está residente (no carga nada)."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.hits += 1
+        entry["refs"] += 1
+        self.entries.move_to_end(key)
+        return entry["id"]
+
+    def Insert(self, key, tex_id, nbytes, refs=1):
+        """Registra una textura ya subida a la GPU (con 'refs' referencias)."""
+        self.entries[key] = {"id": tex_id, "bytes": nbytes, "refs": refs}
+        self.keyById[tex_id] = key
+        self.bytesResident += nbytes
+        self.Evict()
+
+    def Release(self, tex_id):
+        """Suelta una referencia; la textura queda candidata a desalojo si llega a 0."""
+        key = self.keyById.get(tex_id)
+        if key is None:
+            return
+        entry = self.entries[key]
+        entry["refs"] = max(0, entry["refs"] - 1)
+        self.Evict()
+
+    def Evict(self, budgetBytes=None):
+        """Borra texturas sin referencias (LRU primero) hasta quedar dentro del presupuesto."""
+        budget = self.budgetBytes if budgetBytes is None else budgetBytes
+        if budget is None or self.bytesResident <= budget:
+            return
+
+        for key in [k for k, e in self.entries.items() if e["refs"] == 0]:
+            if self.bytesResident <= budget:
+                break
+            entry = self.entries.pop(key)
+            del self.keyById[entry["id"]]
+            glDeleteTextures(1, [entry["id"]])
+            self.bytesResident -= entry["bytes"]
+            self.evictions += 1
+
+    def Clear(self):
+        """Borra todas las texturas (p. ej. antes de destruir el contexto GL)."""
+        if self.entries:
+            glDeleteTextures(len(self.entries), [e["id"] for e in self.entries.values()])
+        self.entries.clear()
+        self.keyById.clear()
+        self.bytesResident = 0
+
+    def Stats(self):
+        referenced = sum(1 for e in self.entries.values() if e["refs"] > 0)
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "textures": len(self.entries), "referenced": referenced,
+                "bytesResident": self.bytesResident, "budgetBytes": self.budgetBytes}
+
+
+# Caché compartida por todo el proceso
+textureCache = TextureCache()
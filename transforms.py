@@ -0,0 +1,237 @@
+# transforms.py
+# (mantén este comentario con el nombre del archivo)
+
+import glm
+import numpy as np
+
+from culling import transform_bounds, transform_spheres
+
+
+def _rotation_matrices(rotations):
+    """Rx * Ry * Rz (grados, como Model.GetModelMatrix) para N rotaciones -> (N, 3, 3)."""
+    ax, ay, az = np.radians(np.asarray(rotations, dtype=np.float64)).T
+    cx, sx, cy, sy, cz, sz = np.cos(ax), np.sin(ax), np.cos(ay), np.sin(ay), np.cos(az), np.sin(az)
+
+    R = np.empty((len(cx), 3, 3))
+    R[:, 0, 0] = cy * cz
+    R[:, 0, 1] = -cy * sz
+    R[:, 0, 2] = sy
+    R[:, 1, 0] = sx * sy * cz + cx * sz
+    R[:, 1, 1] = -sx * sy * sz + cx * cz
+    R[:, 1, 2] = -sx * cy
+    R[:, 2, 0] = -cx * sy * cz + sx * sz
+    R[:, 2, 1] = cx * sy * sz + sx * cz
+    R[:, 2, 2] = cx * cy
+    return R
+
+
+def model_matrices(positions, rotations=None, scales=None):
+    """
+    Matrices de modelo T * R * S para N objetos a la vez, iguales a las de
+    Model.GetModelMatrix(). Devuelve (N, 4, 4) float32 por columnas, como
+    glm (matrices[i][c] es la columna c): se puede subir tal cual a GL.
+    """
+    positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+    n = len(positions)
+
+    if rotations is None:
+        A = np.broadcast_to(np.eye(3), (n, 3, 3)).copy()
+    else:
+        A = _rotation_matrices(np.asarray(rotations).reshape(-1, 3))
+    if scales is not None:
+        A = A * np.asarray(scales, dtype=np.float64).reshape(-1, 1, 3)
+
+    out = np.zeros((n, 4, 4), dtype=np.float32)
+    out[:, :3, :3] = A.transpose(0, 2, 1)   # fila c de 'out' = columna c de A
+    out[:, 3, :3] = positions
+    out[:, 3, 3] = 1.0
+    return out
+
+
+_AXES = {"x": 0, "y": 1, "z": 2}
+
+
+class TransformVector(glm.vec3):
+    """
+    glm.vec3 de posición / rotación / escala de un objeto de un TransformSystem
+    (lo que devuelven Model.position, .rotation y .scale). Sirve para todo lo
+    que acepta un glm.vec3; además cada cambio (v.y += 1, v[0] = 2) se escribe
+    en el array del sistema y marca al objeto para el próximo Update().
+    Al revés no: lo que se escriba directo en los arrays no se ve en el vec3.
+    """
+    def __init__(self, system, field, index):
+        glm.vec3.__init__(self, *getattr(system, field)[index].tolist())
+        # Por __dict__: no pasan por __setattr__ (y __slots__ no anda sobre glm.vec3)
+        self.__dict__.update(system=system, field=field, index=index)
+
+    def __setattr__(self, name, value):
+        glm.vec3.__setattr__(self, name, value)
+        axis = _AXES.get(name)
+        if axis is not None:
+            # Solo el componente que cambió (rotation.y += ... en cada frame es lo común)
+            system, index = self.system, self.index
+            getattr(system, self.field)[index, axis] = value
+            system.dirty[index] = True
+
+    def __setitem__(self, key, value):
+        glm.vec3.__setitem__(self, key, value)
+        self._Store()
+
+    def Assign(self, value):
+        """Copia los tres componentes de 'value' (glm.vec3 o cualquier secuencia de 3)."""
+        x, y, z = value
+        for name, component in (("x", x), ("y", y), ("z", z)):
+            glm.vec3.__setattr__(self, name, component)
+        self._Store()
+
+    def _Store(self):
+        getattr(self.system, self.field)[self.index] = tuple(self)
+        self.system.dirty[self.index] = True
+
+
+class TransformSystem(object):
+    """
+    Posición / rotación (grados) / escala de muchos objetos en arrays
+    (structure of arrays), con la matriz de modelo de cada uno.
+      - Add() reserva un índice (o reusa uno de Release()); Set() o escribir
+        en los arrays + MarkDirty() marcan qué cambió
+      - Update() recalcula solo las matrices marcadas, en una pasada vectorizada,
+        y las cajas / esferas en mundo de los que tienen volumen (SetBounds)
+      - 'version' sube cada vez que Update() cambia alguna matriz (así
+        InstancedModel sabe si tiene que volver a subirlas), 'changed'
+        guarda cuáles fueron y 'stamps' la versión en que cambió cada una
+    Los arrays tienen capacidad de sobra: los datos válidos son [:count].
+    """
+    def __init__(self, capacity=256):
+        self.count = 0
+        self.version = 0
+        self.free = []           # índices liberados con Release(), para reusar
+
+        self.positions = np.zeros((capacity, 3), dtype=np.float32)
+        self.rotations = np.zeros((capacity, 3), dtype=np.float32)
+        self.scales    = np.ones((capacity, 3), dtype=np.float32)
+        self.matrices  = np.tile(np.eye(4, dtype=np.float32), (capacity, 1, 1))
+        self.dirty     = np.zeros(capacity, dtype=bool)
+        self.stamps    = np.zeros(capacity, dtype=np.int64)
+
+        # Volúmenes envolventes: locales (SetBounds) y en mundo (los calcula Update)
+        self.hasBounds    = np.zeros(capacity, dtype=bool)
+        self.localMins    = np.zeros((capacity, 3), dtype=np.float64)
+        self.localMaxs    = np.zeros((capacity, 3), dtype=np.float64)
+        self.localCenters = np.zeros((capacity, 3), dtype=np.float64)
+        self.localRadii   = np.zeros(capacity, dtype=np.float64)
+        self.worldMins    = np.zeros((capacity, 3), dtype=np.float64)
+        self.worldMaxs    = np.zeros((capacity, 3), dtype=np.float64)
+        self.worldCenters = np.zeros((capacity, 3), dtype=np.float64)
+        self.worldRadii   = np.zeros(capacity, dtype=np.float64)
+
+        self.changed = np.zeros(0, dtype=np.int64)  # índices recalculados en el último Update()
+
+    def Reserve(self, capacity):
+        """Agranda los arrays (conservando los datos) si hace falta."""
+        old = len(self.positions)
+        if capacity <= old:
+            return
+        capacity = max(capacity, old * 2)
+
+        def grow(a, fill):
+            out = np.empty((capacity,) + a.shape[1:], dtype=a.dtype)
+            out[:old] = a
+            out[old:] = fill
+            return out
+
+        self.positions = grow(self.positions, 0.0)
+        self.rotations = grow(self.rotations, 0.0)
+        self.scales    = grow(self.scales, 1.0)
+        self.matrices  = grow(self.matrices, np.eye(4, dtype=np.float32))
+        self.dirty     = grow(self.dirty, False)
+        self.stamps    = grow(self.stamps, 0)
+
+        self.hasBounds = grow(self.hasBounds, False)
+        for name in ("localMins", "localMaxs", "localCenters", "localRadii",
+                     "worldMins", "worldMaxs", "worldCenters", "worldRadii"):
+            setattr(self, name, grow(getattr(self, name), 0.0))
+
+    def Add(self, position=(0, 0, 0), rotation=(0, 0, 0), scale=(1, 1, 1), count=1):
+        """Agrega 'count' objetos (valores por objeto o uno para todos). Devuelve el primer índice."""
+        if count == 1 and self.free:
+            first = self.free.pop()
+        else:
+            first = self.count
+            self.Reserve(first + count)
+            self.count += count
+
+        rows = slice(first, first + count)
+        self.positions[rows] = position
+        self.rotations[rows] = rotation
+        self.scales[rows]    = scale
+        self.dirty[rows] = True
+        return first
+
+    def Set(self, index, position=None, rotation=None, scale=None):
+        """Cambia uno o varios objetos ('index' puede ser int, slice o array de índices)."""
+        if position is not None:
+            self.positions[index] = position
+        if rotation is not None:
+            self.rotations[index] = rotation
+        if scale is not None:
+            self.scales[index] = scale
+        self.dirty[index] = True
+
+    def Release(self, index):
+        """Devuelve el índice de un objeto que ya no se usa; Add() lo reusa."""
+        self.hasBounds[index] = False
+        self.dirty[index] = False
+        self.free.append(index)
+
+    def SetBounds(self, index, boundsMin, boundsMax, center, radius):
+        """Caja y esfera locales de un objeto: Update() calcula las de mundo."""
+        self.localMins[index] = boundsMin
+        self.localMaxs[index] = boundsMax
+        self.localCenters[index] = center
+        self.localRadii[index] = radius
+        self.hasBounds[index] = True
+        self.dirty[index] = True
+
+    def MarkDirty(self, index=None):
+        """Marca objetos modificados directamente en los arrays (None = todos)."""
+        if index is None:
+            self.dirty[:self.count] = True
+        else:
+            self.dirty[index] = True
+
+    def Update(self):
+        """Recalcula las matrices marcadas. Devuelve cuántas se recalcularon."""
+        n = self.count
+        changed = np.flatnonzero(self.dirty[:n])
+        if len(changed) == 0:
+            return 0
+
+        if len(changed) == n:
+            # Todo cambió (animación): sin indexado
+            self.matrices[:n] = model_matrices(self.positions[:n], self.rotations[:n], self.scales[:n])
+        else:
+            self.matrices[changed] = model_matrices(self.positions[changed], self.rotations[changed],
+                                                    self.scales[changed])
+        self.dirty[changed] = False
+        self.changed = changed
+        self.version += 1
+        self.stamps[changed] = self.version
+
+        bounded = changed[self.hasBounds[changed]]
+        if len(bounded):
+            matrices = self.matrices[bounded]
+            self.worldMins[bounded], self.worldMaxs[bounded] = transform_bounds(
+                matrices, self.localMins[bounded], self.localMaxs[bounded])
+            self.worldCenters[bounded], self.worldRadii[bounded] = transform_spheres(
+                matrices, self.localCenters[bounded], self.localRadii[bounded])
+        return len(changed)
+
+    def Matrix(self, index):
+        """Matriz de un objeto como glm.mat4 (llamar Update() antes)."""
+        return glm.mat4(*self.matrices[index].reshape(-1).tolist())
+
+
+# Posición / rotación / escala de todos los Model (ver Model.position); el
+# Renderer llama a Update() una vez por frame, antes del culling
+sceneTransforms = TransformSystem()
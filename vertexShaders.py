@@ -2,6 +2,10 @@
 # --------------------------------------------
 # (mantén este comentario con el nombre del archivo)
 
+from framedata import frame_uniforms
+
+# Cámara, luz, value y time vienen del bloque FrameData (UBO por frame, ver framedata.py)
+
 vertex_shader = '''
 #version 330 core
 
@@ -13,9 +17,11 @@ out vec2 fragTexCoords;
 out vec3 fragNormal;
 out vec4 fragPosition;
 
+// Misma posición en el pre-pass de profundidad y en el de color (GL_EQUAL)
+invariant gl_Position;
+
 uniform mat4 modelMatrix;
-uniform mat4 viewMatrix;
-uniform mat4 projectionMatrix;
+''' + frame_uniforms + '''
 
 void main()
 {
@@ -40,10 +46,12 @@ out vec2 fragTexCoords;
 out vec3 fragNormal;
 out vec4 fragPosition;
 
+// Misma posición en el pre-pass de profundidad y en el de color (GL_EQUAL)
+invariant gl_Position;
+
 uniform mat4 modelMatrix;
-uniform mat4 viewMatrix;
-uniform mat4 projectionMatrix;
-uniform float value; // usa Z/X para variar (0..1 aprox)
+''' + frame_uniforms + '''
+// value: usa Z/X para variar (0..1 aprox)
 
 void main()
 {
@@ -70,11 +78,12 @@ out vec2 fragTexCoords;
 out vec3 fragNormal;
 out vec4 fragPosition;
 
+// Misma posición en el pre-pass de profundidad y en el de color (GL_EQUAL)
+invariant gl_Position;
+
 uniform mat4 modelMatrix;
-uniform mat4 viewMatrix;
-uniform mat4 projectionMatrix;
-uniform float time;
-uniform float value; // amplitud
+''' + frame_uniforms + '''
+// value: amplitud
 
 void main()
 {
@@ -102,10 +111,12 @@ out vec2 fragTexCoords;
 out vec3 fragNormal;
 out vec4 fragPosition;
 
+// Misma posición en el pre-pass de profundidad y en el de color (GL_EQUAL)
+invariant gl_Position;
+
 uniform mat4 modelMatrix;
-uniform mat4 viewMatrix;
-uniform mat4 projectionMatrix;
-uniform float value; // controla la cantidad de torsión (0..1 aprox)
+''' + frame_uniforms + '''
+// value: controla la cantidad de torsión (0..1 aprox)
 
 void main()
 {
@@ -130,3 +141,20 @@ void main()
     fragTexCoords = inTexCoords;
 }
 ''';
+
+
+# -------------- Variantes instanciadas --------------
+# La matriz de modelo llega como atributo por instancia (locations 3..6)
+# en vez de uniform; el resto del shader queda igual. Ver InstancedModel.
+
+def instanced_variant(source):
+    """Versión instanciada de un vertex shader que declara 'uniform mat4 modelMatrix;'."""
+    uniform = "uniform mat4 modelMatrix;"
+    if uniform not in source:
+        raise ValueError("El vertex shader no declara 'uniform mat4 modelMatrix;'")
+    return source.replace(uniform, "layout (location = 3) in mat4 modelMatrix; // por instancia")
+
+vertex_shader_instanced = instanced_variant(vertex_shader)
+fat_shader_instanced    = instanced_variant(fat_shader)
+water_shader_instanced  = instanced_variant(water_shader)
+twist_shader_instanced  = instanced_variant(twist_shader)